@@ -0,0 +1,30 @@
+"""
+Проверка расписания очередей
+
+Revision ID: 065c04658085
+Revises: 9fae735078cd
+Create Date: 2026-10-18 04:20:57.907491
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '065c04658085'
+down_revision = '9fae735078cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_check_constraint(
+        op.f('ck_queues_schedule'), 'queues',
+        'weekdays IS NULL OR (opens IS NOT NULL AND closes IS NOT NULL '
+        'AND opens < closes AND duration > 0)'
+    )
+
+
+def downgrade():
+    op.drop_constraint(op.f('ck_queues_schedule'), 'queues', type_='check')
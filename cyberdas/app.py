@@ -5,6 +5,7 @@ import falcon
 from .routes import route
 from .middlewares import middleware
 from .config import get_cfg
+from .middleware.session import SessionRequest
 
 
 class Service(falcon.App):
@@ -14,7 +15,7 @@ class Service(falcon.App):
     def __init__(self):
         self.__class__.__instance__ = weakref.proxy(self)
         self.cfg = get_cfg()
-        super(Service, self).__init__()
+        super(Service, self).__init__(request_type = SessionRequest)
         route(self)
         middleware(self)
 
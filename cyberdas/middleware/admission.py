@@ -0,0 +1,44 @@
+import falcon
+
+
+class AdmissionMiddleware:
+
+    def __init__(self, admission):
+        '''
+        Класс, содержащий middleware, ограничивающий количество одновременно
+        обрабатываемых запросов к эндпоинтам. Эндпоинт включает ограничение
+        аттрибутом класса вида `admission = {'methods': [...], 'key': ...}`,
+        где `key` - имя параметра пути, значения которого ограничиваются
+        независимо друг от друга. Лишние запросы получают HTTP 429.
+
+        Аргументы:
+            admission(Admission, необходим): ограничение одновременных запросов
+        '''
+        self.admission = admission
+
+    def process_resource(self, req, resp, resource, params):
+        '''
+        Автоматически вызывается Falcon при получении запроса.
+
+        Дожидается места для обработки запроса или отклоняет его.
+        '''
+        conf = getattr(resource, 'admission', {})
+        if req.method not in conf.get('methods', []):
+            return
+        key = (req.uri_template, params.get(conf.get('key')))
+        if not self.admission.acquire(key):
+            raise falcon.HTTPTooManyRequests(
+                description = 'Слишком много одновременных запросов, '
+                              'попробуйте позже',
+                retry_after = self.admission.retry_after
+            )
+        req.context['admission'] = key
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        '''
+        Автоматически вызывается Falcon при возврате ответа на запрос.
+
+        Освобождает место, занятое запросом.
+        '''
+        if 'admission' in req.context:
+            self.admission.release(req.context['admission'])
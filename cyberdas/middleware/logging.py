@@ -33,10 +33,13 @@ class LoggerMiddleware(object):
 
         Оставляет записи в access-логах об обработанных запросах.
         '''
-        if 'user' in req.context and req.context.user is not None:
-            uid = req.context.user['uid']
+        # На эндпоинтах без аутентификации пользователь определяется лениво;
+        # ради лога его не загружаем из БД, а берем уже известного
+        if hasattr(req.context, 'known_user'):
+            user = req.context.known_user()
         else:
-            uid = None
+            user = req.context.__dict__.get('user')
+        uid = user['uid'] if user is not None else None
 
         data = {'method': req.method, 'uri': req.forwarded_uri,
                 'ip': req.get_header('X-Real-IP') or req.access_route[-1],
@@ -1,8 +1,93 @@
+import logging
+from types import MappingProxyType
+
 import falcon
 
-from cyberdas.services.session import SessionManager
+from cyberdas.services.session import create_session_manager
+from cyberdas.services.session.csrf import verify_csrf_token
+from cyberdas.config import get_cfg
 from cyberdas.exceptions import BadAuthError
 
+# Политики аутентификации эндпоинтов
+EXEMPT = 'exempt'
+REQUIRED = 'required'
+CSRF_REQUIRED = 'csrf-required'
+
+# Методы, запросы которых должны содержать CSRF-токен
+CSRF_METHODS = frozenset(['POST'])
+
+
+class SessionContext(falcon.Context):
+
+    '''
+    Контекст запроса, позволяющий отложить аутентификацию пользователя до
+    первого обращения к `req.context.user`. Благодаря этому эндпоинты, не
+    требующие аутентификации и не использующие информацию о пользователе, не
+    обращаются к таблице сессий вовсе.
+    '''
+
+    @property
+    def user(self):
+        if 'user' in self.__dict__:
+            return self.__dict__['user']
+
+        loader = self.__dict__.pop('_user_loader', None)
+        if loader is None:
+            raise AttributeError('user')
+
+        # Если загрузчик выбросит исключение, пользователь останется анонимным
+        self.__dict__['user'] = None
+        self.__dict__['user'] = loader()
+        return self.__dict__['user']
+
+    @user.setter
+    def user(self, value):
+        self.__dict__.pop('_user_loader', None)
+        self.__dict__['user'] = value
+
+    def __getitem__(self, key):
+        if key == 'user':
+            return self.user
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key == 'user':
+            self.user = value
+        else:
+            super().__setitem__(key, value)
+
+    def defer_user(self, loader, peek = None):
+        '''
+        Откладывает определение пользователя до первого обращения к нему.
+
+        Аргументы:
+            loader(callable, необходим): функция без аргументов, возвращающая
+                информацию о пользователе или None
+
+            peek(callable, опционально): функция без аргументов, возвращающая
+                информацию о пользователе, если её можно получить без
+                обращения к БД, или None
+        '''
+        self.__dict__.pop('user', None)
+        self.__dict__['_user_loader'] = loader
+        self.__dict__['_user_peek'] = peek
+
+    def known_user(self):
+        '''
+        Возвращает информацию о пользователе, если он уже определен или может
+        быть определен без обращения к БД, иначе None. Отложенное определение
+        пользователя при этом не выполняется.
+        '''
+        if 'user' in self.__dict__:
+            return self.__dict__['user']
+        peek = self.__dict__.get('_user_peek')
+        return peek() if peek is not None else None
+
+
+class SessionRequest(falcon.Request):
+
+    context_type = SessionContext
+
 
 class SessionMiddleware:
 
@@ -12,6 +97,10 @@ class SessionMiddleware:
         используется проход по всем эндпоинтам и поиск настроек в аттрибутах
         классов, также можно передать эти параметры в аргументах конструктора.
 
+        Настройки всех эндпоинтов сводятся в неизменяемую таблицу политик с
+        ключами вида (шаблон URI, метод), поэтому решение о необходимости
+        аутентификации принимается за одно обращение к словарю.
+
         Аргументы:
             api(falcon.App, необходим): ссылка на экземпляр API.
 
@@ -21,19 +110,22 @@ class SessionMiddleware:
             exempt_methods(list, опционально): список методов, не требующих
             аутентификации.
         '''
-        self.manager = SessionManager()
+        self.manager = create_session_manager(get_cfg())
         self.config = dict()
-        self.config['exempt_routes'] = exempt_routes
-        self.config['exempt_methods'] = dict()
-        self.config['exempt_methods']['global'] = exempt_methods
+        self.config['exempt_routes'] = frozenset(exempt_routes)
+        self.config['exempt_methods'] = frozenset(exempt_methods)
 
-        routes = self._get_all_routes(api)
-        for route in routes:
-            self._get_settings(*route)
+        policies = dict()
+        for resource, uri_template, methods in self._get_all_routes(api):
+            for method in methods:
+                policies[(uri_template, method)] = self._get_policy(
+                    resource, uri_template, method
+                )
+        self.policies = MappingProxyType(policies)
 
     def _get_all_routes(self, api):
         '''
-        Ищет все пары вида (класс ресурса, шаблон URI) в API
+        Ищет все тройки вида (класс ресурса, шаблон URI, список методов) в API
 
         Аргументы:
             api(falcon.App, необходим): ссылка на экземпляр API.
@@ -41,7 +133,9 @@ class SessionMiddleware:
         routes = []
 
         def get_node_and_children(node):
-            routes.append((node.resource, node.uri_template))
+            if node.resource is not None:
+                routes.append((node.resource, node.uri_template,
+                               list(node.method_map)))
             if len(node.children):
                 for child_node in node.children:
                     get_node_and_children(child_node)
@@ -50,21 +144,31 @@ class SessionMiddleware:
             get_node_and_children(node)
         return routes
 
-    def _get_settings(self, resource, uri_template):
+    def _get_policy(self, resource, uri_template, method):
         '''
-        Собирает настройки из класса эндпоинта и добавляет их в глобальный
-        конфиг.
+        Собирает настройки из класса эндпоинта и конфига и возвращает политику
+        аутентификации для одного метода эндпоинта: EXEMPT, REQUIRED или
+        CSRF_REQUIRED.
 
         Аргументы:
             resource(необходим): ссылка на экземпляр класса эндпоинта.
 
             uri_template(string, необходим): строка, по которой производится
             маршрутизация к этому эндпоинту.
+
+            method(string, необходим): HTTP-метод запроса.
         '''
         local_conf = getattr(resource, 'auth', {})
-        if local_conf.get('disabled'):
-            self.config['exempt_routes'].append(uri_template)
-        self.config['exempt_methods'][str(resource)] = local_conf.get('exempt_methods', []) # noqa
+        if (
+            local_conf.get('disabled')
+            or uri_template in self.config['exempt_routes']
+            or method in self.config['exempt_methods']
+            or method in local_conf.get('exempt_methods', [])
+        ):
+            return EXEMPT
+        if method in CSRF_METHODS:
+            return CSRF_REQUIRED
+        return REQUIRED
 
     def csrf_protect(self, req):
         '''
@@ -74,9 +178,9 @@ class SessionMiddleware:
         Аргументы:
             req(необходим): текущий запрос.
         '''
-        if req.method == 'POST':
+        if req.method in CSRF_METHODS:
             csrf = req.get_header('X-CSRF-Token')
-            if csrf is None or csrf != req.context['user']['csrf_token']:
+            if not verify_csrf_token(req.context['user']['sid'], csrf):
                 req.context.logger.error(
                     '[ПОПЫТКА CSRF] uid %s, sid %s'
                     % (req.context['user']['uid'], req.context['user']['sid'])
@@ -85,18 +189,45 @@ class SessionMiddleware:
                     description = 'Неверный CSRF-токен'
                 )
 
+    def load_user(self, req):
+        '''
+        Аутентифицирует пользователя для эндпоинтов, не требующих
+        аутентификации. Возвращает информацию о пользователе и его сессии или
+        None, если пользователь не аутентифицирован.
+
+        Аргументы:
+            req(необходим): текущий запрос.
+        '''
+        try:
+            return self.manager.authenticate(req.context.session, req.cookies)
+        except BadAuthError:
+            return None
+
     def process_resource(self, req, resp, resource, params):
         '''
         Автоматически вызывается Falcon при получении запроса.
 
         Аутентифицирует пользователя, проверяет CSRF-токен, а также добавляет в
         контекст запроса информацию о пользователе и его сессии.
+
+        На эндпоинтах, не требующих аутентификации, эти действия откладываются
+        до первого обращения к `req.context.user`. Исключение - запросы,
+        которые должны содержать CSRF-токен: токен проверяется до вызова
+        обработчика, иначе запрос успел бы выполниться до проверки.
         '''
-        exempted = (
-            req.method in self.config['exempt_methods']['global']
-            or req.uri_template in self.config['exempt_routes']
-            or req.method in self.config['exempt_methods'][str(resource)]
-        )
+        policy = self.policies.get((req.uri_template, req.method))
+        if policy is None:
+            # Эндпоинт был добавлен уже после инициализации middleware
+            policy = self._get_policy(resource, req.uri_template, req.method)
+        exempted = policy == EXEMPT
+
+        if (
+            exempted and req.method not in CSRF_METHODS
+            and isinstance(req.context, SessionContext)
+        ):
+            req.context.defer_user(lambda: self.load_user(req),
+                                   lambda: self.manager.peek(req.cookies))
+            return
 
         try:
             req.context['user'] = self.manager.authenticate(req.context.session,
@@ -108,4 +239,22 @@ class SessionMiddleware:
             else:
                 raise falcon.HTTPUnauthorized
 
-        self.csrf_protect(req)
+        if policy != REQUIRED:
+            self.csrf_protect(req)
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        '''
+        Автоматически вызывается Falcon при возврате ответа на запрос.
+
+        Время от времени записывает накопленную активность сессий в БД через
+        отдельное соединение, не затрагивая транзакцию текущего запроса. Ошибка
+        записи только логируется: ответ на запрос от неё не зависит.
+        '''
+        if 'session' not in req.context:
+            return
+        try:
+            self.manager.flush_activity(req.context.session.get_bind())
+        except Exception:
+            logging.getLogger('inspection').exception(
+                '[АКТИВНОСТЬ СЕССИЙ] Не удалось записать активность'
+            )
@@ -1,7 +1,8 @@
 import falcon_sqla
 from sqlalchemy import create_engine
 
-from .middleware import logging, session
+from .middleware import logging, session, admission
+from .services import create_admission
 
 
 def create_logging_middleware(cfg):
@@ -31,6 +32,15 @@ def create_session_middleware(api):
     return session.SessionMiddleware(api, exempt_routes = [])
 
 
+def create_admission_middleware(cfg):
+    '''
+    Инициализирует middleware, ограничивающий количество одновременно
+    обрабатываемых запросов к эндпоинтам, объявившим это в аттрибуте
+    `admission`. Лишние запросы отклоняются с HTTP 429.
+    '''
+    return admission.AdmissionMiddleware(create_admission(cfg))
+
+
 def middleware(api):
     '''
     Функция, инициализирующая все middleware проекта.
@@ -40,7 +50,12 @@ def middleware(api):
     первый компонент в этой функции будет первым при обработке запросов.
     Например, аутентификационный middleware не сможет работать без middleware
     базы данных, поэтому компонент для БД должен идти первым.
+
+    Ограничивающий middleware идет ещё раньше: тогда отклоненные запросы не
+    доходят до аутентификации, а место освобождается только после фиксации
+    транзакции и закрытия сессии БД.
     '''
+    api.add_middleware(create_admission_middleware(api.cfg))
     api.add_middleware(create_db_middleware(api.cfg))
     api.add_middleware(create_logging_middleware(api.cfg))
     api.add_middleware(create_session_middleware(api))
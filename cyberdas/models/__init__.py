@@ -2,16 +2,19 @@ from .__meta__ import Base
 from .faculty import Faculty
 from .user import User
 from .session import Session
+from .revoked_session import RevokedSession
 from .queue import Queue
 from .slot import Slot
+from .slot_history import SlotHistory
+from .waitlist_entry import WaitlistEntry
 from .feedback import Feedback
 from .recipient import Recipient
 from .feedback_category import FeedbackCategory
 from .maintenance import Maintenance
 
 __all__ = [
-    'Base', 'Faculty', 'User', 'Session',
-    'Queue', 'Slot',
+    'Base', 'Faculty', 'User', 'Session', 'RevokedSession',
+    'Queue', 'Slot', 'SlotHistory', 'WaitlistEntry',
     'Recipient', 'FeedbackCategory', 'Feedback',
     'Maintenance',
 ]
@@ -3,8 +3,15 @@ from sqlalchemy import (
     Text,
     String,
     Integer,
-    Boolean
+    BigInteger,
+    SmallInteger,
+    Boolean,
+    Date,
+    Time,
+    DateTime,
+    CheckConstraint
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from sqlalchemy.orm import relationship
 from .__meta__ import Base
@@ -41,12 +48,49 @@ class Queue(Base, Serializable):
                 Флаг, который делает возможным записаться в очередь только один
                 раз
 
+            weekdays - Nullable Array of SmallInteger
+                Дни недели (0 - понедельник), по которым работает очередь с
+                расписанием. Если равен Null - слоты очереди хранятся в БД,
+                иначе вычисляются по расписанию, а в БД хранятся только
+                занятые слоты
+
+            opens - Nullable Time
+                Время открытия очереди с расписанием
+
+            closes - Nullable Time
+                Время закрытия очереди с расписанием, позже opens
+
+            exceptions - Nullable Array of Date
+                Дни, в которые очередь с расписанием не работает
+
+            version - BigInteger
+                Версия слотов очереди, увеличивающаяся при каждом их изменении.
+                Используется для формирования ETag
+
+            holds_until - Nullable DateTime
+                Время истечения самого позднего из удержаний слотов очереди.
+                Пока оно не наступило, слоты очереди могут освободиться без
+                изменения версии, поэтому ETag учитывает истекшие удержания.
+                Внутреннее поле, не передается клиентам
+
         Взаимоотношения:
             slots - многие-к-одному
                 Задает соответствие между очередью и её слотами
+
+        Ограничения:
+            ck_queues_schedule
+                У очереди с расписанием заданы opens и closes, opens раньше
+                closes, а duration положительна
     '''
 
     __tablename__ = 'queues'
+    __table_args__ = (
+        CheckConstraint(
+            'weekdays IS NULL OR (opens IS NOT NULL AND closes IS NOT NULL '
+            'AND opens < closes AND duration > 0)',
+            name = 'schedule'
+        ),
+    )
     name = Column(String, primary_key = True)
     title = Column(Text, nullable = False)
     description = Column(Text, nullable = False)
@@ -55,5 +99,21 @@ class Queue(Base, Serializable):
     only_one_active = Column(Boolean, nullable = False,
                              server_default = 'false')
     only_once = Column(Boolean, nullable = False, server_default = 'false')
+    weekdays = Column(ARRAY(SmallInteger), nullable = True)
+    opens = Column(Time, nullable = True)
+    closes = Column(Time, nullable = True)
+    exceptions = Column(ARRAY(Date), nullable = True)
+    version = Column(BigInteger, nullable = False, server_default = '0')
+    holds_until = Column(DateTime, nullable = True)
 
     slots = relationship('Slot', back_populates = 'queue')
+
+    def as_dict(self):
+        output = super().as_dict()
+        del output['holds_until']
+        return output
+
+    @property
+    def recurring(self):
+        'Вычисляются ли слоты очереди по расписанию'
+        return self.weekdays is not None
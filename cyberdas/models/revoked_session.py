@@ -0,0 +1,50 @@
+from sqlalchemy import (
+    Column,
+    BigInteger,
+    Integer,
+    String,
+    DateTime,
+)
+
+from .__meta__ import Base
+
+
+class RevokedSession(Base):
+    '''
+        Объект БД, хранящий информацию об отозванных подписанных сессиях.
+        Используется только при `session.backend = signed`: такие сессии
+        хранятся целиком в куки, поэтому завершить их можно только внеся в
+        список отозванных.
+
+        Поля:
+            version - Primary key BigInteger
+                Монотонно растущий номер записи. Процессы запоминают последний
+                прочитанный номер и запрашивают более новые записи, а также
+                недавно созданные: номера выдаются в порядке вставки, а не
+                фиксации транзакций
+
+            sid - Nullable String
+                Идентификатор отозванной сессии
+
+            uid - Nullable Integer
+                Идентификатор пользователя, все сессии которого, выданные до
+                момента `before`, отозваны
+
+            before - Nullable DateTime
+                Момент, до которого выданные сессии пользователя `uid` отозваны
+
+            keep - Nullable String
+                Идентификатор сессии пользователя `uid`, которая не отзывается
+
+            expires - DateTime
+                Время, после которого все отозванные этой записью сессии истекут
+                сами по себе и запись можно удалить
+    '''
+
+    __tablename__ = 'revoked_sessions'
+    version = Column(BigInteger, primary_key = True, autoincrement = True)
+    sid = Column(String(64), nullable = True)
+    uid = Column(Integer, nullable = True)
+    before = Column(DateTime, nullable = True)
+    keep = Column(String(64), nullable = True)
+    expires = Column(DateTime, nullable = False)
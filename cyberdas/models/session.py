@@ -23,26 +23,27 @@ class Session(Base):
                 в виде хэша, - в случае если база данных окажется в руках
                 злоумышленников, они не смогут 'угнать' ни одну сессию.
 
-            uid - Foreign key Integer
+            uid - Indexed Foreign key Integer
                 Уникальный идентификатор пользователя, с которым связана сессия
 
-            csrf_token - Unique String
-                Уникальная строка, присвоенная пользователю для защиты от
-                CSRF атак
-
             user_agent - Text
                 Хранит информацию о User Agent пользователя
 
             ip - Text
                 Хранит информацию о IP пользователя
 
-            expires - DateTime
+            expires - Indexed DateTime
                 Хранит время истечения сессии
+                Индекс позволяет быстро находить истёкшие сессии для удаления
 
             created_at - DateTime
                 Хранит дату последней выдачи куки
                 При выдаче куки устанавливается БД с помощью SQL now()
 
+            last_seen - Nullable DateTime
+                Хранит время последнего обращения с этой сессией
+                Записывается с задержкой, пачками из памяти процессов
+
         Взаимоотношения:
             user - многие-к-одному
                 Задает соответствие между пользователем и всеми его сессиями
@@ -50,11 +51,12 @@ class Session(Base):
 
     __tablename__ = 'sessions'
     sid = Column(HashType('sha256'), primary_key = True)
-    uid = Column(Integer, ForeignKey('users.id'), nullable = False)
-    csrf_token = Column(String(64), unique = True, nullable = False)
+    uid = Column(Integer, ForeignKey('users.id'), nullable = False,
+                 index = True)
     user_agent = Column(Text, nullable = False)
     ip = Column(String(16), nullable = False)
-    expires = Column(DateTime, nullable = False)
+    expires = Column(DateTime, nullable = False, index = True)
     created_at = Column(DateTime, nullable = False, server_default = func.now())
+    last_seen = Column(DateTime, nullable = True)
 
     user = relationship('User', back_populates = 'sessions')
@@ -1,9 +1,13 @@
+from datetime import datetime
+
 from sqlalchemy import (
     Column,
     Integer,
     DateTime,
     String,
-    ForeignKey
+    ForeignKey,
+    Index,
+    text
 )
 
 from sqlalchemy.orm import relationship
@@ -29,6 +33,29 @@ class Slot(Base, Serializable):
                 Идентификатор пользователя, занявшего слот
                 Если равен Null - слот свободен
 
+            held_by - Nullable Foreign key Integer
+                Идентификатор пользователя, временно удерживающего слот перед
+                записью. Пока удержание не истекло, другие пользователи не
+                могут ни занять слот, ни удержать его
+
+            held_until - Nullable DateTime
+                Время истечения удержания слота. Слот с истёкшим удержанием
+                считается свободным, даже если удержание ещё не снято
+
+        Индексы:
+            ix_slots_queue_name_time - (queue_name, time)
+                Позволяет выбирать слоты очереди за промежуток времени без
+                полного просмотра всех её слотов
+
+            ix_slots_queue_name_user_id_time - (queue_name, user_id, time)
+                Частичный индекс по занятым слотам. Позволяет быстро проверять
+                наличие (предстоящих) записей пользователя в очереди и
+                выбирать его слоты
+
+            ix_slots_queue_name_held_until - (queue_name, held_until)
+                Частичный индекс по удерживаемым слотам. Позволяет освобождать
+                истёкшие удержания, не просматривая остальные слоты очереди
+
         Взаимоотношения:
             holder - один-ко-многим
                 Задает соответствие между слотом и его держателем
@@ -38,15 +65,31 @@ class Slot(Base, Serializable):
     '''
 
     __tablename__ = 'slots'
+    __table_args__ = (
+        Index('ix_slots_queue_name_time', 'queue_name', 'time'),
+        Index('ix_slots_queue_name_user_id_time',
+              'queue_name', 'user_id', 'time',
+              postgresql_where = text('user_id IS NOT NULL')),
+        Index('ix_slots_queue_name_held_until', 'queue_name', 'held_until',
+              postgresql_where = text('held_until IS NOT NULL')),
+    )
     queue_name = Column(String, ForeignKey('queues.name'), primary_key = True)
     id = Column(Integer, primary_key = True)
     time = Column(DateTime, nullable = False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable = True)
+    held_by = Column(Integer, ForeignKey('users.id'), nullable = True)
+    held_until = Column(DateTime, nullable = True)
 
-    holder = relationship('User', back_populates = 'slots')
+    holder = relationship('User', back_populates = 'slots',
+                          foreign_keys = [user_id])
     queue = relationship('Queue', back_populates = 'slots')
 
+    @property
+    def held(self):
+        'Удерживается ли слот в данный момент'
+        return self.held_by is not None and self.held_until > datetime.now()
+
     def as_dict(self):
         return {'id': self.id,
                 'time': self.time.isoformat("T"),
-                'free': False if self.user_id is not None else True}
+                'free': self.user_id is None and not self.held}
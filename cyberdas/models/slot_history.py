@@ -0,0 +1,52 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    DateTime,
+    String,
+    ForeignKey,
+    Index,
+    text
+)
+
+from .__meta__ import Base
+
+
+class SlotHistory(Base):
+    '''
+        Объект БД, хранящий прошедшие слоты очередей, перенесенные из таблицы
+        slots скриптом archive_slots. Благодаря этому в таблице slots остаются
+        только недавние и будущие слоты, и запросы к ней не просматривают
+        историю.
+
+        Поля:
+            queue_name - Primary key Foreign key String
+                Имя очереди, в которой находился этот слот
+
+            id - Primary key Integer
+                Идентификатор слота, такой же, как в таблице slots
+
+            time - DateTime
+                Время начала действия слота
+
+            user_id - Nullable Foreign key Integer
+                Идентификатор пользователя, занимавшего слот
+
+        Индексы:
+            ix_slots_history_queue_name_time - (queue_name, time)
+                Позволяет выбирать слоты очереди за промежуток времени
+
+            ix_slots_history_queue_name_user_id - (queue_name, user_id)
+                Частичный индекс по занятым слотам. Позволяет проверять, были
+                ли у пользователя записи в очередь
+    '''
+
+    __tablename__ = 'slots_history'
+    __table_args__ = (
+        Index('ix_slots_history_queue_name_time', 'queue_name', 'time'),
+        Index('ix_slots_history_queue_name_user_id', 'queue_name', 'user_id',
+              postgresql_where = text('user_id IS NOT NULL')),
+    )
+    queue_name = Column(String, ForeignKey('queues.name'), primary_key = True)
+    id = Column(Integer, primary_key = True)
+    time = Column(DateTime, nullable = False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable = True)
@@ -91,5 +91,6 @@ class User(Base):
 
     faculty = relationship('Faculty', back_populates = 'population')
     sessions = relationship('Session', back_populates = 'user')
-    slots = relationship('Slot', back_populates = 'holder')
+    slots = relationship('Slot', back_populates = 'holder',
+                         foreign_keys = 'Slot.user_id')
     maintenances = relationship('Maintenance', back_populates = 'user')
@@ -0,0 +1,42 @@
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    ForeignKey,
+    DateTime,
+    Index
+)
+
+from sqlalchemy.sql import func
+from .__meta__ import Base
+
+
+class WaitlistEntry(Base):
+    '''
+        Объект БД, хранящий запись пользователя в списке ожидания очереди, в
+        которой не осталось свободных слотов.
+
+        Поля:
+            queue_name - Primary key Foreign key String
+                Имя очереди
+
+            user_id - Primary key Foreign key Integer
+                Идентификатор ожидающего пользователя
+
+            created_at - DateTime
+                Время попадания в список ожидания. Освободившийся слот
+                достается пользователю, ожидающему дольше всех
+
+        Индексы:
+            ix_waitlist_queue_name_created_at - (queue_name, created_at)
+                Позволяет находить первого в списке ожидания очереди, не
+                просматривая и не сортируя весь список
+    '''
+
+    __tablename__ = 'waitlist'
+    __table_args__ = (
+        Index('ix_waitlist_queue_name_created_at', 'queue_name', 'created_at'),
+    )
+    queue_name = Column(String, ForeignKey('queues.name'), primary_key = True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key = True)
+    created_at = Column(DateTime, nullable = False, server_default = func.now())
@@ -26,3 +26,34 @@ class Logout(object):
 
         log.info('[КОНЕЦ СЕССИИ] uid %s ip %s' % (user['uid'], user['ip']))
         resp.status = falcon.HTTP_204
+
+
+class LogoutAll(object):
+
+    def __init__(self, ses_manager: SessionManager):
+        self.ses_manager = ses_manager
+
+    def on_post(self, req: falcon.Request, resp: falcon.Response):
+        '''
+        Заканчивает все сессии пользователя на всех устройствах.
+
+        Параметры:
+
+            others (optional, in: query) - закончить все сессии, кроме текущей
+        '''
+        dbses = req.context.session
+        log = req.context.logger
+        user = req.context.user
+        others = req.get_param_as_bool('others', default = False)
+
+        keep = user['sid'] if others else None
+        count = self.ses_manager.end_all(dbses, user['uid'], keep = keep)
+
+        # Если закончена и текущая сессия, сбрасываем куки на стороне клиента
+        if not others:
+            cookie = self.ses_manager.session.form_cookie(user['sid'], -1)
+            resp.set_cookie(**cookie)
+
+        log.info('[КОНЕЦ ВСЕХ СЕССИЙ] uid %s ip %s, count %s, others %s'
+                 % (user['uid'], user['ip'], count, others))
+        resp.status = falcon.HTTP_204
@@ -4,8 +4,12 @@ from os import path
 import falcon
 from falcon.media.validators import jsonschema
 
-from cyberdas.models import User, Maintenance
-from cyberdas.services import support_ott, required_personal_data
+from cyberdas.models import Maintenance
+from cyberdas.services import (
+    support_ott,
+    required_personal_data,
+    current_user
+)
 
 
 class MaintenanceCollection:
@@ -35,7 +39,7 @@ class MaintenanceCollection:
         # Получаем пользовательские данные
         data = req.get_media()
 
-        user = dbses.query(User).filter_by(id = uid).first()
+        user = current_user(req)
         bld, room = user.building, user.room
 
         # Добавляем обращение в базу данных
@@ -1,6 +1,7 @@
 import falcon
 
 from cyberdas.models import Queue
+from cyberdas.utils.etag import content_etag, not_modified
 
 
 class Collection:
@@ -13,9 +14,11 @@ class Collection:
         '''
         dbses = req.context.session
 
-        queues = dbses.query(Queue).all()
+        queues = [queue.as_dict() for queue in dbses.query(Queue).all()]
+        if not_modified(req, resp, content_etag(queues)):
+            return
 
-        resp.media = [queue.as_dict() for queue in queues]
+        resp.media = queues
         resp.status = falcon.HTTP_200
 
 
@@ -38,5 +41,9 @@ class Item:
             resp.status = falcon.HTTP_404
             return
 
-        resp.media = queue_obj.as_dict()
+        queue_dict = queue_obj.as_dict()
+        if not_modified(req, resp, content_etag(queue_dict)):
+            return
+
+        resp.media = queue_dict
         resp.status = falcon.HTTP_200
@@ -0,0 +1,33 @@
+import falcon
+
+from cyberdas.services import SessionManager
+
+
+def _format_session(ses, current_sid):
+    'Скрывает идентификатор сессии и отмечает текущую сессию'
+    return {
+        'ip': ses.ip, 'agent': ses.user_agent,
+        'created_at': ses.created_at.isoformat('T'),
+        'last_seen': ses.last_seen.isoformat('T') if ses.last_seen else None,
+        'expires': ses.expires.isoformat('T'),
+        'current': ses.sid == current_sid
+    }
+
+
+class Collection:
+
+    def __init__(self, ses_manager: SessionManager):
+        self.ses_manager = ses_manager
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response):
+        '''
+        Возвращает список действующих сессий пользователя, начиная с самой
+        свежей
+        '''
+        dbses = req.context.session
+        user = req.context.user
+
+        sessions = self.ses_manager.active(dbses, user['uid'])
+
+        resp.media = [_format_session(ses, user['sid']) for ses in sessions]
+        resp.status = falcon.HTTP_200
@@ -1,16 +1,374 @@
-from datetime import datetime, date, timedelta
+import json
+from os import path
+from time import monotonic
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime, date, time, timedelta
 
 import falcon
-from sqlalchemy import Date, cast
+from falcon.media.validators import jsonschema
+from sqlalchemy import (
+    and_, exists, not_, or_, update, text, func, tuple_, select, union_all,
+    null, bindparam, DateTime
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import contains_eager
 
-from cyberdas.models import Slot, Queue, User
-from cyberdas.services import MailFactory, support_ott, auth_on_token
+from cyberdas.models import Slot, SlotHistory, Queue, User, WaitlistEntry
+from cyberdas.services import (
+    MailFactory,
+    support_ott,
+    auth_on_token,
+    required_admin,
+    mark_changed,
+    current_user,
+    remember_user,
+    SlotEvents
+)
 from cyberdas.utils.format_time import format_time
+from cyberdas.utils.parse_time import parse_time
+from cyberdas.utils.recurrence import slot_id, slot_time, slot_times, is_slot
+from cyberdas.utils.etag import content_etag, not_modified
+
+# На сколько дней вперед возвращаются слоты очереди с расписанием, если в
+# запросе не указан промежуток дат
+RECURRING_HORIZON = 7
+
+# Добавляет в очередь слоты на те моменты времени из переданного массива, на
+# которые в ней ещё нет слотов, в том числе перенесенных в историю.
+# Идентификаторы новых слотов продолжают существующие, чтобы не совпасть с
+# идентификаторами слотов из истории
+insert_slots = text('''
+    INSERT INTO slots (queue_name, id, time)
+    SELECT :queue,
+           greatest(
+               (SELECT coalesce(max(id), -1) FROM slots
+                WHERE queue_name = :queue),
+               (SELECT coalesce(max(id), -1) FROM slots_history
+                WHERE queue_name = :queue)
+           ) + row_number() OVER (ORDER BY new.time),
+           new.time
+    FROM unnest(CAST(:times AS timestamp[])) AS new(time)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM slots WHERE queue_name = :queue AND time = new.time
+    ) AND NOT EXISTS (
+        SELECT 1 FROM slots_history
+        WHERE queue_name = :queue AND time = new.time
+    )
+''')
+
+# Удаляет из очереди свободные слоты на моменты времени, отсутствующие в
+# переданном массиве. Занятые и удерживаемые до сих пор слоты не удаляются
+delete_slots = text('''
+    DELETE FROM slots
+    WHERE queue_name = :queue AND user_id IS NULL
+          AND (held_by IS NULL OR held_until <= :now)
+          AND time <> ALL(CAST(:times AS timestamp[]))
+''')
+
+
+def parse_times(times):
+    '''
+    Преобразует массив строк в формате RFC 3339 в отсортированный список
+    уникальных моментов времени. Время с часовым поясом переводится в
+    локальное, так как слоты хранятся без него. Возвращает HTTP 400, если
+    какая-то из строк не является датой и временем.
+
+    Аргументы:
+        times(list, необходим): массив строк с датой и временем
+    '''
+    parsed = set()
+    for value in times:
+        try:
+            moment = parse_time(value)
+        except ValueError:
+            raise falcon.HTTPBadRequest(
+                description = f'Неверный формат даты и времени: {value}'
+            )
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo = None)
+        parsed.add(moment)
+    return sorted(parsed)
+
+
+# Размер страницы по умолчанию и максимальный размер страницы слотов
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Сколько слотов за раз читается из БД при потоковой выдаче
+STREAM_CHUNK = 1000
+
+
+# Текущее время, подставляемое в запрос при его выполнении, а не при
+# построении, чтобы условия из констант модуля не устаревали
+NOW = bindparam('now', callable_ = datetime.now, type_ = DateTime)
+
+
+def slot_free(table):
+    '''
+    Возвращает условие, при котором слот свободен: он не занят и не
+    удерживается. Истёкшие удержания при чтении не снимаются, а просто не
+    учитываются, так что чтение слотов не пишет в БД
+
+    Аргументы:
+        table(необходим): таблица слотов, см. slot_table
+    '''
+    return and_(table.c.user_id.is_(None),
+                or_(table.c.held_by.is_(None), table.c.held_until <= NOW))
+
+
+def slot_columns(table):
+    '''
+    Возвращает колонки, достаточные для представления слота в списке
+
+    Аргументы:
+        table(необходим): таблица слотов, см. slot_table
+    '''
+    return (table.c.id, table.c.time, slot_free(table).label('free'))
+
+
+def slot_table(history):
+    '''
+    Возвращает таблицу слотов или, если нужны и перенесенные в историю слоты,
+    объединение таблиц slots и slots_history с теми же колонками. Слоты в
+    истории не удерживаются.
+
+    Аргументы:
+        history(bool, необходим): включать ли слоты из истории
+    '''
+    live = Slot.__table__
+    if not history:
+        return live
+    past = SlotHistory.__table__
+    return union_all(
+        select([live.c.queue_name, live.c.id, live.c.time, live.c.user_id,
+                live.c.held_by, live.c.held_until]),
+        select([past.c.queue_name, past.c.id, past.c.time, past.c.user_id,
+                null().label('held_by'), null().label('held_until')])
+    ).alias('all_slots')
+
+
+def reaches_history(start):
+    '''
+    Проверяет, может ли промежуток дат, начинающийся со start, включать
+    перенесенные в историю слоты. Скрипт archive_slots переносит только
+    прошедшие слоты, так что запросы начиная с сегодняшнего дня читают лишь
+    таблицу slots.
+
+    Аргументы:
+        start(datetime, необходим): начало промежутка или None, если
+            запрашиваются все слоты
+    '''
+    return start is None or start < datetime.combine(date.today(), time.min)
+
+
+# Условие свободного слота и колонки для списка слотов таблицы slots в
+# терминах модели, чтобы их можно было использовать в запросах через ORM
+SLOT_FREE = and_(Slot.user_id.is_(None),
+                 or_(Slot.held_by.is_(None), Slot.held_until <= NOW))
+SLOT_COLUMNS = (Slot.id, Slot.time, SLOT_FREE.label('free'))
+
+
+def serialize_slots(rows):
+    '''
+    Сериализует строки (id, time, free) в формат Slot.as_dict за один проход,
+    не создавая ORM-объектов.
+
+    Аргументы:
+        rows(iterable, необходим): строки с колонками SLOT_COLUMNS
+    '''
+    return [{'id': id, 'time': start.isoformat('T'), 'free': free}
+            for id, start, free in rows]
+
+
+def encode_cursor(row):
+    '''
+    Возвращает непрозрачный курсор, указывающий на позицию после слота.
+
+    Аргументы:
+        row(tuple, необходим): строка с колонками SLOT_COLUMNS
+    '''
+    position = f'{row[1].isoformat()}/{row[0]}'
+    return urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    '''
+    Возвращает пару (time, id), закодированную в курсоре, или HTTP 400, если
+    курсор поврежден.
+
+    Аргументы:
+        cursor(str, необходим): курсор из параметров запроса
+    '''
+    try:
+        moment, id = urlsafe_b64decode(cursor.encode()).decode().split('/')
+        return parse_time(moment), int(id)
+    except ValueError:
+        raise falcon.HTTPInvalidParam('Поврежденный курсор', 'cursor')
+
+
+def stream_slots(engine, statement):
+    '''
+    Генерирует JSON-массив слотов по частям, читая их из БД курсором на
+    стороне сервера, так что в памяти одновременно находится не больше
+    STREAM_CHUNK слотов. Использует собственное соединение, так как тело ответа
+    читается уже после закрытия сессии запроса.
+
+    Аргументы:
+        engine(Engine, необходим): движок БД
+
+        statement(Select, необходим): запрос, выбирающий колонки SLOT_COLUMNS
+    '''
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results = True)
+        result = conn.execute(statement)
+        yield b'['
+        separator = b''
+        while True:
+            rows = result.fetchmany(STREAM_CHUNK)
+            if not rows:
+                break
+            yield separator + json.dumps(serialize_slots(rows))[1:-1].encode()
+            separator = b','
+        yield b']'
+
+
+def queue_etag(req, queue, expired = None):
+    '''
+    Возвращает ETag представления слотов очереди, зависящий только от версии
+    очереди, истекших удержаний и параметров запроса, так что его можно
+    проверить, не читая сами слоты.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+
+        queue(Queue, необходим): очередь
+
+        expired(datetime, опционально): время истечения самого позднего из уже
+            истекших удержаний слотов очереди
+    '''
+    # Без day слоты очереди с расписанием выдаются начиная с сегодняшнего дня
+    today = date.today().isoformat() if queue.recurring else None
+    expired = expired.isoformat() if expired is not None else None
+    return content_etag([req.path, queue.version, sorted(req.params.items()),
+                         today, expired])
+
+
+def expired_holds(dbses, queue):
+    '''
+    Возвращает время истечения самого позднего из уже истекших удержаний
+    слотов очереди или None, если удержаний не было. Истечение удержания
+    освобождает слот без изменения версии очереди, но каждое истечение меняет
+    это время, поэтому оно входит в ETag.
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        queue(Queue, необходим): очередь
+    '''
+    if queue.holds_until is None:
+        return None
+    # Когда истекли все удержания, слоты без изменения версии больше не
+    # меняются, и достаточно времени из строки очереди
+    if queue.holds_until <= datetime.now():
+        return queue.holds_until
+    slots = Slot.__table__
+    return dbses.execute(
+        select([func.max(slots.c.held_until)])
+        .where(and_(slots.c.queue_name == queue.name,
+                    slots.c.held_until.isnot(None),
+                    slots.c.held_until <= NOW))
+    ).scalar()
+
+
+def unchanged(req, resp, queue):
+    '''
+    Проверяет, не изменились ли слоты очереди с момента получения клиентом
+    ETag. Пока удержания слотов очереди не истекли, ETag учитывает время
+    последнего истекшего из них и требует одного запроса по частичному индексу
+    удерживаемых слотов; иначе таблица слотов не читается.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+
+        resp(falcon.Response, необходим): ответ на запрос
+
+        queue(Queue, необходим): очередь
+    '''
+    expired = expired_holds(req.context.session, queue)
+    return not_modified(req, resp, queue_etag(req, queue, expired))
+
+
+def current_uid(req):
+    '''
+    Возвращает идентификатор аутентифицированного пользователя или HTTP 401
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+    '''
+    if not req.context.user:
+        raise falcon.HTTPUnauthorized()
+    return req.context.user['uid']
+
+
+def date_range(req):
+    '''
+    Возвращает полуоткрытый интервал [start, end) из параметров запроса day и
+    offset или (None, None), если day не указан. Возвращает HTTP 400 при
+    неверных значениях параметров.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+    '''
+    day = req.get_param('day')
+    offset = req.get_param('offset')
+    if day is None and offset is not None:
+        raise falcon.HTTPBadRequest(description = 'Отсутствует параметр day')
+
+    if offset is not None and (int(offset) < 1 or int(offset) > 90):
+        raise falcon.HTTPBadRequest(description = 'Offset принимает значения от 1 до 90') # noqa
+
+    if day is None:
+        return None, None
+    start = datetime.combine(date.fromisoformat(day), time.min)
+    return start, start + timedelta(days = int(offset or 1))
+
+
+def horizon():
+    'Возвращает интервал, за который по умолчанию выдаются слоты с расписанием'
+    start = datetime.combine(date.today(), time.min)
+    return start, start + timedelta(days = RECURRING_HORIZON)
+
+
+def recurring_slots(queue, stored, start, end):
+    '''
+    Дополняет хранящиеся в БД слоты очереди с расписанием свободными слотами,
+    вычисленными по её расписанию в интервале [start, end).
+
+    Аргументы:
+        queue(Queue, необходим): очередь с расписанием
+
+        stored(list, необходим): строки с колонками SLOT_COLUMNS по слотам
+            очереди из БД за этот интервал
+
+        start(datetime, необходим): начало интервала
+
+        end(datetime, необходим): конец интервала
+    '''
+    slots = {row[0]: tuple(row) for row in stored}
+    for moment in slot_times(queue, start, end):
+        id = slot_id(moment)
+        slots.setdefault(id, (id, moment, True))
+    return sorted(slots.values(), key = lambda row: row[1])
 
 
 class Collection:
 
-    auth = {'disabled': 1}
+    auth = {'exempt_methods': ['GET']}
+
+    with open(path.abspath('cyberdas/static/slotsPut_schema.json'), 'r') as f:
+        put_schema = json.load(f)
+
+    with open(path.abspath('cyberdas/static/slotsPatch_schema.json'), 'r') as f: # noqa
+        patch_schema = json.load(f)
 
     def on_get(self, req, resp, queue):
         '''
@@ -30,41 +388,269 @@ class Collection:
 
             my (optional, in: query) - возвращать только слоты пользователя,
                 сделавшего запрос
+
+            limit (optional, in: query) - вернуть не больше limit слотов,
+                упорядоченных по времени; ссылка на следующую страницу
+                передается в заголовке Link
+
+            cursor (optional, in: query) - позиция, с которой начинается
+                страница, из ссылки на неё
+
+            stream (optional, in: query) - передавать слоты потоком, не
+                загружая их все в память
+
+        Слоты очередей с расписанием вычисляются по нему, поэтому без параметра
+        day для них возвращаются слоты на RECURRING_HORIZON дней вперед, а
+        постраничная и потоковая выдача к ним не применяются.
         '''
         dbses = req.context.session
 
         # Получаем параметры и проверяем ввод от пользователя
-        day = req.get_param('day')
-        offset = req.get_param('offset')
+        start, end = date_range(req)
         my = req.get_param_as_bool('my')
-        if day is None and offset is not None:
-            raise falcon.HTTPBadRequest(description = 'Отсутствует параметр day') # noqa
-
-        if offset is not None and (int(offset) < 1 or int(offset) > 90):
-            raise falcon.HTTPBadRequest(description = 'Offset принимает значения от 1 до 90') # noqa
+        limit = req.get_param_as_int('limit', min_value = 1,
+                                     max_value = MAX_PAGE_SIZE)
+        cursor = req.get_param('cursor')
+        stream = req.get_param_as_bool('stream')
 
-        # Базовый запрос - если нет параметров, то вернутся все слоты из очереди
-        slots = dbses.query(Slot).filter_by(queue_name = queue)
+        # Слоты пользователя зависят не только от версии очереди, поэтому
+        # ETag для них не используется
+        queue_obj = None
+        if not my:
+            queue_obj = dbses.query(Queue).filter_by(name = queue).first()
+        if queue_obj is not None and unchanged(req, resp, queue_obj):
+            return
+        recurring_queue = None
+        if queue_obj is not None and queue_obj.recurring:
+            recurring_queue = queue_obj
+            if start is None:
+                start, end = horizon()
 
-        # Если предоставлен только day, возвращаем слоты за указанный день
-        if day is not None and offset is None:
-            day = date.fromisoformat(day)
-            slots = slots.filter(cast(Slot.time, Date) == day)
+        # Базовый запрос - если нет параметров, то вернутся все слоты из
+        # очереди. Перенесенные в историю слоты читаются, только если
+        # промежуток дат может их включать
+        table = slot_table(reaches_history(start))
+        slots = dbses.query(*slot_columns(table)).filter(
+            table.c.queue_name == queue
+        )
 
-        # Если предоставлен day и offset, возвращаем слайс слотов
-        if day is not None and offset is not None:
-            start = date.fromisoformat(day)
-            end = start + timedelta(days = (int(offset) - 1))
-            slots = slots.filter(cast(Slot.time, Date).between(start, end))
+        # Если предоставлен day, возвращаем слоты за этот день, а если вместе с
+        # ним и offset - за offset дней, начиная с него. Сравниваем само время
+        # с полуоткрытым интервалом, а не приведенную к дате колонку, чтобы
+        # можно было использовать индекс по (queue_name, time)
+        if start is not None:
+            slots = slots.filter(table.c.time >= start, table.c.time < end)
 
         # Если есть флаг `my`, оставляем только слоты пользователя
         if my:
-            if req.context.user:
-                slots = slots.filter_by(user_id = req.context.user['uid'])
-            else:
-                raise falcon.HTTPUnauthorized()
+            slots = slots.filter(table.c.user_id == current_uid(req))
 
-        resp.media = [slot.as_dict() for slot in slots.all()]
+        # Свободные слоты очереди с расписанием не хранятся в БД
+        if recurring_queue is not None:
+            slots = recurring_slots(recurring_queue, slots.all(), start, end)
+        elif stream:
+            slots = slots.order_by(table.c.time, table.c.id)
+            resp.content_type = falcon.MEDIA_JSON
+            resp.stream = stream_slots(dbses.get_bind(), slots.statement)
+            resp.status = falcon.HTTP_200
+            return
+        elif limit is not None or cursor is not None:
+            slots = self.paginate(req, resp, slots, table, limit or PAGE_SIZE,
+                                  cursor)
+        else:
+            slots = slots.all()
+
+        resp.media = serialize_slots(slots)
+        resp.status = falcon.HTTP_200
+
+    def paginate(self, req, resp, slots, table, limit, cursor):
+        '''
+        Возвращает страницу слотов при постраничной выдаче по ключу (time, id),
+        которой, в отличие от OFFSET, не нужно просматривать предыдущие
+        страницы. Ссылку на следующую страницу, если она есть, добавляет в
+        заголовок Link.
+
+        Аргументы:
+            req(falcon.Request, необходим): текущий запрос
+
+            resp(falcon.Response, необходим): ответ на запрос
+
+            slots(Query, необходим): запрос, выбирающий колонки slot_columns
+
+            table(необходим): таблица слотов, из которой выбирает запрос
+
+            limit(int, необходим): размер страницы
+
+            cursor(str, опционально): курсор из ссылки на страницу
+        '''
+        slots = slots.order_by(table.c.time, table.c.id)
+        if cursor is not None:
+            slots = slots.filter(
+                tuple_(table.c.time, table.c.id) > decode_cursor(cursor)
+            )
+        page = slots.limit(limit + 1).all()
+        if len(page) > limit:
+            page = page[:limit]
+            params = dict(req.params, cursor = encode_cursor(page[-1]))
+            resp.append_link(req.path + falcon.to_query_str(params), 'next')
+        return page
+
+    def lock_queue(self, dbses, queue):
+        '''
+        Блокирует очередь до конца транзакции, чтобы одновременные изменения её
+        слотов не выдали одинаковые идентификаторы. Возвращает HTTP 404, если
+        очереди не существует, и HTTP 409, если её слоты вычисляются по
+        расписанию.
+
+        Аргументы:
+            dbses(Session, необходим): сессия БД
+
+            queue(str, необходим): имя очереди
+        '''
+        queue_obj = (dbses.query(Queue).filter_by(name = queue)
+                     .with_for_update().first())
+        if queue_obj is None:
+            raise falcon.HTTPNotFound()
+        if queue_obj.recurring:
+            raise falcon.HTTPConflict(
+                description = 'Слоты очереди вычисляются по её расписанию'
+            )
+        return queue_obj
+
+    @falcon.before(required_admin)
+    @jsonschema.validate(put_schema)
+    def on_put(self, req, resp, queue):
+        '''
+        Создает или заменяет коллекцию слотов очереди. После запроса в очереди
+        есть слоты ровно на переданные моменты времени, за исключением занятых
+        слотов, которые сохраняются в любом случае.
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+
+            body (required, in: body) - массив с датой и временем начала слотов
+        '''
+        dbses = req.context.session
+        log = req.context.logger
+
+        times = parse_times(req.get_media())
+        self.lock_queue(dbses, queue)
+        existed = dbses.query(exists().where(Slot.queue_name == queue)).scalar()
+        # Заодно снимаем истёкшие удержания, чтобы клиенты потока событий
+        # узнали об освободившихся слотах
+        release_holds(dbses, queue, Slot.held_until <= datetime.now())
+
+        params = {'queue': queue, 'times': times}
+        deleted = dbses.execute(delete_slots,
+                                dict(params, now = datetime.now())).rowcount
+        inserted = dbses.execute(insert_slots, params).rowcount
+        if deleted or inserted:
+            mark_changed(dbses, queue)
+        log.info(f"[СЛОТЫ ЗАМЕНЕНЫ] queue {queue}, +{inserted} -{deleted}")
+        resp.status = falcon.HTTP_204 if existed else falcon.HTTP_201
+
+    @falcon.before(required_admin)
+    @jsonschema.validate(patch_schema)
+    def on_patch(self, req, resp, queue):
+        '''
+        Добавляет в очередь слоты на переданные моменты времени, если их там
+        ещё нет.
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+
+            body (required, in: body) - массив с датой и временем начала слотов
+        '''
+        dbses = req.context.session
+        log = req.context.logger
+
+        times = parse_times(req.get_media())
+        self.lock_queue(dbses, queue)
+
+        params = {'queue': queue, 'times': times}
+        inserted = dbses.execute(insert_slots, params).rowcount
+        if inserted:
+            mark_changed(dbses, queue)
+        log.info(f"[СЛОТЫ ДОБАВЛЕНЫ] queue {queue}, +{inserted}")
+        resp.status = falcon.HTTP_204
+
+
+def recurring_summary(queue, counts, start, end):
+    '''
+    Возвращает количество всех и свободных слотов очереди с расписанием по
+    дням интервала [start, end). Общее количество вычисляется по расписанию, а
+    количество занятых берется из БД.
+
+    Аргументы:
+        queue(Queue, необходим): очередь с расписанием
+
+        counts(list, необходим): строки (day, total, free) по слотам очереди
+            из БД за этот интервал
+
+        start(datetime, необходим): начало интервала
+
+        end(datetime, необходим): конец интервала
+    '''
+    reserved = {row.day.date(): row.total - row.free for row in counts}
+    totals = dict()
+    for moment in slot_times(queue, start, end):
+        totals[moment.date()] = totals.get(moment.date(), 0) + 1
+    return [{'day': day.isoformat(), 'total': total,
+             'free': max(total - reserved.get(day, 0), 0)}
+            for day, total in totals.items()]
+
+
+class Summary:
+
+    auth = {'disabled': 1}
+
+    def on_get(self, req, resp, queue):
+        '''
+        Возвращает количество всех и свободных слотов очереди по дням, в
+        которые у неё есть слоты. Поддерживает ETag, зависящий от версии
+        очереди.
+
+        Параметры:
+
+            queue (required, in: path) - имя запрашиваемой очереди
+
+            day (optional, in: query) - первый день промежутка дат; если не
+                указан, возвращается информация обо всех днях
+
+            offset (optional, in: query) - длина промежутка дат в днях
+        '''
+        dbses = req.context.session
+        start, end = date_range(req)
+
+        queue_obj = dbses.query(Queue).filter_by(name = queue).first()
+        if queue_obj is None:
+            raise falcon.HTTPNotFound()
+        if unchanged(req, resp, queue_obj):
+            return
+        if start is None and queue_obj.recurring:
+            start, end = horizon()
+
+        # Считаем слоты по дням одним запросом, не передавая сами слоты из БД
+        table = slot_table(reaches_history(start))
+        day = func.date_trunc('day', table.c.time).label('day')
+        counts = dbses.query(
+            day,
+            func.count().label('total'),
+            func.count().filter(slot_free(table)).label('free')
+        ).filter(table.c.queue_name == queue)
+        if start is not None:
+            counts = counts.filter(table.c.time >= start, table.c.time < end)
+        counts = counts.group_by(day).order_by(day).all()
+
+        if queue_obj.recurring:
+            summary = recurring_summary(queue_obj, counts, start, end)
+        else:
+            summary = [{'day': row.day.date().isoformat(), 'total': row.total,
+                        'free': row.free} for row in counts]
+
+        resp.media = summary
         resp.status = falcon.HTTP_200
 
 
@@ -84,14 +670,199 @@ class Item:
         '''
         dbses = req.context.session
 
-        slot = dbses.query(Slot).filter_by(queue_name = queue, id = id).first()
-        if slot is None:
+        queue_obj = dbses.query(Queue).filter_by(name = queue).first()
+        if queue_obj is None:
             resp.status = falcon.HTTP_404
             return
+        if unchanged(req, resp, queue_obj):
+            return
+
+        slot = dbses.query(Slot).filter_by(queue_name = queue, id = id).first()
+        if slot is None:
+            slot = self.archived(dbses, queue, id)
+        if slot is None:
+            # Свободные слоты очереди с расписанием не хранятся в БД
+            moment = slot_time(id)
+            if not queue_obj.recurring or not is_slot(queue_obj, moment):
+                resp.status = falcon.HTTP_404
+                return
+            slot = Slot(queue_name = queue, id = slot_id(moment), time = moment)
 
         resp.media = slot.as_dict()
         resp.status = falcon.HTTP_200
 
+    def archived(self, dbses, queue, id):
+        '''
+        Возвращает перенесенный в историю слот очереди в виде несохраняемого
+        объекта Slot или None, если в истории его нет.
+
+        Аргументы:
+            dbses(Session, необходим): сессия БД
+
+            queue(str, необходим): имя очереди
+
+            id(int, необходим): идентификатор слота
+        '''
+        past = dbses.query(SlotHistory).filter_by(queue_name = queue,
+                                                  id = id).first()
+        if past is None:
+            return None
+        return Slot(queue_name = queue, id = id, time = past.time,
+                    user_id = past.user_id)
+
+
+# Через сколько миллисекунд клиент переподключается к закрывшемуся потоку
+# событий
+EVENTS_RETRY = 3000
+
+
+def sse_message(version, event, data):
+    'Возвращает сообщение потока Server-Sent Events'
+    return f'id: {version}\nevent: {event}\ndata: {json.dumps(data)}\n\n'.encode() # noqa
+
+
+def last_event_id(req):
+    '''
+    Возвращает версию очереди из заголовка Last-Event-ID, None, если
+    заголовка нет, или HTTP 400, если он не является числом.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+    '''
+    last = req.get_header('Last-Event-ID')
+    if last is None:
+        return None
+    try:
+        return int(last)
+    except ValueError:
+        raise falcon.HTTPInvalidHeader('Ожидается версия очереди',
+                                       'Last-Event-ID')
+
+
+def event_stream(events, queue, version, reset = False):
+    '''
+    Генерирует поток Server-Sent Events с изменениями слотов очереди после
+    указанной версии. Изменения отдельных слотов передаются событиями `slot`
+    с данными {id, free}, а событие `reset` означает, что слоты нужно
+    запросить заново. Идентификатором сообщений служит версия очереди, так что
+    переподключившийся клиент передает её в заголовке Last-Event-ID.
+
+    Аргументы:
+        events(SlotEvents, необходим): рассылка изменений слотов
+
+        queue(str, необходим): имя очереди
+
+        version(int, необходим): версия очереди, с которой начинается поток
+
+        reset(bool, опционально): начать поток с события `reset`
+    '''
+    yield f'retry: {EVENTS_RETRY}\nid: {version}\n\n'.encode()
+    if reset:
+        yield sse_message(version, 'reset', {})
+    deadline = monotonic() + events.lifetime
+    while monotonic() < deadline:
+        timeout = min(events.keepalive, deadline - monotonic())
+        pending = events.after(queue, version, timeout)
+        if not pending:
+            yield b': keepalive\n\n'
+            continue
+        for next_version, slots in pending:
+            # Пропуск в версиях означает, что часть событий потеряна
+            if slots is None or next_version != version + 1:
+                yield sse_message(next_version, 'reset', {})
+            else:
+                for slot in slots:
+                    yield sse_message(next_version, 'slot', slot)
+            version = next_version
+
+
+class EventStream:
+
+    '''
+    Тело ответа с потоком Server-Sent Events. Занятое потоком место
+    освобождается, когда сервер закрывает ответ, - в том числе если клиент
+    отключился раньше, чем поток начал передаваться.
+    '''
+
+    def __init__(self, events, queue, version, reset = False):
+        self.events = events
+        self._stream = event_stream(events, queue, version, reset)
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._stream)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._stream.close()
+        self.events.close()
+
+
+class Events:
+
+    auth = {'disabled': 1}
+
+    def __init__(self, events: SlotEvents):
+        self.events = events
+
+    def on_get(self, req, resp, queue):
+        '''
+        Открывает поток Server-Sent Events с изменениями слотов очереди,
+        заменяющий периодические запросы списка слотов. Поток закрывается через
+        `slots.events.lifetime` секунд, после чего клиент переподключается и
+        получает пропущенные за это время события. Если процесс уже держит
+        открытыми `slots.events.streams` потоков, возвращается HTTP 503 с
+        заголовком Retry-After и ссылкой на список слотов в заголовке Link:
+        до повторной попытки клиент опрашивает его с If-None-Match.
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+
+            Last-Event-ID (optional, in: header) - версия очереди, после
+                которой нужно передать изменения
+        '''
+        dbses = req.context.session
+
+        queue_obj = dbses.query(Queue).filter_by(name = queue).first()
+        if queue_obj is None:
+            raise falcon.HTTPNotFound()
+        version = queue_obj.version
+        last = last_event_id(req)
+        reset = False
+        # Пропущенные клиентом события передаются из хранящихся в процессе, а
+        # если их уже нет - клиент получает событие reset
+        if last is not None and last != version:
+            if last < version and self.events.covers(queue, last):
+                version = last
+            else:
+                reset = True
+
+        self.events.listen(dbses.get_bind())
+        if not self.events.open():
+            # Поток занимает поток обработчика, поэтому сверх лимита клиенты
+            # опрашивают список слотов с If-None-Match: пока слоты не
+            # изменились, такой запрос получает HTTP 304 по версии очереди
+            raise falcon.HTTPServiceUnavailable(
+                description = 'Слишком много открытых потоков событий. '
+                              'Опрашивайте список слотов с заголовком '
+                              'If-None-Match и откройте поток позже',
+                retry_after = self.events.retry_after,
+                headers = {'Link': f'</queues/{queue}/slots>; '
+                                   'rel="alternate"'}
+            )
+        resp.content_type = 'text/event-stream'
+        resp.cache_control = ['no-cache']
+        # Запрещаем nginx буферизовать поток
+        resp.set_header('X-Accel-Buffering', 'no')
+        resp.stream = EventStream(self.events, queue, version, reset)
+        resp.status = falcon.HTTP_200
+
 
 reserve_mail_args = {
     'sender': 'notify',
@@ -114,14 +885,13 @@ def send_notify_reserve(req, resp, resource):
     ссылку с токеном на отмену записи.
 
     Позволяет связать POST и DELETE для неаутентифицированных пользователей.
+    Адрес пользователя, название очереди и время слота берутся из контекста
+    ответа, куда их помещает обработчик, так что хук не обращается к БД.
     '''
     if resp.status == falcon.HTTP_201:
-        dbses = req.context.session
-        uid = req.context.user['uid']
         mail_sender = resource.reserve_mail
 
-        user = dbses.query(User).filter_by(id = uid).first()
-        email = user.email
+        email = resp.context['email']
         data = {'email': email}
         transaction_url = req.path[1:]  # убираем слэш в начале
         template_data = {'queue_title': resp.context['queue_title'].lower(),
@@ -130,27 +900,290 @@ def send_notify_reserve(req, resp, resource):
                          transaction_url = transaction_url)
 
 
+def send_notify_promote(req, resp, resource):
+    '''
+    Отправляет пользователю, получившему слот из списка ожидания, такое же
+    письмо, как при записи в очередь, со ссылкой на отмену записи.
+    '''
+    if 'promoted' in resp.context:
+        email = resp.context['promoted_email']
+        template_data = {'queue_title': resp.context['queue_title'].lower(),
+                         'slot_date': format_time(resp.context['slot_date'])}
+        resource.reserve_mail.send(req, email, {'email': email},
+                                   template_data = template_data,
+                                   transaction_url = req.path[1:])
+
+
 def send_notify_delete(req, resp, resource):
     '''
-    Отправляет уведомление об отмене записи в очередь.
+    Отправляет уведомление об отмене записи в очередь. Пользователь берется
+    из кэша запроса, а название очереди и время слота - из контекста ответа,
+    так что хук не обращается к БД.
     '''
     if resp.status == falcon.HTTP_204:
-        dbses = req.context.session
-        uid = req.context.user['uid']
         mail_sender = resource.delete_mail
 
-        user = dbses.query(User).filter_by(id = uid).first()
-        queue = dbses.query(Queue).filter_by(name = resp.context['queue']).first() # noqa
-
-        template_data = {'queue_title': queue.title.lower(),
+        user = current_user(req)
+        template_data = {'queue_title': resp.context['queue_title'].lower(),
                          'slot_date': format_time(resp.context['slot_date'])}
         mail_sender.send(user.email, req.context.logger,
                          template_data = template_data)
 
 
+def available(queue, id, uid, now):
+    '''
+    Возвращает условие UPDATE, при котором пользователь может занять или
+    удержать слот: слот свободен, не истёк, не удерживается другим
+    пользователем и не нарушает правил `only_once` и `only_one_active`
+    очереди.
+
+    Аргументы:
+        queue(str, необходим): имя очереди
+
+        id(int, необходим): идентификатор слота
+
+        uid(int, необходим): идентификатор пользователя
+
+        now(datetime, необходим): текущее время
+    '''
+    slots = Slot.__table__
+    queues = Queue.__table__
+    other = slots.alias('other')
+    past = SlotHistory.__table__
+    # Записи в прошедшие слоты могли быть перенесены в историю
+    has_slots = or_(
+        exists().where(and_(other.c.queue_name == queue,
+                            other.c.user_id == uid)),
+        exists().where(and_(past.c.queue_name == queue,
+                            past.c.user_id == uid))
+    )
+    has_active = exists().where(and_(other.c.queue_name == queue,
+                                     other.c.user_id == uid,
+                                     other.c.time > now))
+    return and_(
+        slots.c.queue_name == queue,
+        slots.c.id == id,
+        slots.c.user_id.is_(None),
+        slots.c.time >= now,
+        or_(slots.c.held_by.is_(None), slots.c.held_by == uid,
+            slots.c.held_until <= now),
+        queues.c.name == slots.c.queue_name,
+        or_(not_(queues.c.only_once), not_(has_slots)),
+        or_(not_(queues.c.only_one_active), not_(has_active))
+    )
+
+
+# Удаляет из списка ожидания очереди и возвращает пользователя, ожидающего
+# дольше всех. Записи, заблокированные параллельными транзакциями, пропускаются
+pop_waitlist = text('''
+    DELETE FROM waitlist
+    WHERE (queue_name, user_id) = (
+        SELECT queue_name, user_id FROM waitlist
+        WHERE queue_name = :queue
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING user_id
+''')
+
+
+def promote(dbses, queue, id):
+    '''
+    Резервирует освободившийся слот за первым пользователем из списка
+    ожидания очереди, которому это позволяют правила очереди. Пользователи,
+    которым слот отдать нельзя, удаляются из списка: они уже записались в
+    очередь. Возвращает строку (user_id, time, title, email) по
+    зарезервированному слоту или None.
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        queue(str, необходим): имя очереди
+
+        id(int, необходим): идентификатор освободившегося слота
+    '''
+    now = datetime.now()
+    while True:
+        uid = dbses.execute(pop_waitlist, {'queue': queue}).scalar()
+        if uid is None:
+            return None
+        reserved = dbses.execute(reserve_statement(queue, id, uid, now)).first()
+        if reserved is not None:
+            return reserved
+
+
+def reserve_statement(queue, id, uid, now):
+    '''
+    Возвращает UPDATE, резервирующий доступный пользователю слот и снимающий
+    с него удержание. Если слот удалось зарезервировать, запрос возвращает
+    пользователя, время начала слота, название очереди и адрес пользователя
+    для письма о записи, иначе - ни одной строки.
+
+    Аргументы:
+        queue(str, необходим): имя очереди
+
+        id(int, необходим): идентификатор слота
+
+        uid(int, необходим): идентификатор пользователя
+
+        now(datetime, необходим): текущее время
+    '''
+    slots = Slot.__table__
+    users = User.__table__
+    return (
+        update(slots)
+        .where(and_(available(queue, id, uid, now), users.c.id == uid))
+        .values(user_id = uid, held_by = None, held_until = None)
+        .returning(slots.c.user_id, slots.c.time, Queue.__table__.c.title,
+                   users.c.email)
+    )
+
+
+def hold_statement(queue, id, uid, now, until):
+    '''
+    Возвращает UPDATE, удерживающий доступный пользователю слот до момента
+    `until`. Повторное удержание продлевает его. Если слот удалось удержать,
+    запрос возвращает время истечения удержания, иначе - ни одной строки.
+
+    Аргументы:
+        queue(str, необходим): имя очереди
+
+        id(int, необходим): идентификатор слота
+
+        uid(int, необходим): идентификатор пользователя
+
+        now(datetime, необходим): текущее время
+
+        until(datetime, необходим): время истечения удержания
+    '''
+    slots = Slot.__table__
+    return (
+        update(slots)
+        .where(available(queue, id, uid, now))
+        .values(held_by = uid, held_until = until)
+        .returning(slots.c.held_until)
+    )
+
+
+def release_holds(dbses, queue, *condition):
+    '''
+    Снимает удержания со слотов очереди, удовлетворяющих условию, одним
+    UPDATE по частичному индексу удерживаемых слотов. Возвращает
+    идентификаторы освобожденных слотов.
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        queue(str, необходим): имя очереди
+
+        condition(необходим): дополнительные условия на удерживаемые слоты
+    '''
+    slots = Slot.__table__
+    released = dbses.execute(
+        update(slots)
+        .where(and_(slots.c.queue_name == queue,
+                    slots.c.held_until.isnot(None), *condition))
+        .values(held_by = None, held_until = None)
+        .returning(slots.c.id)
+    ).fetchall()
+    for row in released:
+        mark_changed(dbses, queue, {'id': row.id, 'free': True})
+    return [row.id for row in released]
+
+
+def materialize(dbses, queue, id):
+    '''
+    Создает в БД свободный слот очереди с расписанием, если он есть в её
+    расписании. Возвращает True, если слот существует в БД после вызова.
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        queue(str, необходим): имя очереди
+
+        id(int, необходим): идентификатор слота
+    '''
+    queue_obj = dbses.query(Queue).filter_by(name = queue).first()
+    moment = slot_time(id)
+    if (
+        queue_obj is None or not queue_obj.recurring
+        or not is_slot(queue_obj, moment)
+    ):
+        return False
+    dbses.execute(
+        insert(Slot.__table__)
+        .values(queue_name = queue, id = slot_id(moment), time = moment)
+        .on_conflict_do_nothing()
+    )
+    return True
+
+
+def refuse(dbses, resp, log, info, queue, id, uid):
+    '''
+    Выясняет, почему слот не удалось зарезервировать или удержать, и сообщает
+    об этом пользователю. Вызывается только после неудачной попытки, так что
+    не замедляет успешные запросы.
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        resp(falcon.Response, необходим): ответ на запрос
+
+        log(Logger, необходим): логгер запроса
+
+        info(str, необходим): описание запроса для логов
+
+        queue(str, необходим): имя очереди
+
+        id(int, необходим): идентификатор слота
+
+        uid(int, необходим): идентификатор пользователя
+    '''
+    slot = dbses.query(Slot).filter_by(queue_name = queue, id = id).first()
+    if slot is None:
+        resp.status = falcon.HTTP_404
+        return
+    resp.context['slot_date'] = slot.time
+    now = datetime.now()
+
+    # Проверяем, не пытается ли пользователь забронировать `вчерашний` слот
+    if slot.time < now:
+        log.debug(f"[ИСТЁКШИЙ СЛОТ] {info}")
+        raise falcon.HTTPForbidden(description = 'Слот истёк')
+
+    # Проверяем, что слот свободен
+    if slot.user_id is not None:
+        log.debug(f"[ЗАНЯТЫЙ СЛОТ] {info}")
+        raise falcon.HTTPForbidden(description = 'Слот занят')
+
+    # Проверяем, что слот не удерживается другим пользователем
+    if slot.held_by not in (None, uid) and slot.held_until > now:
+        log.debug(f"[УДЕРЖАННЫЙ СЛОТ] {info}")
+        raise falcon.HTTPForbidden(
+            description = 'Слот временно удерживается другим пользователем'
+        )
+
+    # Иначе слот не был зарезервирован из-за правил очереди
+    queue_obj = slot.queue
+    if queue_obj.only_once:
+        log.debug(f"[ONLY ONCE] {info}")
+        raise falcon.HTTPForbidden(
+            description = 'Вы уже записались в эту очередь'
+        )
+    log.debug(f"[ONLY ONE ACTIVE] {info}")
+    raise falcon.HTTPForbidden(
+        description = 'У вас уже есть предстоящая запись в эту очередь' # noqa
+    )
+
+
 class Reserve:
 
     auth = {'disabled': 1}
+    # Резервирования слотов одной очереди обрабатываются ограниченно и в
+    # порядке поступления, чтобы наплыв запросов при открытии записи не занял
+    # все соединения с БД
+    admission = {'methods': ['POST'], 'key': 'queue'}
 
     def __init__(self, mail_factory: MailFactory):
         self.reserve_mail = mail_factory.new_transaction(**reserve_mail_args)
@@ -185,50 +1218,34 @@ class Reserve:
         user = req.context.user
         info = "uid %s, queue %s, id %s" % (user['uid'], queue, id)
 
-        slot = dbses.query(Slot).filter_by(queue_name = queue, id = id).first()
-        if slot is None:
-            resp.status = falcon.HTTP_404
+        # Резервируем слот одним условным UPDATE: проверки того, что слот
+        # свободен, не истёк и не нарушает правил очереди, выполняются в БД
+        # атомарно с записью, поэтому из двух одновременных запросов на один
+        # слот успешным будет только один
+        statement = reserve_statement(queue, id, user['uid'], datetime.now())
+        reserved = dbses.execute(statement).first()
+        # Свободные слоты очередей с расписанием не хранятся в БД, поэтому
+        # создаем слот и повторяем попытку
+        if reserved is None and materialize(dbses, queue, id):
+            reserved = dbses.execute(statement).first()
+        if reserved is None:
+            refuse(dbses, resp, log, info, queue, id, user['uid'])
             return
-        resp.context['slot_date'] = slot.time
-
-        # Проверяем, не пытается ли пользователь забронировать `вчерашний` слот
-        if slot.time < datetime.now():
-            log.debug(f"[ИСТЁКШИЙ СЛОТ] {info}")
-            raise falcon.HTTPForbidden(description = 'Слот истёк')
-
-        # Проверяем, что слот свободен
-        if slot.user_id is not None:
-            log.debug(f"[ЗАНЯТЫЙ СЛОТ] {info}")
-            raise falcon.HTTPForbidden(description = 'Слот занят')
 
-        queue_obj = dbses.query(Queue).filter_by(name = queue).first()
-        resp.context['queue_title'] = queue_obj.title
-        if queue_obj.only_once or queue_obj.only_one_active:
-            user_slots = dbses.query(Slot).filter_by(queue_name = queue,
-                                                     user_id = user['uid'])
-        # Для `only_once` очередей проверяем, что пользователь не имеет записей
-        if queue_obj.only_once:
-            if len(user_slots.all()) > 0:
-                log.debug(f"[ONLY ONCE] {info}")
-                raise falcon.HTTPForbidden(
-                    description = 'Вы уже записались в эту очередь'
-                )
-        # Для `only_one_active` очередей проверяем, что пользователь не имеет
-        # будущих записей
-        if queue_obj.only_one_active:
-            active_slots = user_slots.filter(Slot.time > datetime.now())
-            if len(active_slots.all()) > 0:
-                log.debug(f"[ONLY ONE ACTIVE] {info}")
-                raise falcon.HTTPForbidden(
-                    description = 'У вас уже есть предстоящая запись в эту очередь' # noqa
-                )
-
-        slot.user_id = user['uid']
+        resp.context['slot_date'] = reserved.time
+        resp.context['queue_title'] = reserved.title
+        resp.context['email'] = reserved.email
+        mark_changed(dbses, queue, {'id': int(id), 'free': False})
+        # Записавшемуся пользователю больше не нужен список ожидания
+        dbses.query(WaitlistEntry).filter_by(
+            queue_name = queue, user_id = user['uid']
+        ).delete()
         log.info(f"[БРОНЬ СОЗДАНА] {info}")
         resp.status = falcon.HTTP_201
 
     @falcon.before(auth_on_token('notify'))
     @falcon.after(send_notify_delete)
+    @falcon.after(send_notify_promote)
     def on_delete(self, req, resp, queue, id):
         '''
         Убирает резерв слота. Не позволяет убрать резерв со слотов, которые
@@ -245,11 +1262,17 @@ class Reserve:
         user = req.context.user
         info = "uid %s, queue %s, id %s" % (user['uid'], queue, id)
 
-        slot = dbses.query(Slot).filter_by(queue_name = queue, id = id).first()
+        # Очередь и занявшего слот пользователя загружаем тем же запросом: они
+        # нужны для писем об отмене записи
+        slot = (dbses.query(Slot).join(Slot.queue).outerjoin(Slot.holder)
+                .options(contains_eager(Slot.queue),
+                         contains_eager(Slot.holder))
+                .filter(Slot.queue_name == queue, Slot.id == id).first())
         if slot is None:
             resp.status = falcon.HTTP_404
             return
         resp.context['slot_date'] = slot.time
+        resp.context['queue_title'] = slot.queue.title
 
         # Проверяем, вдруг слот свободен
         if slot.user_id is None:
@@ -269,7 +1292,93 @@ class Reserve:
             log.debug(f"[ИСТЁКШИЙ СЛОТ] {info}")
             raise falcon.HTTPForbidden(description = 'Слот истёк')
 
+        remember_user(req, slot.holder)
         slot.user_id = None
+        dbses.flush()
+        # Освободившийся слот сразу достается первому в списке ожидания
+        promoted = promote(dbses, queue, slot.id)
+        if promoted is not None:
+            log.info(f"[СЛОТ ОТДАН ИЗ СПИСКА ОЖИДАНИЯ] {info}, "
+                     f"to {promoted.user_id}")
+            resp.context['promoted'] = promoted.user_id
+            resp.context['promoted_email'] = promoted.email
+        # Свободные слоты очередей с расписанием не хранятся в БД
+        elif slot.queue.recurring:
+            dbses.delete(slot)
+        mark_changed(dbses, queue, {'id': slot.id, 'free': promoted is None})
         log.info(f"[БРОНЬ УДАЛЕНА] {info}")
         resp.status = falcon.HTTP_204
-        resp.context['queue'] = queue
+
+
+class Hold:
+
+    def __init__(self, length):
+        '''
+        Аргументы:
+            length(int, необходим): продолжительность удержания слота в
+                секундах
+        '''
+        self.length = length
+
+    def on_post(self, req, resp, queue, id):
+        '''
+        Временно удерживает слот за пользователем, пока тот подтверждает
+        запись. Удерживаемый слот считается занятым для остальных
+        пользователей. Повторное удержание продлевает его, а удержания других
+        слотов этой очереди пользователем снимаются, только если удалось
+        удержать этот слот. Заодно снимаются истёкшие удержания очереди.
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+
+            id (required, in: path) - идентификатор слота
+        '''
+        dbses = req.context.session
+        log = req.context.logger
+        uid = req.context.user['uid']
+        info = "uid %s, queue %s, id %s" % (uid, queue, id)
+
+        now = datetime.now()
+        until = now + timedelta(seconds = self.length)
+        statement = hold_statement(queue, id, uid, now, until)
+        held = dbses.execute(statement).first()
+        # Свободные слоты очередей с расписанием не хранятся в БД
+        if held is None and materialize(dbses, queue, id):
+            held = dbses.execute(statement).first()
+        if held is None:
+            refuse(dbses, resp, log, info, queue, id, uid)
+            return
+
+        release_holds(dbses, queue, Slot.held_by == uid, Slot.id != id)
+        release_holds(dbses, queue, Slot.held_until <= now)
+        # До истечения удержания слоты очереди не кэшируются клиентами, см.
+        # unchanged
+        dbses.execute(
+            update(Queue.__table__)
+            .where(Queue.__table__.c.name == queue)
+            .values(holds_until = func.greatest(Queue.__table__.c.holds_until,
+                                                until))
+        )
+        mark_changed(dbses, queue, {'id': int(id), 'free': False})
+        log.info(f"[СЛОТ УДЕРЖАН] {info}")
+        resp.media = {'held_until': held.held_until.isoformat('T')}
+        resp.status = falcon.HTTP_201
+
+    def on_delete(self, req, resp, queue, id):
+        '''
+        Снимает удержание слота пользователем.
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+
+            id (required, in: path) - идентификатор слота
+        '''
+        dbses = req.context.session
+        uid = req.context.user['uid']
+
+        if release_holds(dbses, queue, Slot.held_by == uid, Slot.id == id):
+            resp.status = falcon.HTTP_204
+        else:
+            resp.status = falcon.HTTP_404
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+import falcon
+from sqlalchemy import exists, func
+from sqlalchemy.dialects.postgresql import insert
+
+from cyberdas.models import Queue, Slot, WaitlistEntry
+from cyberdas.resources.slots import SLOT_FREE
+
+
+def position(dbses, entry):
+    '''
+    Возвращает место записи в списке ожидания очереди, начиная с единицы
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        entry(WaitlistEntry, необходим): запись в списке ожидания
+    '''
+    return dbses.query(func.count()).filter(
+        WaitlistEntry.queue_name == entry.queue_name,
+        WaitlistEntry.created_at <= entry.created_at
+    ).scalar()
+
+
+class Item:
+
+    def find(self, dbses, queue, uid):
+        '''
+        Возвращает запись пользователя в списке ожидания очереди или HTTP 404
+
+        Аргументы:
+            dbses(Session, необходим): сессия БД
+
+            queue(str, необходим): имя очереди
+
+            uid(int, необходим): идентификатор пользователя
+        '''
+        entry = dbses.query(WaitlistEntry).filter_by(
+            queue_name = queue, user_id = uid
+        ).first()
+        if entry is None:
+            raise falcon.HTTPNotFound()
+        return entry
+
+    def on_get(self, req, resp, queue):
+        '''
+        Возвращает место пользователя в списке ожидания очереди
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+        '''
+        dbses = req.context.session
+        entry = self.find(dbses, queue, req.context.user['uid'])
+
+        resp.media = {'position': position(dbses, entry),
+                      'created_at': entry.created_at.isoformat('T')}
+        resp.status = falcon.HTTP_200
+
+    def on_post(self, req, resp, queue):
+        '''
+        Добавляет пользователя в список ожидания очереди, в которой не
+        осталось свободных слотов. Когда кто-то отменит запись, освободившийся
+        слот будет зарезервирован за ожидающим дольше всех пользователем, а
+        тот получит письмо о записи.
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+        '''
+        dbses = req.context.session
+        log = req.context.logger
+        uid = req.context.user['uid']
+
+        queue_obj = dbses.query(Queue).filter_by(name = queue).first()
+        if queue_obj is None:
+            raise falcon.HTTPNotFound()
+        # Свободные слоты очередей с расписанием не хранятся в БД, но
+        # появляются каждый день
+        has_free = queue_obj.recurring or dbses.query(exists().where(
+            (Slot.queue_name == queue) & SLOT_FREE
+            & (Slot.time > datetime.now())
+        )).scalar()
+        if has_free:
+            raise falcon.HTTPConflict(
+                description = 'В очереди есть свободные слоты'
+            )
+
+        inserted = dbses.execute(
+            insert(WaitlistEntry.__table__)
+            .values(queue_name = queue, user_id = uid)
+            .on_conflict_do_nothing()
+        ).rowcount
+        if inserted:
+            log.info(f"[СПИСОК ОЖИДАНИЯ] uid {uid}, queue {queue}")
+
+        entry = self.find(dbses, queue, uid)
+        resp.media = {'position': position(dbses, entry),
+                      'created_at': entry.created_at.isoformat('T')}
+        resp.status = falcon.HTTP_201 if inserted else falcon.HTTP_200
+
+    def on_delete(self, req, resp, queue):
+        '''
+        Удаляет пользователя из списка ожидания очереди
+
+        Параметры:
+
+            queue (required, in: path) - имя очереди
+        '''
+        dbses = req.context.session
+        deleted = dbses.query(WaitlistEntry).filter_by(
+            queue_name = queue, user_id = req.context.user['uid']
+        ).delete()
+        resp.status = falcon.HTTP_204 if deleted else falcon.HTTP_404
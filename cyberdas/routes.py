@@ -4,22 +4,26 @@ from .config import get_cfg
 from .resources import (
     queues,
     slots,
+    waitlist,
     signup,
     login,
     logout,
+    sessions,
     ott,
     feedback,
     maintenance,
 )
 from .services import (
     MailFactory,
-    SessionManager,
+    create_session_manager,
+    create_slot_events,
 )
 
 # Инициализация компонентов
 cfg = get_cfg()
 mail_factory = MailFactory(cfg)
-session_manager = SessionManager()
+session_manager = create_session_manager(cfg)
+slot_events = create_slot_events(cfg)
 ###
 
 
@@ -32,15 +36,22 @@ def route(api):
     api.add_route('/queues', queues.Collection())
     api.add_route('/queues/{queue}', queues.Item())
     api.add_route('/queues/{queue}/slots', slots.Collection())
+    api.add_route('/queues/{queue}/waitlist', waitlist.Item())
+    api.add_route('/queues/{queue}/slots/summary', slots.Summary())
+    api.add_route('/queues/{queue}/slots/events', slots.Events(slot_events))
     api.add_route('/queues/{queue}/slots/{id}', slots.Item())
     api.add_route('/queues/{queue}/slots/{id}/reserve',
                   slots.Reserve(mail_factory))
+    api.add_route('/queues/{queue}/slots/{id}/hold',
+                  slots.Hold(cfg['internal'].getint('slots.hold.length')))
     api.add_route('/account/signup', signup.Sender(mail_factory))
     api.add_route('/account/signup/validate', signup.Validator(mail_factory))
     api.add_route('/account/login', login.Sender(mail_factory))
     api.add_route('/account/login/validate', login.Validator(mail_factory,
                                                              session_manager))
     api.add_route('/account/logout', logout.Logout(session_manager))
+    api.add_route('/account/logout/all', logout.LogoutAll(session_manager))
+    api.add_route('/account/sessions', sessions.Collection(session_manager))
     api.add_route('/account/ott', ott.Ott())
     api.add_route('/feedback', feedback.RecipientCollection())
     api.add_route('/feedback/{recipient}', feedback.RecipientItem())
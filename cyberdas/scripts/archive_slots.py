@@ -0,0 +1,75 @@
+import argparse
+from datetime import datetime, timedelta
+from time import sleep
+
+import falcon_sqla
+from sqlalchemy import create_engine
+
+from .. import config
+from ..models import Queue, Slot
+from ..services.slot_archive import archive_slots
+
+parser = argparse.ArgumentParser(
+    description = 'Переносит прошедшие слоты очередей в таблицу slots_history.'
+)
+parser.add_argument('--days', type = int, default = None,
+                    help = 'переносить слоты, начавшиеся больше days дней '
+                           'назад; по умолчанию - slots.archive.after')
+parser.add_argument('--batch', type = int, default = 1000,
+                    help = 'число слотов, переносимых одной транзакцией')
+parser.add_argument('--interval', type = int, default = 0,
+                    help = 'повторять перенос каждые interval секунд; по '
+                           'умолчанию перенос выполняется один раз')
+parser.add_argument('--dry-run', action = 'store_true',
+                    help = 'только посчитать слоты для переноса, ничего не '
+                           'перенося')
+
+
+def archive(manager, before, batch):
+    '''
+    Переносит в историю все слоты, начавшиеся раньше `before`, пачками по
+    `batch` слотов. Возвращает число перенесенных слотов.
+    '''
+    with manager.session_scope() as session:
+        queues = [name for name, in session.query(Queue.name)]
+
+    total = 0
+    for queue in queues:
+        while True:
+            # Каждая пачка переносится в отдельной транзакции, чтобы не
+            # держать долгих блокировок на таблице слотов
+            with manager.session_scope() as session:
+                moved = archive_slots(session, queue, before, batch)
+            total += moved
+            if moved < batch:
+                break
+    return total
+
+
+def main():
+    cfg = config.get_cfg()
+    args = parser.parse_args()
+    if args.batch < 1:
+        parser.error('--batch должен быть положительным')
+    days = args.days
+    if days is None:
+        days = cfg['internal'].getint('slots.archive.after')
+    if days < 0 or args.interval < 0:
+        parser.error('--days и --interval не могут быть отрицательными')
+
+    engine = create_engine(cfg['alembic']['sqlalchemy.url'])
+    manager = falcon_sqla.Manager(engine)
+
+    while True:
+        before = datetime.now() - timedelta(days = days)
+        if args.dry_run:
+            with manager.session_scope() as session:
+                count = session.query(Slot).filter(Slot.time < before).count()
+            print(f"Слотов для переноса в историю: {count}")
+            return
+
+        total = archive(manager, before, args.batch)
+        print(f"Перенесено слотов в историю: {total}")
+        if not args.interval:
+            return
+        sleep(args.interval)
@@ -0,0 +1,44 @@
+import argparse
+from datetime import datetime
+
+import falcon_sqla
+from sqlalchemy import create_engine
+
+from .. import config
+from ..services.session import Session
+
+parser = argparse.ArgumentParser(description = 'Удаляет истёкшие сессии из БД.')
+parser.add_argument('--batch', type = int, default = 1000,
+                    help = 'число сессий, удаляемых одной транзакцией')
+parser.add_argument('--dry-run', action = 'store_true',
+                    help = 'только посчитать истёкшие сессии, ничего не удаляя')
+
+
+def main():
+    cfg = config.get_cfg()
+    args = parser.parse_args()
+    if args.batch < 1:
+        parser.error('--batch должен быть положительным')
+
+    engine = create_engine(cfg['alembic']['sqlalchemy.url'])
+    manager = falcon_sqla.Manager(engine)
+    now = datetime.now()
+
+    if args.dry_run:
+        with manager.session_scope() as session:
+            count = Session.expired(session, now).count()
+        print(f"Истёкших сессий: {count}")
+        return
+
+    total, batches = 0, 0
+    while True:
+        # Каждая пачка удаляется в отдельной транзакции, чтобы не держать
+        # долгих блокировок на таблице сессий
+        with manager.session_scope() as session:
+            deleted = Session.reap(session, args.batch, now)
+        total += deleted
+        batches += 1
+        print(f"Пачка {batches}: удалено {deleted}")
+        if deleted < args.batch:
+            break
+    print(f"Всего удалено истёкших сессий: {total}")
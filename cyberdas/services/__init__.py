@@ -1,10 +1,19 @@
 from .mail import MailFactory
-from .session import SessionManager
+from .session import SessionManager, create_session_manager
+from .identity import current_user, remember_user
 from .quick_auth import auth_on_post, auth_on_token
 from .ott import generate_ott, support_ott
 from .personal_data_wall import required_personal_data
+from .admin import required_admin
+from .queue_version import mark_changed
+from .slot_events import SlotEvents, create_slot_events
+from .admission import Admission, create_admission
 
 __all__ = [
-    'MailFactory', 'SessionManager', 'auth_on_post', 'auth_on_token',
-    'generate_ott', 'support_ott', 'required_personal_data'
+    'MailFactory', 'SessionManager', 'create_session_manager',
+    'current_user', 'remember_user',
+    'auth_on_post', 'auth_on_token',
+    'generate_ott', 'support_ott', 'required_personal_data', 'required_admin',
+    'mark_changed', 'SlotEvents', 'create_slot_events',
+    'Admission', 'create_admission'
 ]
@@ -0,0 +1,19 @@
+import falcon
+
+from cyberdas.config import get_cfg
+cfg = get_cfg()
+
+# Идентификаторы пользователей, которым доступно администрирование
+admins = frozenset(int(uid) for uid in
+                   cfg['internal'].get('admins', '').split(',') if uid.strip())
+
+
+def required_admin(req: falcon.Request, resp: falcon.Response, resource, params): # noqa
+    '''
+    Хук перед запросом. Проверяет, что пользователь, совершающий запрос,
+    является администратором, иначе возвращает HTTP 403.
+    '''
+    uid = req.context.user['uid']
+    if uid not in admins:
+        req.context.logger.debug('[НЕ АДМИНИСТРАТОР] uid %s' % uid)
+        raise falcon.HTTPForbidden(description = 'Недостаточно прав')
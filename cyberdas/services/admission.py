@@ -0,0 +1,107 @@
+import threading
+from collections import deque
+
+
+class Admission:
+
+    '''
+    Ограничение количества одновременно обрабатываемых запросов с одним ключом
+    (например, резервирований слотов одной очереди) внутри процесса. Не более
+    `concurrency` запросов обрабатываются одновременно, ещё не более `backlog`
+    ждут освобождения места в порядке поступления, а остальные отклоняются
+    сразу, не занимая соединений с БД.
+
+    Ожидающий запрос занимает поток обработчика, поэтому `backlog` должен быть
+    заметно меньше числа потоков процесса, а `timeout` - короткий.
+    Ограничение не разделяется между процессами: при запуске gunicorn с
+    несколькими процессами (--workers) одновременно обрабатывается до
+    workers * concurrency запросов с одним ключом.
+    '''
+
+    def __init__(self, concurrency, backlog, timeout, retry_after):
+        '''
+        Аргументы:
+            concurrency(int, необходим): сколько запросов с одним ключом
+                обрабатываются одновременно
+
+            backlog(int, необходим): сколько запросов с одним ключом могут
+                ждать своей очереди
+
+            timeout(float, необходим): сколько секунд запрос может ждать своей
+                очереди, прежде чем будет отклонен
+
+            retry_after(int, необходим): через сколько секунд отклоненному
+                клиенту стоит повторить запрос
+        '''
+        self.concurrency = concurrency
+        self.backlog = backlog
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._active = dict()
+        self._waiting = dict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        '''
+        Занимает место для обработки запроса, при необходимости дожидаясь его.
+        Места освобождаются в порядке поступления запросов. Возвращает False,
+        если запрос нужно отклонить.
+
+        Аргументы:
+            key(str, необходим): ключ, по которому ограничиваются запросы
+        '''
+        with self._lock:
+            active = self._active.get(key, 0)
+            waiting = self._waiting.get(key)
+            if active < self.concurrency and not waiting:
+                self._active[key] = active + 1
+                return True
+            if waiting is None:
+                waiting = self._waiting[key] = deque()
+            if len(waiting) >= self.backlog:
+                return False
+            ticket = threading.Event()
+            waiting.append(ticket)
+
+        if ticket.wait(self.timeout):
+            return True
+        with self._lock:
+            # Место могли передать уже после истечения времени ожидания
+            if ticket.is_set():
+                return True
+            waiting.remove(ticket)
+            return False
+
+    def release(self, key):
+        '''
+        Освобождает место, передавая его первому из ожидающих запросов.
+
+        Аргументы:
+            key(str, необходим): ключ, по которому ограничиваются запросы
+        '''
+        with self._lock:
+            waiting = self._waiting.get(key)
+            if waiting:
+                waiting.popleft().set()
+                return
+            self._waiting.pop(key, None)
+            self._active[key] -= 1
+            if not self._active[key]:
+                del self._active[key]
+
+
+def create_admission(cfg):
+    '''
+    Возвращает ограничение одновременных запросов с параметрами из
+    конфигурации проекта.
+
+    Аргументы:
+        cfg(необходим): конфигурация проекта
+    '''
+    internal = cfg['internal']
+    return Admission(
+        concurrency = internal.getint('admission.concurrency', 4),
+        backlog = internal.getint('admission.backlog', 4),
+        timeout = internal.getfloat('admission.timeout', 1),
+        retry_after = internal.getint('admission.retry', 2)
+    )
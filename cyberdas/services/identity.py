@@ -0,0 +1,33 @@
+import falcon
+
+from cyberdas.models import User
+
+
+def remember_user(req: falcon.Request, user):
+    '''
+    Сохраняет в контексте запроса уже загруженный объект пользователя,
+    совершающего запрос, чтобы хуки и обработчики могли получить его через
+    current_user без обращения к БД.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+
+        user(User, необходим): объект пользователя из сессии БД запроса
+    '''
+    req.context['identity'] = user
+
+
+def current_user(req: falcon.Request):
+    '''
+    Возвращает объект пользователя, совершающего запрос. Объект загружается из
+    БД не больше одного раза за запрос.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+    '''
+    user = getattr(req.context, 'identity', None)
+    if user is None:
+        uid = req.context.user['uid']
+        user = req.context.session.query(User).filter_by(id = uid).first()
+        remember_user(req, user)
+    return user
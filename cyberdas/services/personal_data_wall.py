@@ -1,6 +1,6 @@
 import falcon
 
-from cyberdas.models import User
+from cyberdas.services.identity import current_user
 from cyberdas.exceptions import HTTPNotEnoughPersonalData
 
 
@@ -20,7 +20,7 @@ class required_personal_data:
 
     def __call__(self, req: falcon.Request, resp: falcon.Response, resource, params): # noqa
         uid = req.context.user['uid']
-        user = req.context.session.query(User).filter_by(id = uid).first()
+        user = current_user(req)
 
         absent_fields = []
         for field in self.required_fields:
@@ -0,0 +1,68 @@
+import json
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from cyberdas.models import Queue
+from .slot_events import CHANNEL
+
+# Максимальный размер уведомления PostgreSQL в байтах
+MAX_PAYLOAD = 8000
+
+
+def notification(queue, version, slots):
+    'Возвращает текст уведомления об изменении слотов очереди'
+    payload = json.dumps({'queue': queue, 'version': version, 'slots': slots})
+    if slots is not None and len(payload.encode()) >= MAX_PAYLOAD:
+        # Слишком много изменений: клиентам проще запросить слоты заново
+        return notification(queue, version, None)
+    return payload
+
+
+def mark_changed(dbses, queue, slot = None):
+    '''
+    Отмечает, что слоты очереди изменились в текущей транзакции. Версия
+    очереди увеличивается и процессам, слушающим канал CHANNEL, отправляется
+    событие об изменении в той же транзакции непосредственно перед её
+    фиксацией. Так новая версия видна ровно вместе с новыми данными, а строка
+    очереди блокируется только на время фиксации, и одновременные
+    резервирования слотов одной очереди почти не ждут друг друга.
+
+    Аргументы:
+        dbses(Session, необходим): сессия БД
+
+        queue(str, необходим): имя очереди
+
+        slot(dict, опционально): новое состояние изменившегося слота в виде
+            {id, free}. Если не указан, слоты считаются изменившимися массово
+    '''
+    changed = dbses.info.setdefault('changed_queues', dict())
+    slots = changed.get(queue, [])
+    if slot is None or slots is None:
+        changed[queue] = None
+    else:
+        changed[queue] = slots + [slot]
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_versions(dbses):
+    changed = dbses.info.pop('changed_queues', None)
+    if not changed:
+        return
+    queues = Queue.__table__
+    versions = dbses.execute(
+        update(queues)
+        .where(queues.c.name.in_(sorted(changed)))
+        .values(version = queues.c.version + 1)
+        .returning(queues.c.name, queues.c.version)
+    ).fetchall()
+    # Уведомления доставляются слушателям после фиксации транзакции в
+    # порядке увеличения версий каждой очереди
+    for name, version in versions:
+        payload = notification(name, version, changed[name])
+        dbses.execute(select([func.pg_notify(CHANNEL, payload)]))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(dbses):
+    dbses.info.pop('changed_queues', None)
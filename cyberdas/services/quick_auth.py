@@ -8,6 +8,7 @@ import falcon
 
 from cyberdas.models import User
 from cyberdas.services.mail import Mail
+from cyberdas.services.identity import remember_user
 from cyberdas.config import get_cfg
 
 with open(path.abspath('cyberdas/static/login_schema.json'), 'r') as f:
@@ -58,6 +59,7 @@ def _get_or_add_user(req: falcon.Request, data: dict):
         dbses.flush()
         log.info('[QA][ЛОГИН] email %s uid %s' % (data['email'], user.id))
         req.context['user'] = {'uid': user.id}
+        remember_user(req, user)
         return
 
     # Сценарий 2: пользователь отправил все данные для регистрации
@@ -75,6 +77,7 @@ def _get_or_add_user(req: falcon.Request, data: dict):
     dbses.flush()
     log.info('[QA][НОВЫЙ ПОЛЬЗОВАТЕЛЬ] email %s uid %s' % (data['email'], newUser.id)) # noqa
     req.context['user'] = {'uid': newUser.id}
+    remember_user(req, newUser)
 
 
 def auth_on_post(req: falcon.Request, resp: falcon.Response, resource, params):
@@ -1,3 +1,7 @@
 from .manager import SessionManager
+from .signed_manager import SignedSessionManager
+from .factory import create_session_manager
+from .session import Session
 
-__all__ = ['SessionManager']
+__all__ = ['SessionManager', 'SignedSessionManager', 'create_session_manager',
+           'Session']
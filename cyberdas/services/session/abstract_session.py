@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta
 
+from sqlalchemy import update, delete, select, text, tuple_
+from sqlalchemy.types import TypeDecorator
+
 from cyberdas.exceptions import NoSessionError
 
 
@@ -85,11 +88,40 @@ class AbstractSession:
         db.add(new_object)
         return expires
 
+    @classmethod
+    def find_many(cls, ids_list):
+        '''
+        Возвращает SQL-условие для поиска сразу нескольких объектов в БД.
+
+        Аргументы:
+            ids_list(list, необходимо): список словарей из аргументов,
+                использующихся для однозначной идентификации объектов в БД,
+                например [{'id': 2}, {'id': 3}]
+        '''
+        table = cls.classname.__table__
+        filters = [cls.filter(**ids) for ids in ids_list]
+        keys = list(filters[0])
+        if len(keys) == 1:
+            return table.c[keys[0]].in_([f[keys[0]] for f in filters])
+        return tuple_(*[table.c[key] for key in keys]).in_(
+            [tuple(f[key] for key in keys) for f in filters]
+        )
+
+    @classmethod
+    def _returning(cls, db, statement, keys):
+        '''
+        Исполняет UPDATE/DELETE-выражение с RETURNING и возвращает список
+        словарей с идентификаторами затронутых объектов.
+        '''
+        columns = [cls.classname.__table__.c[key] for key in keys]
+        rows = db.execute(statement.returning(*columns)).fetchall()
+        return [dict(zip(keys, row)) for row in rows]
+
     @classmethod
     def prolong(cls, db, **ids):
         '''
         Продлевает время жизни объекта на еще одну полную длительность действия
-        этого типа сессий.
+        этого типа сессий. Выполняется одним UPDATE-запросом.
         Возвращает дату-время нового истечения сессии.
 
         Аргументы:
@@ -98,17 +130,44 @@ class AbstractSession:
             ids(неободимо): словарь из аргументов, использующихся для
                 однозначной идентификации объекта в БД, например {'id': 2}
         '''
-        session = cls.find(db, **ids)
-        if session.first() is None:
-            raise NoSessionError
         expires = datetime.now() + timedelta(seconds = cls.length)
-        session.update({cls.classname.expires: expires})
+        matched = cls.find(db, **ids).update(
+            {cls.classname.expires: expires},
+            synchronize_session = 'evaluate'
+        )
+        if matched == 0:
+            raise NoSessionError
         return expires
 
+    @classmethod
+    def prolong_many(cls, db, ids_list):
+        '''
+        Продлевает время жизни нескольких объектов одним UPDATE-запросом.
+        Возвращает дату-время нового истечения сессий и список идентификаторов
+        найденных объектов.
+
+        Внимание: объекты, уже загруженные в сессию БД, не обновляются.
+
+        Аргументы:
+            db(необходимо): активная сессия БД
+
+            ids_list(list, необходимо): список словарей из аргументов,
+                использующихся для однозначной идентификации объектов в БД,
+                например [{'id': 2}, {'id': 3}]
+        '''
+        expires = datetime.now() + timedelta(seconds = cls.length)
+        if len(ids_list) == 0:
+            return expires, []
+        statement = update(cls.classname.__table__).where(
+            cls.find_many(ids_list)
+        ).values(expires = expires)
+        keys = list(cls.filter(**ids_list[0]))
+        return expires, cls._returning(db, statement, keys)
+
     @classmethod
     def terminate(cls, db, **ids):
         '''
-        Уничтожает объект в БД.
+        Уничтожает объект в БД одним DELETE-запросом.
 
         Аргументы:
             db(необходимо): активная сессия БД
@@ -116,5 +175,135 @@ class AbstractSession:
             ids(неободимо): словарь из аргументов, использующихся для
                 однозначной идентификации объекта в БД, например {'id': 2}
         '''
-        session = cls.get(db, **ids)
-        db.delete(session)
+        matched = cls.find(db, **ids).delete(synchronize_session = 'evaluate')
+        if matched == 0:
+            raise NoSessionError
+
+    @classmethod
+    def terminate_many(cls, db, ids_list):
+        '''
+        Уничтожает несколько объектов в БД одним DELETE-запросом. Возвращает
+        список идентификаторов уничтоженных объектов.
+
+        Внимание: объекты, уже загруженные в сессию БД, не удаляются из неё.
+
+        Аргументы:
+            db(необходимо): активная сессия БД
+
+            ids_list(list, необходимо): список словарей из аргументов,
+                использующихся для однозначной идентификации объектов в БД,
+                например [{'id': 2}, {'id': 3}]
+        '''
+        if len(ids_list) == 0:
+            return []
+        return cls.terminate_where(db, cls.find_many(ids_list))
+
+    @classmethod
+    def terminate_where(cls, db, condition):
+        '''
+        Уничтожает все объекты, удовлетворяющие SQL-условию, одним
+        DELETE-запросом. Возвращает список идентификаторов уничтоженных
+        объектов.
+
+        Внимание: объекты, уже загруженные в сессию БД, не удаляются из неё.
+
+        Аргументы:
+            db(необходимо): активная сессия БД
+
+            condition(необходимо): SQL-условие, например `Model.uid == 2`
+        '''
+        table = cls.classname.__table__
+        keys = [column.name for column in table.primary_key.columns]
+        statement = delete(table).where(condition)
+        return cls._returning(db, statement, keys)
+
+    @classmethod
+    def expired(cls, db, before = None):
+        '''
+        Возвращает выражение для поиска истёкших объектов. Использует индекс по
+        времени истечения.
+
+        Аргументы:
+            db(необходимо): активная сессия БД
+
+            before(datetime, опционально): момент, на который объекты считаются
+                истёкшими, по умолчанию - текущее время
+        '''
+        before = before or datetime.now()
+        return db.query(cls.classname).filter(cls.classname.expires < before)
+
+    @classmethod
+    def reap(cls, db, limit, before = None):
+        '''
+        Удаляет из БД не более `limit` истёкших объектов одним DELETE-запросом.
+        Возвращает число удаленных объектов.
+
+        Аргументы:
+            db(необходимо): активная сессия БД
+
+            limit(int, необходимо): максимальное число удаляемых объектов
+
+            before(datetime, опционально): момент, на который объекты считаются
+                истёкшими, по умолчанию - текущее время
+        '''
+        before = before or datetime.now()
+        table = cls.classname.__table__
+        keys = [column for column in table.primary_key.columns]
+        batch = select(keys).where(table.c.expires < before).limit(limit)
+        if len(keys) == 1:
+            condition = keys[0].in_(batch)
+        else:
+            condition = tuple_(*keys).in_(batch)
+        result = db.execute(delete(table).where(condition))
+        return result.rowcount
+
+    @classmethod
+    def stored_key(cls, value):
+        '''
+        Возвращает значение первичного ключа в том виде, в котором оно хранится
+        в БД, - например, хэш-сумму идентификатора сессии, посчитанную типом
+        колонки.
+
+        Аргументы:
+            value(необходимо): значение первичного ключа
+        '''
+        column = list(cls.classname.__table__.primary_key.columns)[0]
+        if isinstance(column.type, TypeDecorator):
+            return column.type.process_bind_param(value, None)
+        return value
+
+    @classmethod
+    def touch_many(cls, db, activity, chunk = 500):
+        '''
+        Записывает время последней активности сразу для многих объектов
+        запросами вида UPDATE ... FROM (VALUES ...). Более раннее время не
+        перезаписывает более позднее. Возвращает число обновленных объектов.
+
+        Аргументы:
+            db(необходимо): активная сессия БД или соединение с ней
+
+            activity(dict, необходимо): словарь вида {значение первичного
+                ключа в БД (см. stored_key): время последней активности}
+
+            chunk(int, опционально): максимальное число объектов в одном
+                запросе
+        '''
+        table = cls.classname.__table__
+        key = list(table.primary_key.columns)[0].name
+        items = list(activity.items())
+        updated = 0
+        for start in range(0, len(items), chunk):
+            rows, params = [], {}
+            for n, (value, seen) in enumerate(items[start:start + chunk]):
+                rows.append(f'(:key{n}, :seen{n})')
+                params[f'key{n}'] = value
+                params[f'seen{n}'] = seen
+            statement = text(
+                f'UPDATE {table.name} SET last_seen = v.seen '
+                f'FROM (VALUES {", ".join(rows)}) AS v(key, seen) '
+                f'WHERE {table.name}.{key} = v.key AND '
+                f'({table.name}.last_seen IS NULL '
+                f'OR {table.name}.last_seen < v.seen)'
+            )
+            updated += db.execute(statement, params).rowcount
+        return updated
@@ -0,0 +1,76 @@
+import threading
+from time import monotonic
+
+
+class ActivityBuffer:
+
+    '''
+    Буфер активности сессий, живущий в памяти процесса. Копит время последнего
+    обращения каждой сессии и отдает накопленное не чаще, чем раз в `interval`
+    секунд, чтобы его можно было записать в БД одним запросом.
+
+    Повторные обращения одной сессии внутри интервала схлопываются в одну
+    запись с наиболее поздним временем.
+    '''
+
+    def __init__(self, interval):
+        '''
+        Аргументы:
+            interval(int, необходим): минимальный интервал между записями в БД
+                в секундах. При нулевом значении учет активности отключен.
+        '''
+        self.interval = interval
+        self._entries = dict()
+        self._flushed_at = monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def record(self, key, seen):
+        '''
+        Запоминает обращение сессии.
+
+        Аргументы:
+            key(bytes, необходим): хэш-сумма идентификатора сессии
+
+            seen(datetime, необходим): время обращения
+        '''
+        if not self.enabled:
+            return
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is None or previous < seen:
+                self._entries[key] = seen
+
+    def restore(self, entries):
+        '''
+        Возвращает в буфер записи, которые не удалось записать в БД. Более
+        поздние обращения, накопленные за это время, не перезаписываются.
+
+        Аргументы:
+            entries(dict, необходим): записи, полученные от drain
+        '''
+        for key, seen in entries.items():
+            self.record(key, seen)
+
+    def drain(self, force = False):
+        '''
+        Возвращает и очищает накопленные записи, если с прошлого раза прошло
+        не меньше `interval` секунд. Иначе возвращает пустой словарь.
+
+        Аргументы:
+            force(bool, опционально): отдать записи независимо от интервала
+        '''
+        with self._lock:
+            now = monotonic()
+            if not force and now - self._flushed_at < self.interval:
+                return {}
+            self._flushed_at = now
+            entries, self._entries = self._entries, dict()
+        return entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from cyberdas.utils.hash_type import Hash
+
+
+class SessionCache:
+
+    '''
+    Ограниченный по размеру кэш аутентифицированных сессий, живущий в памяти
+    процесса. Записи хранятся не дольше `ttl` секунд и вытесняются по принципу
+    LRU при превышении `size` элементов.
+
+    Ключом служит дайджест идентификатора сессии, поэтому в памяти процесса,
+    как и в БД, не хранятся оригинальные sid'ы.
+    '''
+
+    def __init__(self, ttl, size):
+        '''
+        Аргументы:
+            ttl(int, необходим): время жизни записи в кэше в секундах. При
+                нулевом значении кэш отключен.
+
+            size(int, необходим): максимальное количество записей в кэше
+        '''
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.size > 0
+
+    @staticmethod
+    def key(sid):
+        '''
+        Возвращает ключ кэша для идентификатора сессии.
+
+        Аргументы:
+            sid(str | Hash, необходим): идентификатор сессии или его хэш-сумма
+                из БД
+        '''
+        if isinstance(sid, Hash):
+            return sid.hash
+        return hashlib.sha256(sid.encode()).digest()
+
+    def get(self, sid):
+        '''
+        Возвращает пару (данные сессии, время истечения сессии) или None, если
+        записи нет или она устарела.
+
+        Аргументы:
+            sid(str, необходим): идентификатор сессии
+        '''
+        if not self.enabled:
+            return None
+
+        key = self.key(sid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, expires, stored_at = entry
+            if monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return dict(data), expires
+
+    def put(self, sid, data, expires):
+        '''
+        Помещает данные сессии в кэш, вытесняя самую старую запись при
+        переполнении.
+
+        Аргументы:
+            sid(str, необходим): идентификатор сессии
+
+            data(dict, необходим): словарь с информацией о сессии
+
+            expires(datetime, необходим): время истечения сессии
+        '''
+        if not self.enabled:
+            return
+
+        key = self.key(sid)
+        with self._lock:
+            self._entries[key] = (dict(data), expires, monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last = False)
+
+    def update(self, sid, expires):
+        '''
+        Обновляет время истечения сессии у существующей записи, не продлевая
+        при этом срок её жизни в кэше.
+
+        Аргументы:
+            sid(str | Hash, необходим): идентификатор сессии или его хэш-сумма
+
+            expires(datetime, необходим): новое время истечения сессии
+        '''
+        key = self.key(sid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], expires, entry[2])
+
+    def invalidate(self, sid):
+        '''
+        Удаляет запись о сессии из кэша.
+
+        Аргументы:
+            sid(str | Hash, необходим): идентификатор сессии или его хэш-сумма
+        '''
+        with self._lock:
+            self._entries.pop(self.key(sid), None)
+
+    def clear(self):
+        'Полностью очищает кэш'
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,37 @@
+import hmac
+from base64 import urlsafe_b64encode
+from hashlib import sha256
+
+from .cache import SessionCache
+
+from cyberdas.config import get_cfg
+cfg = get_cfg()
+secret = cfg['security']['secret.csrf'].encode()
+
+
+def derive_csrf_token(sid):
+    '''
+    Возвращает CSRF-токен сессии - HMAC от хэш-суммы её идентификатора.
+    Токен не нужно хранить: его можно в любой момент вычислить заново как по
+    оригинальному sid из куки, так и по его хэш-сумме из БД.
+
+    Аргументы:
+        sid(str | Hash, необходим): идентификатор сессии или его хэш-сумма
+    '''
+    mac = hmac.new(secret, SessionCache.key(sid), sha256).digest()
+    return urlsafe_b64encode(mac).rstrip(b'=').decode()
+
+
+def verify_csrf_token(sid, token):
+    '''
+    Проверяет CSRF-токен сессии, сравнивая его с вычисленным за постоянное
+    время.
+
+    Аргументы:
+        sid(str | Hash, необходим): идентификатор сессии или его хэш-сумма
+
+        token(str, необходим): CSRF-токен из запроса
+    '''
+    if token is None:
+        return False
+    return hmac.compare_digest(derive_csrf_token(sid), token)
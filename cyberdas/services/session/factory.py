@@ -0,0 +1,22 @@
+from .manager import SessionManager
+from .signed_manager import SignedSessionManager
+
+BACKENDS = {
+    'database': SessionManager,
+    'signed': SignedSessionManager,
+}
+
+
+def create_session_manager(cfg):
+    '''
+    Возвращает менеджер сессий, выбранный параметром `session.backend`
+    конфигурации: `database` - сессии хранятся в БД, `signed` - в подписанных
+    куки.
+
+    Аргументы:
+        cfg(необходим): конфигурация проекта
+    '''
+    backend = cfg['internal'].get('session.backend', 'database')
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный тип сессий: {backend}")
+    return BACKENDS[backend]()
@@ -1,9 +1,14 @@
 from .session import Session
+from .cache import SessionCache
+from .activity import ActivityBuffer
+from .csrf import derive_csrf_token
 
 from datetime import datetime
 import secrets
 
 from cyberdas.exceptions import BadAuthError, NoSessionError
+from cyberdas.config import get_cfg
+cfg = get_cfg()
 
 
 class SessionManager:
@@ -11,8 +16,25 @@ class SessionManager:
     '''
     Класс, управляющий пользовательскими сессиями. Позволяет централизовать весь
     код, связанный с сессиям и упростить введение правок.
+
+    Аутентифицированные сессии кэшируются в памяти процесса. Кэш общий для всех
+    экземпляров менеджера, поэтому завершение сессии сразу вступает в силу в
+    обработавшем его процессе, а в остальных - не позже чем через
+    `session.cache.ttl` секунд.
+
+    Время последней активности сессий копится в памяти процесса и
+    записывается в БД одним запросом в отдельной транзакции не чаще, чем раз
+    в `session.activity.interval` секунд.
     '''
 
+    cache = SessionCache(
+        ttl = int(cfg['internal'].get('session.cache.ttl', 0)),
+        size = int(cfg['internal'].get('session.cache.size', 0))
+    )
+    activity = ActivityBuffer(
+        interval = int(cfg['internal'].get('session.activity.interval', 0))
+    )
+
     def __init__(self):
         self.session = Session
 
@@ -36,12 +58,13 @@ class SessionManager:
             kwargs(dict, необходимо): словарь со значениями всех полей в базе
                 данных, используемых для инициаилизации, например {'uid': '2'}
         '''
-        # Генерируем безопасные токены для идентификатора сессии и csrf-токена
+        # Генерируем безопасный идентификатор сессии, csrf-токен выводится
+        # из него и не хранится
         sid = self.gen_token()
-        csrf_token = self.gen_token()
+        csrf_token = derive_csrf_token(sid)
 
         # Добавляем новую сессию в базу данных
-        self.session.new(db, sid = sid, csrf_token = csrf_token, **kwargs)
+        self.session.new(db, sid = sid, **kwargs)
         return self.session.form_cookie(sid), csrf_token
 
     def refresh(self, db, **ids):
@@ -55,7 +78,8 @@ class SessionManager:
             ids(неободимо): словарь из аргументов, использующихся для
                 однозначной идентификации объекта в БД, например {'id': 2}
         '''
-        self.session.prolong(db, **ids)
+        expires = self.session.prolong(db, **ids)
+        self.cache.update(ids['sid'], expires)
         return self.session.form_cookie(ids['sid'])
 
     def end(self, db, **ids):
@@ -63,15 +87,60 @@ class SessionManager:
         Заканчивает заданную сессию. Возвращает куки, которые позволяют
         закончить сессию на стороне клиентов.
 
+        Сессия могла быть уже удалена другим процессом, пока оставалась в кэше
+        этого, - тогда она считается уже законченной.
+
         Аргументы:
             db(необходим): активная сессия БД
 
             ids(неободимо): словарь из аргументов, использующихся для
                 однозначной идентификации объекта в БД, например {'id': 2}
         '''
-        self.session.terminate(db, **ids)
+        self.cache.invalidate(ids['sid'])
+        try:
+            self.session.terminate(db, **ids)
+        except NoSessionError:
+            pass
         return self.session.form_cookie(ids['sid'], -1)
 
+    def active(self, db, uid):
+        '''
+        Возвращает список всех действующих сессий пользователя, начиная с
+        самой свежей.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            uid(int, необходим): идентификатор пользователя
+        '''
+        model = self.session.classname
+        return db.query(model).filter(
+            model.uid == uid,
+            model.expires > datetime.now()
+        ).order_by(model.created_at.desc()).all()
+
+    def end_all(self, db, uid, keep = None):
+        '''
+        Заканчивает все сессии пользователя одним запросом, кроме, возможно,
+        одной. Возвращает число законченных сессий.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            uid(int, необходим): идентификатор пользователя
+
+            keep(str | Hash, опционально): идентификатор сессии, которую нужно
+                оставить
+        '''
+        model = self.session.classname
+        condition = model.uid == uid
+        if keep is not None:
+            condition = condition & (model.sid != keep)
+        ended = self.session.terminate_where(db, condition)
+        for ids in ended:
+            self.cache.invalidate(ids['sid'])
+        return len(ended)
+
     def authenticate(self, db, cookie):
         '''
         Аутентифицирует пользователя по его куки. Возвращает словарь с
@@ -88,10 +157,68 @@ class SessionManager:
             assert sid is not None
             assert len(sid) == 43  # len(self.gen_token())
             assert sid.find('\x00') == -1
-            ses = self.session.get(db, sid = sid)
-            assert ses.expires.replace(tzinfo = None) > datetime.now()
-        except (AssertionError, NoSessionError):
+        except AssertionError:
             raise BadAuthError
 
-        return {'uid': ses.uid, 'sid': ses.sid, 'csrf_token': ses.csrf_token,
-                'ip': ses.ip, 'agent': ses.user_agent}
+        cached = self.cache.get(sid)
+        if cached is None:
+            try:
+                ses = self.session.get(db, sid = sid)
+            except NoSessionError:
+                raise BadAuthError
+            expires = ses.expires.replace(tzinfo = None)
+            data = {'uid': ses.uid, 'sid': ses.sid,
+                    'csrf_token': derive_csrf_token(ses.sid), 'ip': ses.ip,
+                    'agent': ses.user_agent}
+            self.cache.put(sid, data, expires)
+        else:
+            data, expires = cached
+
+        now = datetime.now()
+        if expires <= now:
+            self.cache.invalidate(sid)
+            raise BadAuthError
+
+        self.activity.record(self.session.stored_key(sid), now)
+        return data
+
+    def peek(self, cookie):
+        '''
+        Возвращает информацию о сессии из кэша процесса, не обращаясь к БД,
+        или None, если сессии в кэше нет.
+
+        Аргументы:
+            cookie(dict, необходим): словарь с куки запроса
+        '''
+        sid = self.session.extract_cookie(cookie)
+        if sid is None:
+            return None
+        cached = self.cache.get(sid)
+        if cached is None:
+            return None
+        data, expires = cached
+        return data if expires > datetime.now() else None
+
+    def flush_activity(self, engine, force = False):
+        '''
+        Записывает накопленную активность сессий в БД, если подошло время.
+        Запись идет через отдельное соединение и в собственной транзакции,
+        поэтому не зависит от транзакции обрабатываемого запроса. Если запись
+        не удалась, активность возвращается в буфер. Возвращает число
+        обновленных сессий.
+
+        Аргументы:
+            engine(Engine, необходим): движок БД
+
+            force(bool, опционально): записать активность независимо от
+                интервала
+        '''
+        activity = self.activity.drain(force)
+        if len(activity) == 0:
+            return 0
+        try:
+            with engine.begin() as conn:
+                return self.session.touch_many(conn, activity)
+        except Exception:
+            self.activity.restore(activity)
+            raise
@@ -0,0 +1,153 @@
+import threading
+from datetime import datetime, timedelta
+from time import monotonic
+from types import SimpleNamespace
+
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+from cyberdas.models import RevokedSession
+
+# За сколько последних секунд записи об отзыве перечитываются при каждом
+# опросе. Номера версий выдаются последовательностью в порядке вставки, а не
+# фиксации, поэтому запись с меньшим номером может стать видна позже записи с
+# большим; окно должно превышать длительность самой долгой транзакции
+OVERLAP = 300
+
+
+class RevocationList:
+
+    '''
+    Список отозванных подписанных сессий, живущий в памяти процесса. Процессы
+    опрашивают таблицу `revoked_sessions` не чаще, чем раз в `interval` секунд,
+    и загружают записи с номером версии больше последнего прочитанного, а также
+    все записи, созданные за последние OVERLAP секунд. Повторно прочитанные
+    записи применяются повторно без последствий.
+    '''
+
+    def __init__(self, interval, length):
+        '''
+        Аргументы:
+            interval(int, необходим): минимальный интервал между опросами БД в
+                секундах
+
+            length(int, необходим): длительность сессий в секундах; после неё
+                запись об отзыве становится ненужной
+        '''
+        self.interval = interval
+        self.length = length
+        self.version = 0
+        self._sids = dict()
+        self._users = dict()
+        self._polled_at = None
+        self._lock = threading.Lock()
+
+    def poll(self, db, force = False):
+        '''
+        Загружает новые записи об отзыве из БД, если подошло время.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            force(bool, опционально): опросить БД независимо от интервала
+        '''
+        now = monotonic()
+        if (not force and self._polled_at is not None
+                and now - self._polled_at < self.interval):
+            return
+        self._polled_at = now
+
+        # Время создания записи равно expires - length
+        recent = datetime.now() + timedelta(seconds = self.length - OVERLAP)
+        rows = db.query(RevokedSession).filter(
+            or_(RevokedSession.version > self.version,
+                RevokedSession.expires > recent),
+            RevokedSession.expires > datetime.now()
+        ).order_by(RevokedSession.version).all()
+        with self._lock:
+            for row in rows:
+                self._apply(row)
+                self.version = max(self.version, row.version)
+            self._prune()
+
+    def _apply(self, row):
+        if row.sid is not None:
+            self._sids[row.sid] = row.expires
+        if row.uid is not None:
+            self._users.setdefault(row.uid, set()).add(
+                (row.before, row.keep, row.expires)
+            )
+
+    def _prune(self):
+        now = datetime.now()
+        self._sids = {sid: exp for sid, exp in self._sids.items() if exp > now}
+        for uid in list(self._users):
+            entries = {e for e in self._users[uid] if e[2] > now}
+            if entries:
+                self._users[uid] = entries
+            else:
+                del self._users[uid]
+
+    def revoke(self, db, sid = None, uid = None, keep = None):
+        '''
+        Отзывает одну сессию или все сессии пользователя, выданные до текущего
+        момента (кроме, возможно, одной). Запись учитывается в этом процессе
+        сразу после фиксации транзакции, остальные процессы увидят её при
+        следующем опросе. При откате транзакции отзыв не применяется.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            sid(str, опционально): идентификатор отзываемой сессии
+
+            uid(int, опционально): идентификатор пользователя, все сессии
+                которого нужно отозвать
+
+            keep(str, опционально): идентификатор сессии пользователя, которую
+                не нужно отзывать
+        '''
+        now = datetime.now()
+        values = {'sid': sid, 'uid': uid, 'keep': keep,
+                  'before': now if uid is not None else None,
+                  'expires': now + timedelta(seconds = self.length)}
+        db.add(RevokedSession(**values))
+        # После фиксации объекты сессии БД недоступны, поэтому откладываем
+        # копию значений
+        db.info.setdefault('revocations', []).append(
+            (self, SimpleNamespace(**values))
+        )
+
+    def _commit(self, row):
+        with self._lock:
+            # Версию не сдвигаем: иначе можно пропустить записи других
+            # процессов, ещё не прочитанные этим
+            self._apply(row)
+
+    def is_revoked(self, sid, uid, issued):
+        '''
+        Проверяет, отозвана ли сессия.
+
+        Аргументы:
+            sid(str, необходим): идентификатор сессии
+
+            uid(int, необходим): идентификатор пользователя
+
+            issued(datetime, необходим): время выдачи сессии
+        '''
+        if sid in self._sids:
+            return True
+        for before, keep, _ in self._users.get(uid, ()):
+            if issued < before and sid != keep:
+                return True
+        return False
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_revocations(db):
+    for revocations, row in db.info.pop('revocations', ()):
+        revocations._commit(row)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_revocations(db):
+    db.info.pop('revocations', None)
@@ -0,0 +1,152 @@
+from datetime import datetime
+from time import time
+
+from .manager import SessionManager
+from .signed_session import SignedSession
+from .revocation import RevocationList
+from .csrf import derive_csrf_token
+
+from cyberdas.exceptions import BadAuthError
+from cyberdas.config import get_cfg
+cfg = get_cfg()
+
+
+class SignedSessionManager(SessionManager):
+
+    '''
+    Менеджер сессий, хранящихся целиком в подписанных куки. Аутентификация
+    требует только проверки подписи, а для завершения сессий используется
+    список отозванных сессий, который процессы периодически загружают из БД.
+
+    Такие сессии нельзя перечислить, поэтому `active` всегда возвращает пустой
+    список, а активность сессий не учитывается.
+    '''
+
+    revocations = RevocationList(
+        interval = int(cfg['internal'].get('session.revocation.interval', 0)),
+        length = SignedSession.length
+    )
+
+    def __init__(self):
+        self.session = SignedSession
+
+    def _sign(self, sid, uid, ip, agent, iat):
+        # Время выдачи сессии сохраняется при продлении, иначе продленная
+        # сессия избежала бы отзыва всех сессий пользователя, см.
+        # RevocationList.is_revoked. Срок действия хранится отдельно
+        token = self.session.sign({'sid': sid, 'uid': uid, 'ip': ip,
+                                   'agent': agent, 'iat': iat,
+                                   'exp': time() + self.session.length})
+        return self.session.form_cookie(token)
+
+    def start(self, db, **kwargs):
+        '''
+        Начинает новую сессию, возвращая словарь с параметрами куки и
+        CSRF-токен. К БД не обращается.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            kwargs(dict, необходимо): словарь с uid, user_agent и ip
+        '''
+        sid = self.gen_token(16)
+        cookie = self._sign(sid, kwargs['uid'], kwargs['ip'],
+                            kwargs['user_agent'], time())
+        return cookie, derive_csrf_token(sid)
+
+    def refresh(self, db, **ids):
+        '''
+        Продлевает заданную сессию, подписывая её данные заново с тем же
+        временем выдачи. Возвращает куки с новым временем истечения.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            ids(необходимо): словарь с информацией о сессии, возвращенный
+                методом authenticate
+        '''
+        return self._sign(ids['sid'], ids['uid'], ids['ip'], ids['agent'],
+                          ids['iat'])
+
+    def end(self, db, **ids):
+        '''
+        Заканчивает заданную сессию, внося её в список отозванных. Возвращает
+        куки, которые позволяют закончить сессию на стороне клиентов.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            ids(неободимо): словарь с идентификатором сессии, например
+                {'sid': 'abc'}
+        '''
+        self.revocations.revoke(db, sid = ids['sid'])
+        return self.session.form_cookie(ids['sid'], -1)
+
+    def active(self, db, uid):
+        return []
+
+    def end_all(self, db, uid, keep = None):
+        '''
+        Заканчивает все выданные к этому моменту сессии пользователя, кроме,
+        возможно, одной. Число законченных сессий неизвестно, поэтому
+        возвращает None.
+
+        Аргументы:
+            db(необходим): активная сессия БД
+
+            uid(int, необходим): идентификатор пользователя
+
+            keep(str, опционально): идентификатор сессии, которую нужно
+                оставить
+        '''
+        self.revocations.revoke(db, uid = uid, keep = keep)
+
+    def flush_activity(self, engine, force = False):
+        return 0
+
+    def authenticate(self, db, cookie):
+        '''
+        Аутентифицирует пользователя по подписи его куки. Возвращает словарь с
+        информацией о сессии.
+
+        Аргументы:
+            db(необходим): активная сессия в базе данных, используется только
+                для периодической загрузки списка отозванных сессий
+
+            cookie(dict, необходим): словарь с куки запроса
+        '''
+        data = self._verify(cookie)
+        self.revocations.poll(db)
+        return self._accept(data)
+
+    def peek(self, cookie):
+        '''
+        Возвращает информацию о сессии, если её можно проверить без обращения
+        к БД, иначе None. Список отозванных сессий при этом не опрашивается.
+
+        Аргументы:
+            cookie(dict, необходим): словарь с куки запроса
+        '''
+        try:
+            return self._accept(self._verify(cookie))
+        except BadAuthError:
+            return None
+
+    def _verify(self, cookie):
+        token = self.session.extract_cookie(cookie)
+        if token is None:
+            raise BadAuthError
+
+        data = self.session.verify(token)
+        if data is None or data.get('exp', 0) <= time():
+            raise BadAuthError
+        return data
+
+    def _accept(self, data):
+        issued = datetime.fromtimestamp(data['iat'])
+        if self.revocations.is_revoked(data['sid'], data['uid'], issued):
+            raise BadAuthError
+
+        return {'uid': data['uid'], 'sid': data['sid'],
+                'csrf_token': derive_csrf_token(data['sid']), 'ip': data['ip'],
+                'agent': data['agent'], 'iat': data['iat']}
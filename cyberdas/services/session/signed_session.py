@@ -0,0 +1,43 @@
+from itsdangerous import URLSafeTimedSerializer, BadData
+
+from .сookie_serializable import CookieSerializable
+
+from cyberdas.config import get_cfg
+cfg = get_cfg()
+
+
+class SignedSession(CookieSerializable):
+
+    '''
+    Сессия, целиком хранящаяся в подписанном куки. Проверка такой сессии
+    требует только вычисления HMAC и не обращается к БД.
+    '''
+
+    length = int(cfg['internal']['session.length'])
+    cookie_name = 'SESSIONID'
+    serializer = URLSafeTimedSerializer(cfg['security']['secret.session'],
+                                        salt = 'session')
+
+    @classmethod
+    def sign(cls, data):
+        '''
+        Возвращает подписанную строку с данными сессии.
+
+        Аргументы:
+            data(dict, необходим): данные сессии
+        '''
+        return cls.serializer.dumps(data)
+
+    @classmethod
+    def verify(cls, token):
+        '''
+        Проверяет подпись и срок действия строки с данными сессии. Возвращает
+        данные сессии или None, если проверка не пройдена.
+
+        Аргументы:
+            token(str, необходим): подписанная строка из куки
+        '''
+        try:
+            return cls.serializer.loads(token, max_age = cls.length)
+        except BadData:
+            return None
@@ -0,0 +1,41 @@
+from sqlalchemy import text
+
+# Переносит не более :limit самых старых слотов очереди, начавшихся раньше
+# :before, из таблицы slots в slots_history. Слоты, заблокированные
+# параллельными транзакциями, пропускаются до следующего запуска
+archive_statement = text('''
+    WITH moved AS (
+        DELETE FROM slots
+        WHERE queue_name = :queue AND id IN (
+            SELECT id FROM slots
+            WHERE queue_name = :queue AND time < :before
+            ORDER BY time
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING queue_name, id, time, user_id
+    )
+    INSERT INTO slots_history (queue_name, id, time, user_id)
+    SELECT queue_name, id, time, user_id FROM moved
+''')
+
+
+def archive_slots(db, queue, before, limit):
+    '''
+    Переносит в историю не более `limit` слотов очереди, начавшихся раньше
+    `before`, одним запросом. Слоты выбираются по индексу (queue_name, time),
+    так что запрос не просматривает будущие слоты. Возвращает число
+    перенесенных слотов.
+
+    Аргументы:
+        db(необходимо): активная сессия БД
+
+        queue(str, необходимо): имя очереди
+
+        before(datetime, необходимо): момент, раньше которого начавшиеся слоты
+            переносятся в историю
+
+        limit(int, необходимо): максимальное число переносимых слотов
+    '''
+    params = {'queue': queue, 'before': before, 'limit': limit}
+    return db.execute(archive_statement, params).rowcount
@@ -0,0 +1,193 @@
+import json
+import logging
+import select
+import threading
+from collections import deque
+from time import sleep
+
+# Канал PostgreSQL, через который процессы узнают об изменениях слотов
+CHANNEL = 'slot_events'
+# Через сколько секунд слушатель переподключается к БД после ошибки
+RECONNECT_DELAY = 5
+
+
+class SlotEvents:
+
+    '''
+    Рассылка изменений слотов очередей подписчикам внутри процесса. События
+    приходят от PostgreSQL по LISTEN/NOTIFY, так что каждый процесс получает
+    изменения, сделанные любым из них. Для каждой очереди хранятся последние
+    `backlog` событий, чтобы переподключившиеся клиенты могли получить
+    пропущенные.
+
+    Каждый открытый поток занимает обработчик процесса, поэтому их число
+    ограничено `streams`: лишние подписчики получают отказ и переподключаются
+    позже, не отнимая обработчики у остальных запросов.
+
+    Событием является пара (версия очереди, список изменений слотов). Список
+    изменений равен None, если слоты изменились массово и клиенту нужно
+    заново запросить их целиком.
+    '''
+
+    def __init__(self, backlog, keepalive, lifetime, streams, retry_after):
+        '''
+        Аргументы:
+            backlog(int, необходим): сколько последних событий каждой очереди
+                хранится для переподключившихся клиентов
+
+            keepalive(int, необходим): интервал в секундах, с которым в пустой
+                поток отправляются комментарии, чтобы соединение не закрылось
+
+            lifetime(int, необходим): через сколько секунд поток закрывается,
+                освобождая обработчик; клиент после этого переподключается
+
+            streams(int, необходим): сколько потоков процесс может держать
+                открытыми одновременно
+
+            retry_after(int, необходим): через сколько секунд клиенту, которому
+                отказано в потоке, стоит переподключиться
+        '''
+        self.backlog = backlog
+        self.keepalive = keepalive
+        self.lifetime = lifetime
+        self.streams = streams
+        self.retry_after = retry_after
+        self._open = 0
+        self._events = dict()
+        self._changed = threading.Condition()
+        self._listener = None
+        self._logger = logging.getLogger('inspection')
+
+    def open(self):
+        '''
+        Занимает место для нового потока. Возвращает False, если процесс уже
+        держит открытыми `streams` потоков.
+        '''
+        with self._changed:
+            if self._open >= self.streams:
+                return False
+            self._open += 1
+            return True
+
+    def close(self):
+        '''
+        Освобождает место, занятое потоком.
+        '''
+        with self._changed:
+            self._open -= 1
+
+    def listen(self, engine):
+        '''
+        Запускает в фоновом потоке прослушивание канала CHANNEL, если оно ещё
+        не запущено. Поток создается при первой подписке, а не при импорте,
+        так как потоки не переживают fork() процессов gunicorn.
+
+        Аргументы:
+            engine(Engine, необходим): движок БД
+        '''
+        with self._changed:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(
+                target = self._listen, args = (engine,), daemon = True,
+                name = 'slot-events'
+            )
+            self._listener.start()
+
+    def _listen(self, engine):
+        while True:
+            try:
+                conn = engine.raw_connection()
+                # Соединение переводится в режим autocommit и слушает канал,
+                # поэтому не должно вернуться в пул
+                conn.detach()
+                try:
+                    self._receive(conn.connection)
+                finally:
+                    conn.close()
+            except Exception:
+                self._logger.exception('[СОБЫТИЯ СЛОТОВ] Потеряно соединение')
+                sleep(RECONNECT_DELAY)
+
+    def _receive(self, conn):
+        conn.autocommit = True
+        conn.cursor().execute(f'LISTEN {CHANNEL}')
+        while True:
+            if select.select([conn], [], [], self.keepalive) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                event = json.loads(conn.notifies.pop(0).payload)
+                self.dispatch(event['queue'], event['version'], event['slots'])
+
+    def dispatch(self, queue, version, slots):
+        '''
+        Сохраняет событие очереди и будит ожидающих его подписчиков.
+
+        Аргументы:
+            queue(str, необходим): имя очереди
+
+            version(int, необходим): версия очереди после изменения
+
+            slots(list, необходим): словари {id, free} с новым состоянием
+                изменившихся слотов или None при массовом изменении
+        '''
+        with self._changed:
+            if queue not in self._events:
+                self._events[queue] = deque(maxlen = self.backlog)
+            self._events[queue].append((version, slots))
+            self._changed.notify_all()
+
+    def covers(self, queue, version):
+        '''
+        Проверяет, хранятся ли все события очереди, произошедшие после
+        указанной версии, так что клиент может получить их без полного
+        перезапроса слотов.
+
+        Аргументы:
+            queue(str, необходим): имя очереди
+
+            version(int, необходим): последняя известная клиенту версия
+        '''
+        with self._changed:
+            events = self._events.get(queue)
+            return bool(events) and events[0][0] <= version + 1
+
+    def after(self, queue, version, timeout):
+        '''
+        Возвращает хранящиеся события очереди с версией больше указанной,
+        ожидая их появления не дольше `timeout` секунд. Возвращает пустой
+        список, если за это время событий не было.
+
+        Аргументы:
+            queue(str, необходим): имя очереди
+
+            version(int, необходим): последняя отправленная клиенту версия
+
+            timeout(float, необходим): максимальное время ожидания в секундах
+        '''
+        def pending():
+            return [event for event in self._events.get(queue, ())
+                    if event[0] > version]
+
+        with self._changed:
+            self._changed.wait_for(pending, timeout)
+            return pending()
+
+
+def create_slot_events(cfg):
+    '''
+    Возвращает рассылку изменений слотов с параметрами из конфигурации
+    проекта.
+
+    Аргументы:
+        cfg(необходим): конфигурация проекта
+    '''
+    internal = cfg['internal']
+    return SlotEvents(
+        backlog = internal.getint('slots.events.backlog', 256),
+        keepalive = internal.getint('slots.events.keepalive', 15),
+        lifetime = internal.getint('slots.events.lifetime', 60),
+        streams = internal.getint('slots.events.streams', 8),
+        retry_after = internal.getint('slots.events.retry', 5)
+    )
@@ -0,0 +1,31 @@
+import json
+from hashlib import blake2b
+
+import falcon
+
+
+def content_etag(payload) -> str:
+    'Возвращает ETag, вычисленный по содержимому JSON-ответа'
+    content = json.dumps(payload, sort_keys = True, ensure_ascii = False)
+    return blake2b(content.encode(), digest_size = 16).hexdigest()
+
+
+def not_modified(req: falcon.Request, resp: falcon.Response, etag) -> bool:
+    '''
+    Устанавливает ETag ответа и, если он совпадает с одним из переданных
+    клиентом в If-None-Match, отвечает HTTP 304. Возвращает True, если тело
+    ответа формировать не нужно.
+
+    Аргументы:
+        req(falcon.Request, необходим): текущий запрос
+
+        resp(falcon.Response, необходим): ответ на запрос
+
+        etag(str, необходим): ETag текущего представления ресурса
+    '''
+    resp.etag = etag
+    tags = req.if_none_match
+    if tags and ('*' in tags or etag in tags):
+        resp.status = falcon.HTTP_304
+        return True
+    return False
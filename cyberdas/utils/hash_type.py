@@ -1,4 +1,5 @@
 import hashlib
+from functools import partial
 
 from sqlalchemy import types
 from sqlalchemy.dialects import oracle, postgresql, sqlite
@@ -40,7 +41,11 @@ class HashType(types.TypeDecorator):
         self.algorithm = algorithm
         if algorithm not in hashlib.algorithms_available:
             raise Exception(f"{algorithm} недоступен, выберите другой")
-        self.length = hashlib.new(algorithm).digest_size
+        # Прямой конструктор (например, hashlib.sha256) заметно быстрее
+        # универсального hashlib.new, поэтому находим его один раз
+        self._constructor = (getattr(hashlib, algorithm, None)
+                             or partial(hashlib.new, algorithm))
+        self.length = self._constructor().digest_size
 
     def load_dialect_impl(self, dialect):  # pragma: no cover
         if dialect.name == 'postgresql':
@@ -79,12 +84,14 @@ class HashType(types.TypeDecorator):
         '''
         Метод хэширования, переводящий входные данные в байтовый дайджест,
         используя указанный пользователем алгоритм.
+
+        Дайджесты намеренно не запоминаются: кэш хранил бы в памяти процесса
+        сами хэшируемые значения, то есть идентификаторы сессий в открытом
+        виде.
         '''
         if isinstance(data, str):
             data = data.encode()
-        hashing = hashlib.new(self.algorithm)
-        hashing.update(data)
-        return hashing.digest()
+        return self._constructor(data).digest()
 
 
 class Hash(object):
@@ -104,8 +111,14 @@ class Hash(object):
     В SQLAlchemy это гарантируется HashType::process_bind_param, конкретно -
     тем, что все приходящие в БД значения, которые будут храниться в колонках
     типа HashType превращаются в свою хэш-сумму.
+
+    Хэш объекта определяется хэш-суммой, поэтому объекты Hash можно хранить в
+    множествах и использовать как ключи словарей. Строки при этом остаются
+    равны объектам Hash, но не находятся по ним в словарях.
     '''
 
+    __slots__ = ('hash', 'hashing')
+
     def __init__(self, hash: bytes, hashing):
         self.hash = hash
         self.hashing = hashing
@@ -132,4 +145,4 @@ class Hash(object):
         return not (self == value)
 
     def __hash__(self) -> int:
-        return super().__hash__()
+        return hash(self.hash)
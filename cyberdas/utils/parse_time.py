@@ -0,0 +1,31 @@
+import re
+from datetime import datetime
+
+# Дата и время в формате RFC 3339 (профиль ISO 8601): дробная часть секунд
+# любой длины и часовой пояс в виде Z или смещения ±HH:MM
+DATETIME = re.compile(
+    r'(\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}(?::\d{2})?)'
+    r'(?:\.(\d+))?'
+    r'([Zz]|[+-]\d{2}:\d{2})?'
+)
+
+
+def parse_time(value: str) -> datetime:
+    '''
+    Приводит строку с датой и временем в формате RFC 3339 к datetime.
+    В отличие от datetime.fromisoformat в Python 3.9, принимает суффикс Z и
+    дробную часть секунд из любого числа цифр (лишние отбрасываются).
+    Возвращает ValueError, если строка не является датой и временем.
+
+    Аргументы:
+        value(str, необходим): строка с датой и временем
+    '''
+    match = DATETIME.fullmatch(value)
+    if match is None:
+        raise ValueError(f'Invalid isoformat string: {value!r}')
+    moment, fraction, offset = match.groups()
+    if fraction:
+        moment += '.' + fraction[:6].ljust(6, '0')
+    if offset in ('Z', 'z'):
+        offset = '+00:00'
+    return datetime.fromisoformat(moment + (offset or ''))
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+# Точка отсчета идентификаторов слотов очередей с расписанием
+EPOCH = datetime(2000, 1, 1)
+MINUTE = timedelta(minutes = 1)
+
+
+def slot_id(moment: datetime) -> int:
+    'Возвращает идентификатор слота очереди с расписанием по времени его начала'
+    return (moment - EPOCH) // MINUTE
+
+
+def slot_time(id) -> datetime:
+    '''
+    Возвращает время начала слота очереди с расписанием по его идентификатору
+    или None, если идентификатор не является числом
+    '''
+    try:
+        return EPOCH + int(id) * MINUTE
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def is_valid(queue) -> bool:
+    '''
+    Задает ли расписание очереди конечную сетку слотов. В БД это гарантирует
+    ограничение ck_queues_schedule, но объекты очередей могут быть созданы и
+    в обход него
+    '''
+    return (queue.opens is not None and queue.closes is not None
+            and queue.opens < queue.closes
+            and queue.duration is not None and queue.duration > 0)
+
+
+def is_open(queue, day) -> bool:
+    'Работает ли очередь с расписанием в указанный день'
+    return (day.weekday() in queue.weekdays
+            and day not in (queue.exceptions or []))
+
+
+def is_slot(queue, moment: datetime) -> bool:
+    '''
+    Проверяет, начинается ли в указанный момент слот очереди с расписанием.
+
+    Аргументы:
+        queue(Queue, необходим): очередь с расписанием
+
+        moment(datetime, необходим): время начала слота
+    '''
+    if (
+        moment is None or not is_valid(queue)
+        or not is_open(queue, moment.date())
+    ):
+        return False
+    step = queue.duration * MINUTE
+    opens = datetime.combine(moment.date(), queue.opens)
+    closes = datetime.combine(moment.date(), queue.closes)
+    return (opens <= moment and moment + step <= closes
+            and (moment - opens) % step == timedelta(0))
+
+
+def slot_times(queue, start: datetime, end: datetime):
+    '''
+    Генерирует время начала всех слотов очереди с расписанием в полуоткрытом
+    интервале [start, end).
+
+    Аргументы:
+        queue(Queue, необходим): очередь с расписанием
+
+        start(datetime, необходим): начало интервала
+
+        end(datetime, необходим): конец интервала
+
+    Для очереди с неполным или неверным расписанием слотов нет.
+    '''
+    if not is_valid(queue):
+        return
+    step = queue.duration * MINUTE
+    day = start.date()
+    while datetime.combine(day, queue.opens) < end:
+        if is_open(queue, day):
+            moment = datetime.combine(day, queue.opens)
+            closes = datetime.combine(day, queue.closes)
+            while moment + step <= closes:
+                if start <= moment < end:
+                    yield moment
+                moment += step
+        day += timedelta(days = 1)
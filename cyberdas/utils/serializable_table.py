@@ -1,15 +1,21 @@
 import datetime
 
 
+def serialize(data):
+    'Приводит значение колонки к виду, пригодному для JSON'
+    if isinstance(data, datetime.datetime):
+        return data.isoformat('T')
+    if isinstance(data, (datetime.date, datetime.time)):
+        return data.isoformat()
+    if isinstance(data, list):
+        return [serialize(item) for item in data]
+    return data
+
+
 class Serializable:
 
     def as_dict(self):
         output = dict()
         for c in self.__table__.columns:
-            data = getattr(self, c.name)
-            if isinstance(data, datetime.datetime):
-                data = data.isoformat('T')
-            if isinstance(data, (datetime.date, datetime.time)):
-                data = data.isoformat()
-            output[c.name] = data
+            output[c.name] = serialize(getattr(self, c.name))
         return output
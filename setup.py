@@ -53,6 +53,8 @@ setup(
             'initialize_db = cyberdas.scripts.initialize_db:main',
             'send_mail = cyberdas.scripts.send_mail:main',
             'dump_table = cyberdas.scripts.dump_table:main',
+            'reap_sessions = cyberdas.scripts.reap_sessions:main',
+            'archive_slots = cyberdas.scripts.archive_slots:main',
         ],
     },
 )
@@ -1,3 +1,6 @@
+import secrets
+from datetime import datetime
+
 import falcon
 
 from cyberdas.models import Session
@@ -37,3 +40,51 @@ class TestLogout:
         'При логауте сессия должна удаляться из БД'
         session = dbses.query(Session).filter_by(uid = 1).first()
         assert session is None
+
+
+def add_sessions(dbses, n):
+    'Добавляет пользователю с uid 1 ещё n сессий с других устройств'
+    for x in range(n):
+        dbses.add(Session(uid = 1, sid = secrets.token_urlsafe(32),
+                          user_agent = 'curl', ip = '127.0.0.1',
+                          expires = datetime(datetime.now().year + 1, 1, 1)))
+    dbses.commit()
+
+
+class TestLogoutAll:
+
+    URI = '/account/logout/all'
+
+    def test_unauthorized(self, client):
+        'При попытке выйти не залогинившись, возвращается 401 Unauthorized'
+        resp = client.simulate_post(self.URI)
+        assert resp.status == falcon.HTTP_401
+
+    def test_others(self, a_client, dbses):
+        '''
+        При запросе с others завершаются все сессии пользователя, кроме текущей
+        '''
+        add_sessions(dbses, 3)
+        resp = a_client.simulate_post(self.URI, params = {'others': True})
+        assert resp.status == falcon.HTTP_204
+        assert 'SESSIONID' not in resp.cookies
+        assert dbses.query(Session).filter_by(uid = 1).count() == 1
+
+        resp = a_client.simulate_get('/account/sessions')
+        assert resp.status == falcon.HTTP_200
+
+    def test_all(self, a_client, dbses):
+        '''
+        При запросе без others завершаются все сессии пользователя, в том числе
+        текущая, а куки сбрасываются
+        '''
+        add_sessions(dbses, 2)
+        resp = a_client.simulate_post(self.URI)
+        assert resp.status == falcon.HTTP_204
+        assert resp.cookies['SESSIONID'].max_age == -1
+        assert dbses.query(Session).filter_by(uid = 1).count() == 0
+
+    def test_cache_purged(self, a_client):
+        'Завершенные сессии не должны приниматься, даже если они в кэше'
+        resp = a_client.simulate_get('/account/sessions')
+        assert resp.status == falcon.HTTP_401
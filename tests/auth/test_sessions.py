@@ -0,0 +1,32 @@
+import json
+
+import falcon
+
+from cyberdas.models import Session
+
+
+class TestSessions:
+
+    URI = '/account/sessions'
+
+    def test_unauthorized(self, client):
+        'Без сессии возвращается 401 Unauthorized'
+        resp = client.simulate_get(self.URI)
+        assert resp.status == falcon.HTTP_401
+
+    def test_get(self, a_client, dbses):
+        'На GET-запрос возвращается список действующих сессий пользователя'
+        resp = a_client.simulate_get(self.URI)
+        assert resp.status == falcon.HTTP_200
+        content = json.loads(resp.text)
+        assert len(content) == dbses.query(Session).filter_by(uid = 1).count()
+        assert len([ses for ses in content if ses['current']]) == 1
+
+    def test_content(self, a_client):
+        'Идентификаторы сессий не передаются клиенту'
+        resp = a_client.simulate_get(self.URI)
+        for ses in json.loads(resp.text):
+            assert 'sid' not in ses
+            assert 'csrf_token' not in ses
+            assert {'ip', 'agent', 'created_at', 'last_seen', 'expires',
+                    'current'} <= set(ses)
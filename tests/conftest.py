@@ -7,6 +7,7 @@ from falcon import testing
 
 from cyberdas.app import Service
 from cyberdas.models import Session, Faculty
+from cyberdas.services.session.csrf import derive_csrf_token
 
 pytest_plugins = ['utils.mockDB']
 
@@ -42,9 +43,8 @@ def client():
 @pytest.fixture(scope = 'class')
 def auth(defaultDB):
     sid = secrets.token_urlsafe(32)
-    csrf_token = secrets.token_urlsafe(32)
+    csrf_token = derive_csrf_token(sid)
     session = Session(uid = environ.get('AUTH_UID', 1), sid = sid,
-                      csrf_token = csrf_token,
                       user_agent = 'curl', ip = '127.0.0.1',
                       expires = datetime(datetime.now().year + 1, 12, 31))
     defaultDB.setup_models(session)
@@ -0,0 +1,62 @@
+import threading
+from time import sleep
+
+from cyberdas.services import Admission
+
+
+def wait_for(condition):
+    'Ждет выполнения условия, проверяя его каждые 10 мс, не дольше 5 секунд'
+    for _ in range(500):
+        if condition():
+            return
+        sleep(0.01)
+    raise AssertionError('Условие не выполнилось')
+
+
+class TestAdmission:
+
+    def test_concurrency(self):
+        'Одновременно обрабатывается не больше concurrency запросов на ключ'
+        admission = Admission(concurrency = 2, backlog = 0, timeout = 1,
+                              retry_after = 1)
+        assert admission.acquire('music')
+        assert admission.acquire('music')
+        assert not admission.acquire('music')
+        # Другие ключи ограничиваются независимо
+        assert admission.acquire('living')
+
+        admission.release('music')
+        assert admission.acquire('music')
+
+    def test_timeout(self):
+        'Не дождавшийся места запрос отклоняется'
+        admission = Admission(concurrency = 1, backlog = 1, timeout = 0.05,
+                              retry_after = 1)
+        assert admission.acquire('music')
+        assert not admission.acquire('music')
+        admission.release('music')
+        assert admission.acquire('music')
+
+    def test_fifo(self):
+        'Места передаются ожидающим запросам в порядке поступления'
+        admission = Admission(concurrency = 1, backlog = 3, timeout = 5,
+                              retry_after = 1)
+        assert admission.acquire('music')
+        order = []
+
+        def request(n):
+            assert admission.acquire('music')
+            order.append(n)
+            admission.release('music')
+
+        threads = []
+        for n in range(3):
+            threads.append(threading.Thread(target = request, args = (n,)))
+            threads[-1].start()
+            wait_for(lambda: len(admission._waiting['music']) == n + 1)
+
+        admission.release('music')
+        for thread in threads:
+            thread.join()
+        assert order == [0, 1, 2]
+        assert admission._active == {}
@@ -0,0 +1,72 @@
+import hashlib
+import secrets
+from timeit import timeit
+
+from cyberdas.utils.hash_type import HashType, Hash
+
+
+def legacy_hash(data):
+    'Хэширование в том виде, в котором оно было до выбора прямого конструктора'
+    hashing = hashlib.new('sha256')
+    hashing.update(data.encode())
+    return hashing.digest()
+
+
+class TestHashType:
+
+    def test_digest(self):
+        'Дайджест должен совпадать с дайджестом из hashlib'
+        hash_type = HashType('sha256')
+        assert hash_type._hash('abc') == hashlib.sha256(b'abc').digest()
+        assert hash_type._hash(b'abc') == hashlib.sha256(b'abc').digest()
+        assert hash_type.length == 32
+
+    def test_constructor(self):
+        'Для алгоритмов из hashlib используется прямой конструктор'
+        assert HashType('sha256')._constructor is hashlib.sha256
+
+    def test_no_memo(self):
+        'Хэшируемые значения не должны запоминаться'
+        hash_type = HashType('sha256')
+        hash_type._hash('sid')
+        assert not hasattr(hash_type._hash, 'cache_info')
+
+
+class TestHash:
+
+    def test_eq(self):
+        'Объект Hash равен исходной строке и другим объектам с той же суммой'
+        hash_type = HashType('sha256')
+        value = Hash(hash_type._hash('sid'), hash_type._hash)
+        assert value == 'sid'
+        assert value != 'other'
+        assert value == Hash(hash_type._hash('sid'), hash_type._hash)
+
+    def test_hashable(self):
+        'Объекты Hash с одной хэш-суммой должны совпадать в множествах'
+        hash_type = HashType('sha256')
+        first = Hash(hash_type._hash('sid'), hash_type._hash)
+        second = Hash(hash_type._hash('sid'), hash_type._hash)
+        assert len({first, second}) == 1
+        assert {first: 1}[second] == 1
+
+    def test_slots(self):
+        'Объекты Hash не должны иметь __dict__'
+        assert not hasattr(Hash(b'', None), '__dict__')
+
+
+class TestBenchmark:
+
+    N = 20000
+
+    def test_lookup_cost(self):
+        '''
+        Стоимость хэширования одного и того же sid при каждом поиске сессии.
+        Запустите с `pytest -s`, чтобы увидеть цифры.
+        '''
+        hash_type = HashType('sha256')
+        sid = secrets.token_urlsafe(32)
+        legacy = timeit(lambda: legacy_hash(sid), number = self.N)
+        direct = timeit(lambda: hash_type._hash(sid), number = self.N)
+        print(f"\nhashlib.new: {legacy / self.N * 1e9:.0f} нс,"
+              f" прямой конструктор: {direct / self.N * 1e9:.0f} нс")
@@ -85,3 +85,24 @@ class TestItem:
         assert 'duration' in valid_get
         assert 'waterfall' in valid_get
         assert 'only_once' in valid_get
+
+
+class TestETag:
+
+    @pytest.mark.parametrize('uri', ['/queues', '/queues/music'])
+    def test_not_modified(self, client, queueDB, uri):
+        'Повторный запрос с тем же ETag получает 304 Not Modified без тела'
+        etag = client.simulate_get(uri).headers['ETag']
+        resp = client.simulate_get(uri, headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_304
+        assert resp.text == ''
+
+    def test_version(self, client, queueDB):
+        'ETag очереди меняется вместе с её версией'
+        etag = client.simulate_get('/queues/music').headers['ETag']
+        with queueDB.session as dbses:
+            dbses.query(Queue).filter_by(name = 'music').first().version += 1
+        resp = client.simulate_get('/queues/music',
+                                   headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_200
+        assert resp.headers['ETag'] != etag
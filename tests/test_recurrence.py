@@ -0,0 +1,84 @@
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from cyberdas.models import Queue
+from cyberdas.utils.recurrence import slot_id, slot_time, slot_times, is_slot
+
+
+def make_queue(**kwargs):
+    'Очередь по будним дням с 9:00 до 10:40 со слотами по 45 минут'
+    params = dict(name = 'q', title = 'q', description = 'q', duration = 45,
+                  weekdays = [0, 1, 2, 3, 4], opens = time(9),
+                  closes = time(10, 40))
+    params.update(kwargs)
+    return Queue(**params)
+
+
+# Понедельник
+MONDAY = date(2026, 10, 19)
+
+
+class TestRecurrence:
+
+    def test_id(self):
+        'Идентификатор слота однозначно соответствует времени его начала'
+        moment = datetime(2026, 10, 19, 9, 45)
+        assert slot_time(slot_id(moment)) == moment
+        assert slot_id(moment) + 1 == slot_id(datetime(2026, 10, 19, 9, 46))
+        assert slot_time('abc') is None
+
+    def test_slot_times(self):
+        'Слоты генерируются только в рабочие дни и заканчиваются до закрытия'
+        queue = make_queue()
+        start = datetime.combine(MONDAY, time.min)
+        times = list(slot_times(queue, start, datetime(2026, 10, 26)))
+        assert len(times) == 10
+        assert times[:2] == [datetime(2026, 10, 19, 9),
+                             datetime(2026, 10, 19, 9, 45)]
+        assert all(moment.weekday() < 5 for moment in times)
+
+    def test_slot_times_bounds(self):
+        'Учитываются только слоты, начинающиеся внутри интервала'
+        queue = make_queue()
+        times = list(slot_times(queue, datetime(2026, 10, 19, 9, 30),
+                                datetime(2026, 10, 20, 9, 30)))
+        assert times == [datetime(2026, 10, 19, 9, 45),
+                         datetime(2026, 10, 20, 9)]
+
+    def test_exceptions(self):
+        'В дни-исключения слотов нет'
+        queue = make_queue(exceptions = [MONDAY])
+        start = datetime.combine(MONDAY, time.min)
+        assert list(slot_times(queue, start, datetime(2026, 10, 20))) == []
+        assert not is_slot(queue, datetime(2026, 10, 19, 9))
+
+    def test_is_slot(self):
+        'Слотом является только момент из сетки расписания'
+        queue = make_queue()
+        assert is_slot(queue, datetime(2026, 10, 19, 9, 45))
+        assert not is_slot(queue, datetime(2026, 10, 19, 9, 50))
+        assert not is_slot(queue, datetime(2026, 10, 19, 10, 30))
+        assert not is_slot(queue, datetime(2026, 10, 18, 9))
+        assert not is_slot(queue, None)
+
+    @pytest.mark.parametrize('params', [
+        {'opens': None}, {'closes': None}, {'duration': 0},
+        {'opens': time(11)}
+    ])
+    def test_invalid(self, params):
+        'У очереди с неполным или неверным расписанием слотов нет'
+        queue = make_queue(**params)
+        start = datetime.combine(MONDAY, time.min)
+        assert list(slot_times(queue, start, datetime(2026, 10, 26))) == []
+        assert not is_slot(queue, datetime(2026, 10, 19, 9))
+
+    @pytest.mark.parametrize('params', [
+        {'opens': None}, {'duration': 0}, {'opens': time(11)}
+    ])
+    def test_check(self, defaultDB, params):
+        'БД не позволяет сохранить очередь с неверным расписанием'
+        with pytest.raises(IntegrityError):
+            with defaultDB.session as dbses:
+                dbses.add(make_queue(**params))
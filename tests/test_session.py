@@ -1,3 +1,4 @@
+import logging
 import secrets
 from os import environ
 from datetime import datetime, timedelta
@@ -5,11 +6,18 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 import sqlalchemy
+from falcon import testing
 
+from cyberdas.app import Service
 from cyberdas.config import get_cfg
 from cyberdas.models import Session as SessionModel
+from cyberdas.resources.feedback import FeedbackCollection
 from cyberdas.services.session.session import Session as SessionController
 from cyberdas.services.session.manager import SessionManager
+from cyberdas.services.session.cache import SessionCache
+from cyberdas.services.session.activity import ActivityBuffer
+from cyberdas.services.session.csrf import (derive_csrf_token,
+                                            verify_csrf_token)
 from cyberdas.exceptions import BadAuthError, NoSessionError
 cfg = get_cfg()
 
@@ -44,7 +52,7 @@ class TestController:
         expires = session.new(
             dbses,
             ip = '123.123.123.123', uid = '1', user_agent = 'curl',
-            sid = 'lol123', csrf_token = 'kek123'
+            sid = 'lol123'
         )
         now = datetime.now()
 
@@ -52,7 +60,6 @@ class TestController:
         delta = ((now + timedelta(seconds = self.length)) - expires)
         assert delta.microseconds < 5 * 10**4
         assert ses is not None
-        assert ses.csrf_token == 'kek123'
         assert ses.expires.replace(tzinfo = None) == expires
 
     def test_prolong(self, dbses, auth, session):
@@ -82,6 +89,64 @@ class TestController:
         ses = dbses.query(SessionModel).filter_by(sid = sid).first()
         assert ses is None
 
+    def test_terminate_unexisting(self, dbses, session):
+        'Метод terminate должен возвращать ошибку, в случае отсутствия объекта в БД' # noqa
+        with pytest.raises(NoSessionError):
+            session.terminate(dbses, sid = 'lkjwqasdaw123asd')
+
+    def test_prolong_many(self, dbses, session):
+        '''
+        Метод prolong_many должен одним запросом продлевать несколько объектов
+        и возвращать идентификаторы найденных
+        '''
+        for sid in ['many1', 'many2']:
+            session.new(dbses, ip = '1.1.1.1', uid = '1', user_agent = sid,
+                        sid = sid)
+        dbses.flush()
+        expires, matched = session.prolong_many(
+            dbses, [{'sid': 'many1'}, {'sid': 'many2'}, {'sid': 'none'}]
+        )
+        assert sorted(str(ids['sid']) for ids in matched) == sorted(
+            str(ses.sid) for ses in dbses.query(SessionModel).filter(
+                SessionModel.user_agent.in_(['many1', 'many2'])
+            )
+        )
+        assert len(matched) == 2
+
+    def test_terminate_many(self, dbses, session):
+        '''
+        Метод terminate_many должен одним запросом удалять несколько объектов
+        и возвращать идентификаторы удаленных
+        '''
+        matched = session.terminate_many(
+            dbses, [{'sid': 'many1'}, {'sid': 'many2'}, {'sid': 'none'}]
+        )
+        assert len(matched) == 2
+        assert matched[0]['sid'] in ['many1', 'many2']
+        assert session.terminate_many(dbses, []) == []
+        with pytest.raises(NoSessionError):
+            session.get(dbses, sid = 'many1')
+
+    def test_reap(self, dbses, session):
+        '''
+        Метод reap должен удалять не более limit истёкших объектов и не трогать
+        действующие
+        '''
+        past = datetime.now() - timedelta(days = 1)
+        for x in range(3):
+            dbses.add(SessionModel(sid = f'old{x}', uid = 1, ip = '1.1.1.1',
+                                   user_agent = 'curl', expires = past))
+        dbses.flush()
+        alive = dbses.query(SessionModel).filter(
+            SessionModel.expires >= datetime.now()).count()
+
+        assert session.expired(dbses).count() == 3
+        assert session.reap(dbses, 2) == 2
+        assert session.reap(dbses, 2) == 1
+        assert session.reap(dbses, 2) == 0
+        assert session.expired(dbses).count() == 0
+        assert dbses.query(SessionModel).count() == alive
+
     def test_form_cookie(self, session):
         'Метод form_cookie должен формировать безопасный куки и ставить max_age'
         cookie_dict = session.form_cookie('lol123')
@@ -127,8 +192,8 @@ class TestManager:
         Метод start должен начинать новую сессию и возвращать словарь
         для формирования нового куки и CSRF-токен
 
-        При этом он должен генерировать криптографически стойкий sid и
-        csrf-токен (используя модуль secrets)
+        При этом он должен генерировать криптографически стойкий sid (используя
+        модуль secrets), а CSRF-токен должен выводиться из него
         '''
         cookie, csrf_token = manager.start(dbses, ip = '123.123.123.123',
                                            uid = '1', user_agent = 'curl')
@@ -137,7 +202,7 @@ class TestManager:
 
         ses = dbses.query(SessionModel).filter_by(sid = cookie['value']).first()
         assert ses is not None
-        assert ses.csrf_token == csrf_token
+        assert csrf_token == derive_csrf_token(cookie['value'])
 
     def test_refresh(self, dbses, auth, manager):
         '''
@@ -195,6 +260,9 @@ class TestManager:
         sid = environ['SESSIONID']
         ses = dbses.query(SessionModel).filter_by(sid = sid)
         ses.update({SessionModel.expires: datetime.now() - timedelta(days = 1)})
+        # Сессия изменена в обход менеджера, как если бы это сделал другой
+        # процесс, поэтому кэш нужно сбросить
+        manager.cache.clear()
         with pytest.raises(BadAuthError):
             manager.authenticate(dbses, {'SESSIONID': sid})
 
@@ -211,3 +279,242 @@ class TestManager:
 
         ses = dbses.query(SessionModel).filter_by(sid = sid).first()
         assert ses is None
+
+
+class TestCache:
+
+    def test_cached_auth(self, dbses, auth, manager):
+        '''
+        Повторная аутентификация по той же сессии не должна обращаться к БД
+        '''
+        sid = environ['SESSIONID']
+        manager.cache.clear()
+        data = manager.authenticate(dbses, {'SESSIONID': sid})
+        db = MagicMock()
+        cached = manager.authenticate(db, {'SESSIONID': sid})
+        db.query.assert_not_called()
+        assert cached == data
+
+    def test_refresh_updates(self, dbses, auth, manager):
+        'Метод refresh должен обновлять время истечения сессии в кэше'
+        sid = environ['SESSIONID']
+        manager.authenticate(dbses, {'SESSIONID': sid})
+        manager.refresh(dbses, sid = sid)
+        _, expires = manager.cache.get(sid)
+        ses = dbses.query(SessionModel).filter_by(sid = sid).first()
+        assert expires == ses.expires.replace(tzinfo = None)
+
+    def test_end_invalidates(self, dbses, auth, manager):
+        'Метод end должен сразу убирать сессию из кэша'
+        sid = environ['SESSIONID']
+        data = manager.authenticate(dbses, {'SESSIONID': sid})
+        manager.end(dbses, sid = data['sid'])
+        assert manager.cache.get(sid) is None
+        with pytest.raises(BadAuthError):
+            manager.authenticate(dbses, {'SESSIONID': sid})
+
+    def test_end_deleted(self, dbses, manager, client):
+        '''
+        Сессия, удаленная другим процессом, но оставшаяся в кэше, должна
+        заканчиваться без ошибки
+        '''
+        cookie, csrf_token = manager.start(dbses, ip = '127.0.0.1',
+                                           uid = 1, user_agent = 'curl')
+        dbses.commit()
+        sid = cookie['value']
+        manager.authenticate(dbses, {'SESSIONID': sid})
+        dbses.query(SessionModel).filter_by(sid = sid).delete()
+        dbses.commit()
+        assert manager.cache.get(sid) is not None
+
+        resp = client.simulate_post('/account/logout',
+                                    cookies = {'SESSIONID': sid},
+                                    headers = {'X-CSRF-Token': csrf_token})
+        assert resp.status_code == 204
+        assert resp.cookies['SESSIONID'].max_age == -1
+        assert manager.cache.get(sid) is None
+
+    def test_ttl(self):
+        'Записи в кэше должны устаревать через ttl секунд'
+        cache = SessionCache(ttl = 10, size = 10)
+        with patch('cyberdas.services.session.cache.monotonic') as clock:
+            clock.return_value = 100
+            cache.put('sid', {'uid': 1}, datetime.max)
+            clock.return_value = 105
+            assert cache.get('sid') == ({'uid': 1}, datetime.max)
+            clock.return_value = 111
+            assert cache.get('sid') is None
+        assert len(cache) == 0
+
+    def test_lru(self):
+        'При переполнении из кэша вытесняется давно не использованная запись'
+        cache = SessionCache(ttl = 10, size = 2)
+        cache.put('a', {'uid': 1}, datetime.max)
+        cache.put('b', {'uid': 2}, datetime.max)
+        cache.get('a')
+        cache.put('c', {'uid': 3}, datetime.max)
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+
+    def test_disabled(self):
+        'При нулевом ttl кэш ничего не хранит'
+        cache = SessionCache(ttl = 0, size = 10)
+        cache.put('a', {'uid': 1}, datetime.max)
+        assert cache.get('a') is None
+
+
+class TestLazyUser:
+
+    def test_exempt_not_read(self, client):
+        '''
+        Запросы без куки сессии к эндпоинтам без аутентификации не должны
+        обращаться к таблице сессий
+        '''
+        with patch.object(SessionController, 'get') as get:
+            resp = client.simulate_get('/queues')
+        assert resp.status_code == 200
+        get.assert_not_called()
+
+    def test_exempt_logged(self, a_client, dbses, manager, caplog):
+        '''
+        Пользователь эндпоинтов без аутентификации попадает в access-лог, если
+        он известен без обращения к БД, а ради лога сессия не загружается
+        '''
+        manager.cache.clear()
+        with patch.object(SessionController, 'get') as get, \
+             caplog.at_level(logging.INFO, logger = 'access'):
+            resp = a_client.simulate_get('/queues')
+        assert resp.status_code == 200
+        get.assert_not_called()
+        assert ' id:' not in caplog.records[-1].getMessage()
+
+        sid = environ['SESSIONID']
+        uid = manager.authenticate(dbses, {'SESSIONID': sid})['uid']
+        with patch.object(SessionController, 'get') as get, \
+             caplog.at_level(logging.INFO, logger = 'access'):
+            a_client.simulate_get('/queues')
+        get.assert_not_called()
+        assert f'/queues id:{uid} ' in caplog.records[-1].getMessage()
+
+    def test_exempt_csrf(self, auth):
+        '''
+        CSRF-токен POST-запросов к эндпоинтам без аутентификации проверяется до
+        вызова обработчика
+        '''
+        with patch.object(FeedbackCollection, 'on_post') as on_post:
+            client = testing.TestClient(Service())
+            resp = client.simulate_post(
+                '/feedback/admin/items', json = {},
+                cookies = {'SESSIONID': auth['SESSIONID']},
+                headers = {'X-CSRF-Token': 'wrong'}
+            )
+        assert resp.status_code == 401
+        on_post.assert_not_called()
+
+    def test_exempt_read(self, a_client):
+        '''
+        Эндпоинты без аутентификации должны аутентифицировать пользователя при
+        первом обращении к req.context.user
+        '''
+        with patch.object(SessionManager, 'authenticate',
+                          return_value = {'uid': 1}) as authenticate:
+            resp = a_client.simulate_get('/queues/music/slots',
+                                         params = {'my': 1})
+        assert resp.status_code == 200
+        authenticate.assert_called_once()
+
+    def test_exempt_anonymous(self, client):
+        '''
+        Для неаутентифицированного пользователя req.context.user равен None
+        '''
+        resp = client.simulate_get('/queues/music/slots', params = {'my': 1})
+        assert resp.status_code == 401
+
+
+class TestActivity:
+
+    def test_coalesce(self):
+        'Повторные обращения одной сессии схлопываются в одну запись'
+        buffer = ActivityBuffer(interval = 60)
+        now = datetime.now()
+        buffer.record(b'a', now)
+        buffer.record(b'a', now - timedelta(seconds = 5))
+        buffer.record(b'a', now + timedelta(seconds = 5))
+        buffer.record(b'b', now)
+        assert len(buffer) == 2
+        entries = buffer.drain(force = True)
+        assert entries[b'a'] == now + timedelta(seconds = 5)
+        assert len(buffer) == 0
+
+    def test_interval(self):
+        'Буфер отдает записи не чаще, чем раз в interval секунд'
+        with patch('cyberdas.services.session.activity.monotonic') as clock:
+            clock.return_value = 100
+            buffer = ActivityBuffer(interval = 60)
+            buffer.record(b'a', datetime.now())
+            clock.return_value = 130
+            assert buffer.drain() == {}
+            clock.return_value = 161
+            assert b'a' in buffer.drain()
+
+    def test_flush(self, dbses, auth, manager):
+        '''
+        Метод flush_activity должен одним запросом записывать время последней
+        активности сессий в БД
+        '''
+        sid = environ['SESSIONID']
+        manager.activity.drain(force = True)
+        manager.authenticate(dbses, {'SESSIONID': sid})
+        assert manager.flush_activity(dbses.get_bind(), force = True) == 1
+        ses = dbses.query(SessionModel).filter_by(sid = sid).first()
+        dbses.refresh(ses)
+        assert ses.last_seen is not None
+        assert datetime.now() - ses.last_seen < timedelta(seconds = 5)
+        assert manager.flush_activity(dbses.get_bind(), force = True) == 0
+
+    def test_flush_separately(self, dbses, auth, manager):
+        '''
+        Активность записывается в отдельной транзакции: откат транзакции
+        запроса её не отменяет, а неудачная запись возвращает её в буфер
+        '''
+        sid = environ['SESSIONID']
+        manager.activity.drain(force = True)
+        manager.authenticate(dbses, {'SESSIONID': sid})
+        key = SessionController.stored_key(sid)
+        assert list(manager.activity.drain(force = True)) == [key]
+
+        seen = datetime.now() + timedelta(hours = 1)
+        manager.activity.record(key, seen)
+        engine = MagicMock()
+        engine.begin.side_effect = sqlalchemy.exc.OperationalError('', {}, '')
+        with pytest.raises(sqlalchemy.exc.OperationalError):
+            manager.flush_activity(engine, force = True)
+        assert len(manager.activity) == 1
+
+        assert manager.flush_activity(dbses.get_bind(), force = True) == 1
+        dbses.rollback()
+        ses = dbses.query(SessionModel).filter_by(sid = sid).first()
+        dbses.refresh(ses)
+        assert ses.last_seen == seen
+
+
+class TestCSRF:
+
+    def test_derive(self):
+        'CSRF-токен детерминированно выводится из sid и различается у сессий'
+        assert derive_csrf_token('abc') == derive_csrf_token('abc')
+        assert derive_csrf_token('abc') != derive_csrf_token('abd')
+
+    def test_derive_hash(self, dbses, auth):
+        'Токены, выведенные из sid и из его хэш-суммы в БД, должны совпадать'
+        sid = environ['SESSIONID']
+        ses = dbses.query(SessionModel).filter_by(sid = sid).first()
+        assert derive_csrf_token(ses.sid) == derive_csrf_token(sid)
+
+    def test_verify(self):
+        'Проверка должна отклонять чужие и отсутствующие токены'
+        token = derive_csrf_token('abc')
+        assert verify_csrf_token('abc', token)
+        assert not verify_csrf_token('abd', token)
+        assert not verify_csrf_token('abc', None)
@@ -0,0 +1,83 @@
+import falcon
+
+from cyberdas.middleware.session import (
+    SessionMiddleware,
+    EXEMPT,
+    REQUIRED,
+    CSRF_REQUIRED,
+)
+
+
+class Public:
+
+    auth = {'disabled': 1}
+
+    def on_get(self, req, resp):
+        pass
+
+
+class Private:
+
+    auth = {'exempt_methods': ['GET']}
+
+    def on_get(self, req, resp):
+        pass
+
+    def on_post(self, req, resp):
+        pass
+
+    def on_delete(self, req, resp):
+        pass
+
+    def on_get_item(self, req, resp, id):
+        pass
+
+    def on_post_item(self, req, resp, id):
+        pass
+
+
+def make_api():
+    api = falcon.App()
+    api.add_route('/public', Public())
+    api.add_route('/private', Private())
+    api.add_route('/private/{id}', Private(), suffix = 'item')
+    return api
+
+
+class TestPolicies:
+
+    def test_disabled(self):
+        'Все методы эндпоинта с disabled не требуют аутентификации'
+        policies = SessionMiddleware(make_api()).policies
+        assert policies[('/public', 'GET')] == EXEMPT
+        assert policies[('/public', 'POST')] == EXEMPT
+
+    def test_exempt_methods(self):
+        'Методы из exempt_methods эндпоинта не требуют аутентификации'
+        policies = SessionMiddleware(make_api()).policies
+        assert policies[('/private', 'GET')] == EXEMPT
+        assert policies[('/private', 'DELETE')] == REQUIRED
+        assert policies[('/private', 'POST')] == CSRF_REQUIRED
+
+    def test_suffix(self):
+        'Таблица политик покрывает эндпоинты с суффиксами'
+        policies = SessionMiddleware(make_api()).policies
+        assert policies[('/private/{id}', 'GET')] == EXEMPT
+        assert policies[('/private/{id}', 'POST')] == CSRF_REQUIRED
+
+    def test_global_settings(self):
+        'Аргументы конструктора применяются ко всем эндпоинтам'
+        middleware = SessionMiddleware(make_api(), exempt_routes = ['/private'],
+                                       exempt_methods = ['DELETE'])
+        assert middleware.policies[('/private', 'POST')] == EXEMPT
+        assert middleware.policies[('/private/{id}', 'DELETE')] == EXEMPT
+        assert middleware.policies[('/private/{id}', 'POST')] == CSRF_REQUIRED
+
+    def test_late_route(self):
+        'Для эндпоинтов, добавленных позже, политика вычисляется на лету'
+        api = make_api()
+        middleware = SessionMiddleware(api)
+        api.add_route('/late', Private())
+        assert ('/late', 'GET') not in middleware.policies
+        policy = middleware._get_policy(Private(), '/late', 'POST')
+        assert policy == CSRF_REQUIRED
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cyberdas.config import get_cfg
+from cyberdas.exceptions import BadAuthError
+from cyberdas.services.session import (
+    SessionManager,
+    SignedSessionManager,
+    create_session_manager,
+)
+from cyberdas.services.session.revocation import RevocationList
+from cyberdas.services.session.signed_session import SignedSession
+
+session_data = {'uid': 1, 'ip': '127.0.0.1', 'user_agent': 'curl'}
+
+
+@pytest.fixture(scope = 'class')
+def manager():
+    yield SignedSessionManager()
+
+
+def cookies(cookie):
+    return {cookie['name']: cookie['value']}
+
+
+class TestSignedManager:
+
+    def test_start(self, dbses, manager):
+        '''
+        Метод start должен возвращать подписанный куки с данными сессии и
+        CSRF-токен, не обращаясь к БД
+        '''
+        db = MagicMock()
+        cookie, csrf_token = manager.start(db, **session_data)
+        db.add.assert_not_called()
+        data = manager.authenticate(dbses, cookies(cookie))
+        assert data['uid'] == 1
+        assert data['csrf_token'] == csrf_token
+        assert data['ip'] == '127.0.0.1'
+
+    def test_auth_no_db(self, dbses, manager):
+        'Аутентификация между опросами списка отзыва не обращается к БД'
+        cookie, _ = manager.start(dbses, **session_data)
+        manager.revocations.poll(dbses, force = True)
+        db = MagicMock()
+        manager.authenticate(db, cookies(cookie))
+        db.query.assert_not_called()
+
+    def test_peek(self, dbses, manager):
+        'Метод peek проверяет подпись и список отзыва, не обращаясь к БД'
+        cookie, _ = manager.start(dbses, **session_data)
+        assert manager.peek(cookies(cookie))['uid'] == 1
+        assert manager.peek({'SESSIONID': cookie['value'] + 'a'}) is None
+        assert manager.peek({}) is None
+
+    def test_auth_tampered(self, dbses, manager):
+        'Куки с неверной подписью не принимаются'
+        cookie, _ = manager.start(dbses, **session_data)
+        with pytest.raises(BadAuthError):
+            manager.authenticate(dbses, {'SESSIONID': cookie['value'] + 'a'})
+        with pytest.raises(BadAuthError):
+            manager.authenticate(dbses, {})
+
+    def test_auth_expired(self, dbses, manager):
+        'Просроченные куки не принимаются'
+        cookie, _ = manager.start(dbses, **session_data)
+        with patch.object(SignedSession, 'length', -1):
+            with pytest.raises(BadAuthError):
+                manager.authenticate(dbses, cookies(cookie))
+
+    def test_refresh(self, dbses, manager):
+        'Метод refresh должен переподписывать ту же сессию'
+        cookie, _ = manager.start(dbses, **session_data)
+        data = manager.authenticate(dbses, cookies(cookie))
+        new_cookie = manager.refresh(dbses, **data)
+        assert manager.authenticate(dbses, cookies(new_cookie)) == data
+
+    def test_end(self, dbses, manager):
+        '''
+        Метод end должен сразу отзывать сессию в этом процессе и через опрос БД
+        в остальных
+        '''
+        cookie, _ = manager.start(dbses, **session_data)
+        data = manager.authenticate(dbses, cookies(cookie))
+        other = RevocationList(interval = 0, length = SignedSession.length)
+        other.poll(dbses)
+
+        expired = manager.end(dbses, sid = data['sid'])
+        dbses.commit()
+        assert expired['max_age'] == -1
+        with pytest.raises(BadAuthError):
+            manager.authenticate(dbses, cookies(cookie))
+
+        issued = datetime.now()
+        assert not other.is_revoked(data['sid'], 1, issued)
+        other.poll(dbses)
+        assert other.is_revoked(data['sid'], 1, issued)
+
+    def test_end_all(self, dbses, manager):
+        '''
+        Метод end_all должен отзывать все выданные ранее сессии пользователя,
+        кроме оставленной
+        '''
+        first, _ = manager.start(dbses, **session_data)
+        second, _ = manager.start(dbses, **session_data)
+        keep = manager.authenticate(dbses, cookies(second))['sid']
+        manager.end_all(dbses, 1, keep = keep)
+        dbses.commit()
+
+        with pytest.raises(BadAuthError):
+            manager.authenticate(dbses, cookies(first))
+        manager.authenticate(dbses, cookies(second))
+        later, _ = manager.start(dbses, **session_data)
+        manager.authenticate(dbses, cookies(later))
+
+    def test_refresh_end_all(self, dbses, manager):
+        '''
+        Продленная после отзыва всех сессий пользователя сессия остается
+        отозванной, так как время её выдачи не меняется
+        '''
+        cookie, _ = manager.start(dbses, **session_data)
+        other = SignedSessionManager()
+        other.revocations = RevocationList(interval = 3600,
+                                           length = SignedSession.length)
+        other.revocations.poll(dbses)
+
+        manager.end_all(dbses, 1)
+        dbses.commit()
+        # Процесс, ещё не опросивший БД, продлевает сессию
+        refreshed = other.refresh(dbses, **other.authenticate(
+            dbses, cookies(cookie)))
+        other.revocations.poll(dbses, force = True)
+        with pytest.raises(BadAuthError):
+            other.authenticate(dbses, cookies(refreshed))
+
+    def test_end_rollback(self, dbses, manager):
+        'Отзыв сессии в откаченной транзакции не применяется'
+        cookie, _ = manager.start(dbses, **session_data)
+        data = manager.authenticate(dbses, cookies(cookie))
+        manager.end(dbses, sid = data['sid'])
+        manager.authenticate(dbses, cookies(cookie))
+        dbses.rollback()
+        manager.revocations.poll(dbses, force = True)
+        manager.authenticate(dbses, cookies(cookie))
+
+
+class TestRevocationList:
+
+    def test_commit_order(self, defaultDB, dbses, manager):
+        '''
+        Запись с меньшим номером версии, зафиксированная позже записи с
+        большим, не пропускается при опросе
+        '''
+        other = RevocationList(interval = 0, length = SignedSession.length)
+        with defaultDB.session as slow, defaultDB.session as fast:
+            manager.revocations.revoke(slow, sid = 'slow')
+            slow.flush()
+            manager.revocations.revoke(fast, sid = 'fast')
+            fast.commit()
+            other.poll(dbses)
+            dbses.commit()
+            assert other.is_revoked('fast', 1, datetime.now())
+            assert not other.is_revoked('slow', 1, datetime.now())
+            slow.commit()
+        other.poll(dbses)
+        assert other.is_revoked('slow', 1, datetime.now())
+
+    def test_prune(self):
+        'Истёкшие записи об отзыве удаляются из памяти'
+        revocations = RevocationList(interval = 0, length = 0)
+        row = MagicMock(sid = 'abc', uid = None,
+                        expires = datetime.now() - timedelta(seconds = 1))
+        revocations._apply(row)
+        assert revocations.is_revoked('abc', 1, datetime.now())
+        revocations._prune()
+        assert not revocations.is_revoked('abc', 1, datetime.now())
+
+
+class TestFactory:
+
+    def test_backends(self):
+        'Фабрика должна возвращать менеджер, выбранный в конфигурации'
+        cfg = get_cfg()
+        cfg['internal']['session.backend'] = 'signed'
+        assert isinstance(create_session_manager(cfg), SignedSessionManager)
+        cfg['internal']['session.backend'] = 'database'
+        manager = create_session_manager(cfg)
+        assert type(manager) is SessionManager
+
+    def test_unknown(self):
+        'На неизвестный тип сессий выбрасывается ошибка'
+        cfg = get_cfg()
+        cfg['internal']['session.backend'] = 'redis'
+        with pytest.raises(ValueError):
+            create_session_manager(cfg)
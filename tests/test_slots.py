@@ -1,11 +1,37 @@
+import re
 import pytest
 import json
-from datetime import datetime, timedelta, date
+import select
+import secrets
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from time import perf_counter, sleep
+from timeit import timeit
+from datetime import datetime, timedelta, date, time as dt_time
 from unittest.mock import MagicMock, patch
 
 import falcon
+from falcon import testing
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
 
-from cyberdas.models import Queue, Slot
+from cyberdas.app import Service
+from cyberdas.models import Queue, Slot, SlotHistory, Session
+from cyberdas.routes import slot_events
+from cyberdas.scripts.archive_slots import archive
+from cyberdas.services import SlotEvents, Admission, mark_changed
+from cyberdas.services.session.csrf import derive_csrf_token
+from cyberdas.resources.slots import (
+    reserve_statement,
+    insert_slots,
+    serialize_slots,
+    SLOT_COLUMNS,
+    STREAM_CHUNK,
+    RECURRING_HORIZON
+)
+from cyberdas.utils.recurrence import slot_id
 
 
 @pytest.fixture(scope = 'class')
@@ -36,6 +62,38 @@ def queueDB(defaultDB):
     yield defaultDB
 
 
+@contextmanager
+def capture_queries(marker):
+    '''
+    Собирает пары (запрос, параметры) всех выполненных внутри блока
+    SQL-запросов, текст которых содержит `marker`
+    '''
+    queries = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if marker in statement:
+            queries.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', capture)
+    try:
+        yield queries
+    finally:
+        event.remove(Engine, 'before_cursor_execute', capture)
+
+
+def explain(db, statement, parameters):
+    '''
+    Возвращает текстовый план выполнения запроса. Полный просмотр таблиц при
+    этом запрещается, так как в тестовой БД слишком мало слотов, чтобы
+    планировщик сам предпочел ему индекс
+    '''
+    with db.session as dbses:
+        cursor = dbses.connection().connection.cursor()
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('EXPLAIN ' + statement, parameters)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
 class TestCollection:
 
     URI = '/queues/music/slots'
@@ -112,6 +170,26 @@ class TestCollection:
         resp = client.simulate_get(self.URI, params = {'my': 1})
         assert resp.status == falcon.HTTP_401
 
+    def test_get_my_index(self, a_client, queueDB):
+        'Слоты пользователя должны выбираться по частичному индексу'
+        with capture_queries('FROM slots') as queries:
+            a_client.simulate_get(self.URI, params = {'my': 1})
+        plan = explain(queueDB, *queries[-1])
+        assert 'ix_slots_queue_name_user_id_time' in plan
+
+    def test_get_day_offset_index(self, a_client, queueDB):
+        '''
+        Запрос слотов за промежуток дат должен фильтровать время через индекс
+        по (queue_name, time), а не просматривать все слоты очереди
+        '''
+        with capture_queries('FROM slots') as queries:
+            a_client.simulate_get(self.URI, params = {'day': date.today(),
+                                                      'offset': 4})
+        plan = explain(queueDB, *queries[-1])
+        assert 'ix_slots_queue_name_time' in plan
+        conds = [line for line in plan.splitlines() if 'Index Cond' in line]
+        assert any('time' in line for line in conds)
+
 
 class TestItem:
 
@@ -154,6 +232,16 @@ class TestReserve:
         resp = a_client.simulate_post(self.URI.replace('/2/', '/40/'))
         assert resp.status == falcon.HTTP_404
 
+    def test_post_one_query(self, a_client, queueDB):
+        'Успешное резервирование должно обращаться к слотам одним запросом'
+        with capture_queries('slots') as queries:
+            resp = a_client.simulate_post(self.URI.replace('/2/', '/6/'))
+        assert resp.status == falcon.HTTP_201
+        assert len(queries) == 1
+        assert queries[0][0].startswith('UPDATE slots')
+
+        a_client.simulate_delete(self.URI.replace('/2/', '/6/'))
+
     def test_post(self, a_client, queueDB):
         'POST на свободный слот должен резервировать его под пользователя'
         resp = a_client.simulate_post(self.URI)
@@ -167,6 +255,18 @@ class TestReserve:
         resp = a_client.simulate_get(self.URI.replace('/reserve', ''))
         assert json.loads(resp.text)['free'] is False
 
+    def test_post_rules_index(self, queueDB):
+        '''
+        Проверки правил only_once и only_one_active при резервировании должны
+        выполняться через EXISTS по частичному индексу
+        '''
+        statement = reserve_statement('living2021', 5, 1, datetime.now())
+        with queueDB.session as dbses:
+            compiled = statement.compile(bind = dbses.get_bind())
+        plan = explain(queueDB, str(compiled), compiled.params)
+        assert 'ix_slots_queue_name_user_id_time' in plan
+        assert 'Seq Scan' not in plan
+
     def test_post_twice(self, a_client):
         'При попытке забронировать занятый слот возвращается 403 Forbidden'
         resp = a_client.simulate_post(self.URI)
@@ -239,3 +339,1064 @@ class TestReserve:
 
             resp = a_client.simulate_post(self.URI.replace('/2/', '/8/'))
             assert resp.status == falcon.HTTP_201
+
+
+@pytest.fixture(scope = 'class')
+def bulkDB(queueDB):
+    'База данных с пустой очередью для массового создания слотов'
+    bulk = Queue(
+        name = 'bulk', title = 'Массовая', duration = 5,
+        description = 'Массовая', waterfall = False,
+        only_one_active = False, only_once = False
+    )
+    queueDB.setup_models(bulk)
+    yield queueDB
+
+
+@pytest.fixture()
+def admin():
+    with patch('cyberdas.services.admin.admins', frozenset([1])):
+        yield
+
+
+def bulk_times(n, days = 1):
+    'Возвращает n моментов времени с шагом в 5 минут, начиная через days дней'
+    base = datetime.combine(date.today() + timedelta(days = days),
+                            datetime.min.time())
+    return [(base + timedelta(minutes = 5 * x)).isoformat() for x in range(n)]
+
+
+class TestBulk:
+
+    URI = '/queues/bulk/slots'
+
+    def count(self, db, **filters):
+        with db.session as dbses:
+            return dbses.query(Slot).filter_by(queue_name = 'bulk',
+                                               **filters).count()
+
+    def test_unauth(self, client, bulkDB):
+        'Изменять слоты могут только аутентифицированные пользователи'
+        resp = client.simulate_put(self.URI, json = bulk_times(3))
+        assert resp.status == falcon.HTTP_401
+
+    def test_not_admin(self, a_client, bulkDB):
+        'Изменять слоты могут только администраторы'
+        resp = a_client.simulate_put(self.URI, json = bulk_times(3))
+        assert resp.status == falcon.HTTP_403
+        resp = a_client.simulate_patch(self.URI, json = bulk_times(3))
+        assert resp.status == falcon.HTTP_403
+
+    def test_put_404(self, a_client, bulkDB, admin):
+        'При отсутствии очереди возвращается 404 Not Found'
+        resp = a_client.simulate_put(self.URI.replace('bulk', 'none'),
+                                     json = bulk_times(3))
+        assert resp.status == falcon.HTTP_404
+
+    def test_put_bad_time(self, a_client, bulkDB, admin):
+        'При неверном формате времени возвращается 400 Bad Request'
+        resp = a_client.simulate_put(self.URI, json = ['завтра'])
+        assert resp.status == falcon.HTTP_400
+
+    def test_put_create(self, a_client, bulkDB, admin):
+        'PUT в пустую очередь создает слоты и возвращает 201 Created'
+        times = bulk_times(5)
+        resp = a_client.simulate_put(self.URI, json = times + times[:2])
+        assert resp.status == falcon.HTTP_201
+        assert self.count(bulkDB) == 5
+
+        resp = a_client.simulate_get(self.URI)
+        slots = json.loads(resp.text)
+        assert sorted(slot['id'] for slot in slots) == list(range(5))
+
+    def test_put_replace(self, a_client, bulkDB, admin):
+        '''
+        PUT заменяет слоты очереди, но не удаляет занятые, и возвращает
+        204 No Content
+        '''
+        with bulkDB.session as dbses:
+            slot = dbses.query(Slot).filter_by(queue_name = 'bulk', id = 0).first() # noqa
+            slot.user_id = 1
+
+        times = bulk_times(5)[3:] + bulk_times(2, days = 2)
+        resp = a_client.simulate_put(self.URI, json = times)
+        assert resp.status == falcon.HTTP_204
+        assert self.count(bulkDB) == 5
+        assert self.count(bulkDB, id = 0, user_id = 1) == 1
+        assert self.count(bulkDB, id = 1) == 0
+        assert self.count(bulkDB, id = 6) == 1
+
+    def test_patch(self, a_client, bulkDB, admin):
+        'PATCH добавляет в очередь только отсутствующие в ней слоты'
+        times = bulk_times(2, days = 2) + bulk_times(2, days = 3)
+        resp = a_client.simulate_patch(self.URI, json = times)
+        assert resp.status == falcon.HTTP_204
+        assert self.count(bulkDB) == 7
+
+    def test_patch_rfc3339(self, a_client, bulkDB, admin):
+        '''
+        Время принимается в формате RFC 3339, в том числе с суффиксом Z и
+        дробной частью секунд из любого числа цифр
+        '''
+        day = (date.today() + timedelta(days = 3)).isoformat()
+        resp = a_client.simulate_patch(self.URI, json = [
+            f'{day}T10:00:00Z', f'{day}T10:05:00.5+00:00',
+            f'{day}T10:10:00.1234567z'
+        ])
+        assert resp.status == falcon.HTTP_204
+        assert self.count(bulkDB) == 10
+        with bulkDB.session as dbses:
+            moment = dbses.query(func.max(Slot.time)).filter_by(
+                queue_name = 'bulk').scalar()
+        expected = datetime.fromisoformat(f'{day}T10:10:00.123456+00:00')
+        assert moment == expected.astimezone().replace(tzinfo = None)
+
+    def test_put_many(self, a_client, bulkDB, admin):
+        '''
+        Семестр слотов должен создаваться одной транзакцией. Запустите с
+        `pytest -s`, чтобы увидеть время
+        '''
+        times = bulk_times(10000, days = 4)
+        start = perf_counter()
+        resp = a_client.simulate_put(self.URI, json = times)
+        elapsed = perf_counter() - start
+        print(f"\nPUT 10000 слотов: {elapsed * 1000:.0f} мс")
+        assert resp.status == falcon.HTTP_204
+        assert self.count(bulkDB) == 10001
+
+    def test_put_held(self, a_client, bulkDB, admin):
+        'PUT не удаляет удерживаемые слоты, но удаляет слоты с истёкшим удержанием' # noqa
+        with bulkDB.session as dbses:
+            for id, seconds in [(10, 60), (11, -1)]:
+                slot = dbses.query(Slot).filter_by(queue_name = 'bulk',
+                                                   id = id).first()
+                slot.held_by = 2
+                slot.held_until = datetime.now() + timedelta(seconds = seconds)
+        resp = a_client.simulate_put(self.URI, json = bulk_times(1, days = 9))
+        assert resp.status == falcon.HTTP_204
+        assert self.count(bulkDB, id = 10) == 1
+        assert self.count(bulkDB, id = 11) == 0
+        assert self.count(bulkDB) == 3
+
+
+@pytest.fixture(scope = 'class')
+def recurringDB(queueDB):
+    'База данных с ежедневной очередью с расписанием, не работающей послезавтра'
+    laundry = Queue(
+        name = 'laundry', title = 'Прачечная', duration = 60,
+        description = 'Прачечная', waterfall = False,
+        only_one_active = False, only_once = False,
+        weekdays = list(range(7)), opens = dt_time(8), closes = dt_time(20),
+        exceptions = [date.today() + timedelta(days = 2)]
+    )
+    queueDB.setup_models(laundry)
+    yield queueDB
+
+
+@patch('cyberdas.services.mail.Mail.send', new = MagicMock())
+class TestRecurring:
+
+    URI = '/queues/laundry/slots'
+    TOMORROW = datetime.combine(date.today() + timedelta(days = 1),
+                                dt_time(10))
+
+    def test_get_day(self, a_client, recurringDB):
+        'Свободные слоты очереди с расписанием вычисляются по нему'
+        day = self.TOMORROW.date()
+        resp = a_client.simulate_get(self.URI, params = {'day': day})
+        slots = json.loads(resp.text)
+        assert len(slots) == 12
+        assert slots[0]['time'] == f'{day.isoformat()}T08:00:00'
+        assert slots[0]['id'] == slot_id(datetime.fromisoformat(slots[0]['time'])) # noqa
+        assert all(slot['free'] for slot in slots)
+        with recurringDB.session as dbses:
+            assert dbses.query(Slot).filter_by(queue_name = 'laundry').count() == 0 # noqa
+
+    def test_get_exception(self, a_client, recurringDB):
+        'В дни-исключения у очереди с расписанием нет слотов'
+        day = date.today() + timedelta(days = 2)
+        resp = a_client.simulate_get(self.URI, params = {'day': day})
+        assert json.loads(resp.text) == []
+
+    def test_get_horizon(self, a_client, recurringDB):
+        'Без day возвращаются слоты на RECURRING_HORIZON дней вперед'
+        resp = a_client.simulate_get(self.URI)
+        assert len(json.loads(resp.text)) == 12 * (RECURRING_HORIZON - 1)
+
+    def test_get_item(self, a_client, recurringDB):
+        'Слот очереди с расписанием доступен по идентификатору из времени'
+        id = slot_id(self.TOMORROW)
+        resp = a_client.simulate_get(f'{self.URI}/{id}')
+        assert resp.status == falcon.HTTP_200
+        assert json.loads(resp.text) == {
+            'id': id, 'time': self.TOMORROW.isoformat(), 'free': True
+        }
+        resp = a_client.simulate_get(f'{self.URI}/{id + 1}')
+        assert resp.status == falcon.HTTP_404
+
+    def test_reserve(self, a_client, recurringDB):
+        '''
+        Резервирование слота очереди с расписанием сохраняет его в БД, а
+        отмена резервирования - удаляет
+        '''
+        uri = f'{self.URI}/{slot_id(self.TOMORROW)}'
+        resp = a_client.simulate_post(f'{uri}/reserve')
+        assert resp.status == falcon.HTTP_201
+        assert json.loads(a_client.simulate_get(uri).text)['free'] is False
+        resp = a_client.simulate_get(self.URI, params = {
+            'day': self.TOMORROW.date()
+        })
+        slots = json.loads(resp.text)
+        assert len(slots) == 12
+        assert [slot['free'] for slot in slots].count(False) == 1
+
+        resp = a_client.simulate_post(f'{uri}/reserve')
+        assert resp.status == falcon.HTTP_403
+
+        resp = a_client.simulate_delete(f'{uri}/reserve')
+        assert resp.status == falcon.HTTP_204
+        with recurringDB.session as dbses:
+            assert dbses.query(Slot).filter_by(queue_name = 'laundry').count() == 0 # noqa
+
+    def test_reserve_404(self, a_client, recurringDB):
+        'Слот вне расписания нельзя зарезервировать'
+        id = slot_id(self.TOMORROW) + 1
+        resp = a_client.simulate_post(f'{self.URI}/{id}/reserve')
+        assert resp.status == falcon.HTTP_404
+
+    def test_put(self, a_client, recurringDB, admin):
+        'Слоты очереди с расписанием нельзя задать вручную'
+        resp = a_client.simulate_put(self.URI, json = bulk_times(3))
+        assert resp.status == falcon.HTTP_409
+
+
+class TestSummary:
+
+    URI = '/queues/music/slots/summary'
+
+    def expected(self, client, uri, params):
+        'Считает слоты по дням по ответу коллекции'
+        days = dict()
+        slots = json.loads(client.simulate_get(uri, params = params).text)
+        for slot in slots:
+            day = days.setdefault(slot['time'][:10], {'total': 0, 'free': 0})
+            day['total'] += 1
+            day['free'] += slot['free']
+        return [{'day': day, **counts} for day, counts in sorted(days.items())]
+
+    @pytest.mark.parametrize('params', [
+        {}, {'day': date.today()}, {'day': date.today(), 'offset': 4}
+    ])
+    def test_get(self, client, queueDB, params):
+        'Сводка по дням должна совпадать с содержимым коллекции'
+        resp = client.simulate_get(self.URI, params = params)
+        assert resp.status == falcon.HTTP_200
+        assert json.loads(resp.text) == self.expected(
+            client, self.URI.replace('/summary', ''), params
+        )
+
+    def test_get_one_query(self, client, queueDB):
+        'Слоты должны считаться одним запросом с группировкой в БД'
+        with capture_queries('FROM slots') as queries:
+            client.simulate_get(self.URI)
+        assert len(queries) == 1
+        assert 'GROUP BY' in queries[0][0]
+
+    def test_get_404(self, client, queueDB):
+        'Для несуществующей очереди возвращается 404 Not Found'
+        resp = client.simulate_get(self.URI.replace('music', 'none'))
+        assert resp.status == falcon.HTTP_404
+
+    def test_get_offset(self, client, queueDB):
+        'Offset без day и вне пределов от 1 до 90 не принимается'
+        resp = client.simulate_get(self.URI, params = {'offset': 3})
+        assert resp.status == falcon.HTTP_400
+        resp = client.simulate_get(self.URI, params = {'day': date.today(),
+                                                       'offset': 91})
+        assert resp.status == falcon.HTTP_400
+
+    def test_etag(self, client, queueDB):
+        'Повторный запрос с тем же ETag получает 304 Not Modified без тела'
+        resp = client.simulate_get(self.URI)
+        etag = resp.headers['ETag']
+        resp = client.simulate_get(self.URI,
+                                   headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_304
+        assert resp.text == ''
+
+        resp = client.simulate_get(self.URI, params = {'day': date.today()},
+                                   headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_200
+
+    def test_recurring(self, client, recurringDB):
+        'Сводка по очереди с расписанием вычисляется по нему'
+        uri = self.URI.replace('music', 'laundry')
+        resp = client.simulate_get(uri)
+        summary = json.loads(resp.text)
+        assert len(summary) == RECURRING_HORIZON - 1
+        assert all(day['total'] == 12 for day in summary)
+        assert summary == self.expected(
+            client, uri.replace('/summary', ''), {}
+        )
+
+
+@pytest.fixture(scope = 'class')
+def benchDB(queueDB):
+    'База данных с очередью из 10000 слотов'
+    bench = Queue(
+        name = 'bench', title = 'Нагрузка', duration = 5,
+        description = 'Нагрузка', waterfall = False,
+        only_one_active = False, only_once = False
+    )
+    queueDB.setup_models(bench)
+    times = [datetime.fromisoformat(time) for time in bulk_times(10000)]
+    with queueDB.session as dbses:
+        dbses.execute(insert_slots, {'queue': 'bench', 'times': times})
+    yield queueDB
+
+
+class TestSerialization:
+
+    N = 10000
+
+    def orm(self, db):
+        'Выборка и сериализация слотов через ORM-объекты'
+        with db.session as dbses:
+            slots = dbses.query(Slot).filter_by(queue_name = 'bench').all()
+            return [slot.as_dict() for slot in slots]
+
+    def columnar(self, db):
+        'Выборка и сериализация слотов через кортежи колонок'
+        with db.session as dbses:
+            return serialize_slots(
+                dbses.query(*SLOT_COLUMNS).filter_by(queue_name = 'bench')
+            )
+
+    def test_same_output(self, benchDB):
+        'Сериализация кортежей должна совпадать с Slot.as_dict'
+        assert self.columnar(benchDB) == self.orm(benchDB)
+
+    def test_benchmark(self, benchDB):
+        'Выборка кортежей должна обрабатывать больше слотов в секунду, чем ORM'
+        orm = min(timeit(lambda: self.orm(benchDB), number = 1)
+                  for _ in range(3))
+        columnar = min(timeit(lambda: self.columnar(benchDB), number = 1)
+                       for _ in range(3))
+        print(f"\nORM: {self.N / orm:.0f} слотов/с,"
+              f" кортежи: {self.N / columnar:.0f} слотов/с")
+        assert columnar < orm
+
+
+def next_link(resp):
+    'Возвращает ссылку на следующую страницу из заголовка Link или None'
+    match = re.search(r'<([^>]*)>; rel=next', resp.headers.get('Link', ''))
+    return match.group(1) if match else None
+
+
+class TestPagination:
+
+    URI = '/queues/music/slots'
+
+    def ordered(self, client, params = {}):
+        'Все слоты очереди, упорядоченные по времени'
+        resp = client.simulate_get(self.URI, params = params)
+        return sorted(json.loads(resp.text), key = lambda slot: slot['time'])
+
+    def test_pages(self, client, queueDB):
+        'Страницы, полученные по ссылкам из Link, должны покрывать все слоты'
+        slots, pages = [], 0
+        resp = client.simulate_get(self.URI, params = {'limit': 3})
+        while True:
+            assert resp.status == falcon.HTTP_200
+            page = json.loads(resp.text)
+            assert len(page) <= 3
+            slots += page
+            pages += 1
+            if next_link(resp) is None:
+                break
+            resp = client.simulate_get(next_link(resp))
+        assert pages == 4
+        assert slots == self.ordered(client)
+
+    def test_pages_day(self, client, queueDB):
+        'Постраничная выдача сочетается с фильтром по датам'
+        params = {'day': date.today(), 'offset': 4}
+        resp = client.simulate_get(self.URI, params = {**params, 'limit': 3})
+        page = json.loads(resp.text)
+        resp = client.simulate_get(next_link(resp))
+        assert page + json.loads(resp.text) == self.ordered(client, params)
+        assert next_link(resp) is None
+
+    @pytest.mark.parametrize('params', [
+        {'limit': 0}, {'limit': 1001}, {'cursor': 'неверный'},
+        {'cursor': 'YWJj'}
+    ])
+    def test_bad_params(self, client, queueDB, params):
+        'При неверных limit или cursor возвращается 400 Bad Request'
+        resp = client.simulate_get(self.URI, params = params)
+        assert resp.status == falcon.HTTP_400
+
+    def test_stream(self, client, queueDB):
+        'Потоковая выдача возвращает те же слоты в порядке времени'
+        resp = client.simulate_get(self.URI, params = {'stream': True})
+        assert resp.status == falcon.HTTP_200
+        assert resp.headers['Content-Type'].startswith('application/json')
+        assert json.loads(resp.text) == self.ordered(client)
+
+    def test_stream_empty(self, client, queueDB):
+        'Потоковая выдача пустой очереди возвращает пустой массив'
+        resp = client.simulate_get(self.URI.replace('music', 'none'),
+                                   params = {'stream': True})
+        assert json.loads(resp.text) == []
+
+    def test_stream_chunks(self, client, benchDB):
+        'Большая очередь передается частями по STREAM_CHUNK слотов'
+        with patch('cyberdas.resources.slots.serialize_slots',
+                   wraps = serialize_slots) as serialize:
+            resp = client.simulate_get('/queues/bench/slots',
+                                       params = {'stream': True})
+        assert len(json.loads(resp.text)) == 10000
+        assert serialize.call_count == 10000 // STREAM_CHUNK
+        assert all(len(call.args[0]) <= STREAM_CHUNK
+                   for call in serialize.call_args_list)
+
+
+@patch('cyberdas.services.mail.Mail.send', new = MagicMock())
+class TestVersioning:
+
+    URIS = ['/queues/music/slots', '/queues/music/slots/7',
+            '/queues/music/slots/summary']
+
+    def version(self, db):
+        with db.session as dbses:
+            return dbses.query(Queue).filter_by(name = 'music').first().version
+
+    def etags(self, client):
+        return [client.simulate_get(uri).headers['ETag'] for uri in self.URIS]
+
+    def test_not_modified(self, client, queueDB):
+        'Запрос с актуальным ETag получает 304, не обращаясь к таблице слотов'
+        for uri, etag in zip(self.URIS, self.etags(client)):
+            with capture_queries('FROM slots') as queries:
+                resp = client.simulate_get(uri,
+                                           headers = {'If-None-Match': etag})
+            assert resp.status == falcon.HTTP_304
+            assert queries == []
+
+    def test_params(self, client, queueDB):
+        'ETag зависит от параметров запроса'
+        etag = client.simulate_get(self.URIS[0]).headers['ETag']
+        resp = client.simulate_get(self.URIS[0],
+                                   params = {'day': date.today()},
+                                   headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_200
+        assert resp.headers['ETag'] != etag
+
+    def test_my(self, a_client, queueDB):
+        'Слоты пользователя отдаются без ETag'
+        resp = a_client.simulate_get(self.URIS[0], params = {'my': True})
+        assert 'ETag' not in resp.headers
+
+    def test_reserve(self, client, a_client, queueDB):
+        'Резервирование и отмена резервирования меняют версию очереди'
+        version = self.version(queueDB)
+        etags = self.etags(client)
+
+        resp = a_client.simulate_post(self.URIS[1] + '/reserve')
+        assert resp.status == falcon.HTTP_201
+        assert self.version(queueDB) == version + 1
+        for uri, etag in zip(self.URIS, etags):
+            resp = client.simulate_get(uri, headers = {'If-None-Match': etag})
+            assert resp.status == falcon.HTTP_200
+
+        resp = a_client.simulate_delete(self.URIS[1] + '/reserve')
+        assert resp.status == falcon.HTTP_204
+        assert self.version(queueDB) == version + 2
+
+    def test_refused(self, a_client, queueDB):
+        'Неудачная попытка резервирования не меняет версию очереди'
+        version = self.version(queueDB)
+        resp = a_client.simulate_post('/queues/music/slots/0/reserve')
+        assert resp.status == falcon.HTTP_403
+        assert self.version(queueDB) == version
+
+    def test_bulk(self, a_client, queueDB, admin):
+        'Массовое изменение слотов меняет версию очереди'
+        version = self.version(queueDB)
+        resp = a_client.simulate_patch(self.URIS[0], json = bulk_times(2))
+        assert resp.status == falcon.HTTP_204
+        assert self.version(queueDB) == version + 1
+
+        resp = a_client.simulate_patch(self.URIS[0], json = bulk_times(2))
+        assert self.version(queueDB) == version + 1
+
+    def test_same_transaction(self, queueDB):
+        '''
+        Версия очереди увеличивается в той же транзакции, что и изменение
+        слотов, так что при её откате версия не меняется
+        '''
+        version = self.version(queueDB)
+        with capture_queries('') as queries:
+            with pytest.raises(RuntimeError):
+                with queueDB.session as dbses:
+                    dbses.execute(insert_slots, {'queue': 'music',
+                                                 'times': bulk_times(1, 5)})
+                    mark_changed(dbses, 'music')
+
+                    @event.listens_for(dbses, 'before_commit')
+                    def fail(dbses):
+                        raise RuntimeError
+        assert [q for q, _ in queries if 'UPDATE queues' in q]
+        assert self.version(queueDB) == version
+        with queueDB.session as dbses:
+            assert dbses.query(Slot).filter_by(
+                queue_name = 'music', time = bulk_times(1, 5)[0]).count() == 0
+
+
+@contextmanager
+def listening(db):
+    '''
+    Подписывается на канал изменений слотов и возвращает функцию, ожидающую
+    очередное уведомление
+    '''
+    conn = db.manager._main_engine.raw_connection()
+    conn.detach()
+    conn.connection.autocommit = True
+    conn.cursor().execute('LISTEN slot_events')
+
+    def receive():
+        while not conn.connection.notifies:
+            assert select.select([conn.connection], [], [], 5) != ([], [], [])
+            conn.connection.poll()
+        return json.loads(conn.connection.notifies.pop(0).payload)
+
+    try:
+        yield receive
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def events():
+    '''
+    Общая рассылка изменений слотов с пустой историей, короткими потоками и
+    без прослушивания БД
+    '''
+    with patch.dict(slot_events._events, clear = True), \
+         patch.object(slot_events, 'lifetime', 0.2), \
+         patch.object(slot_events, 'keepalive', 0.1), \
+         patch.object(slot_events, 'listen', MagicMock()):
+        yield slot_events
+
+
+def sse(body):
+    'Возвращает сообщения потока Server-Sent Events в виде словарей'
+    messages = []
+    for block in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n')
+                      if line and not line.startswith(':'))
+        if 'data' in fields:
+            fields['data'] = json.loads(fields['data'])
+            messages.append(fields)
+    return messages
+
+
+class TestSlotEvents:
+
+    def test_backlog(self):
+        'Хранятся только последние backlog событий очереди'
+        events = SlotEvents(backlog = 2, keepalive = 1, lifetime = 1,
+                            streams = 1, retry_after = 1)
+        for version in range(1, 4):
+            events.dispatch('music', version, [])
+        assert events.after('music', 0, 0) == [(2, []), (3, [])]
+        assert events.covers('music', 1)
+        assert not events.covers('music', 0)
+        assert not events.covers('living2021', 0)
+
+    def test_wait(self):
+        'Подписчик просыпается при появлении события'
+        events = SlotEvents(backlog = 2, keepalive = 1, lifetime = 1,
+                            streams = 1, retry_after = 1)
+        assert events.after('music', 0, 0.01) == []
+        threading.Timer(0.05, events.dispatch, ('music', 1, None)).start()
+        assert events.after('music', 0, 5) == [(1, None)]
+
+
+@patch('cyberdas.services.mail.Mail.send', new = MagicMock())
+class TestEvents:
+
+    URI = '/queues/music/slots/events'
+
+    def version(self, db):
+        with db.session as dbses:
+            return dbses.query(Queue).filter_by(name = 'music').first().version
+
+    def test_notify(self, a_client, queueDB, admin):
+        'Изменения слотов рассылаются через NOTIFY с новой версией очереди'
+        version = self.version(queueDB)
+        with listening(queueDB) as receive:
+            a_client.simulate_post('/queues/music/slots/7/reserve')
+            assert receive() == {'queue': 'music', 'version': version + 1,
+                                 'slots': [{'id': 7, 'free': False}]}
+
+            a_client.simulate_delete('/queues/music/slots/7/reserve')
+            assert receive()['slots'] == [{'id': 7, 'free': True}]
+
+            a_client.simulate_patch('/queues/music/slots', json = bulk_times(2))
+            assert receive() == {'queue': 'music', 'version': version + 3,
+                                 'slots': None}
+
+    def test_stream(self, client, queueDB, events):
+        'Поток начинается с текущей версии очереди и передает новые события'
+        version = self.version(queueDB)
+        threading.Timer(0.05, events.dispatch,
+                        ('music', version + 1, [{'id': 3, 'free': False}]))\
+            .start()
+        resp = client.simulate_get(self.URI)
+        assert resp.status == falcon.HTTP_200
+        assert resp.headers['Content-Type'] == 'text/event-stream'
+        assert resp.text.startswith(f'retry: 3000\nid: {version}\n\n')
+        assert sse(resp.text) == [{'id': str(version + 1), 'event': 'slot',
+                                   'data': {'id': 3, 'free': False}}]
+
+    def test_replay(self, client, queueDB, events):
+        'Переподключившийся клиент получает пропущенные события'
+        version = self.version(queueDB)
+        events.dispatch('music', version - 1, [{'id': 1, 'free': False}])
+        events.dispatch('music', version, [{'id': 1, 'free': True}])
+        resp = client.simulate_get(
+            self.URI, headers = {'Last-Event-ID': str(version - 2)}
+        )
+        assert [(m['id'], m['data']['free']) for m in sse(resp.text)] == [
+            (str(version - 1), False), (str(version), True)
+        ]
+
+    @pytest.mark.parametrize('last', [0, 10 ** 6])
+    def test_reset(self, client, queueDB, events, last):
+        'Если пропущенных событий не осталось, клиент получает reset'
+        version = self.version(queueDB)
+        resp = client.simulate_get(self.URI,
+                                   headers = {'Last-Event-ID': str(last)})
+        assert sse(resp.text) == [{'id': str(version), 'event': 'reset',
+                                   'data': {}}]
+
+    def test_gap(self, client, queueDB, events):
+        'Пропуск в версиях событий приводит к reset'
+        version = self.version(queueDB)
+        threading.Timer(0.05, events.dispatch,
+                        ('music', version + 2, [{'id': 3, 'free': False}]))\
+            .start()
+        resp = client.simulate_get(self.URI)
+        assert [m['event'] for m in sse(resp.text)] == ['reset']
+
+    def test_errors(self, client, queueDB, events):
+        'Неизвестная очередь и неверный Last-Event-ID'
+        resp = client.simulate_get('/queues/nonexistent/slots/events')
+        assert resp.status == falcon.HTTP_404
+        resp = client.simulate_get(self.URI,
+                                   headers = {'Last-Event-ID': 'abc'})
+        assert resp.status == falcon.HTTP_400
+
+    def test_limit(self, client, queueDB, events):
+        'Лишние потоки отклоняются, а закрытые освобождают место'
+        with patch.object(events, 'streams', 1):
+            assert events.open()
+            resp = client.simulate_get(self.URI)
+            assert resp.status == falcon.HTTP_503
+            assert resp.headers['Retry-After'] == str(events.retry_after)
+            # Клиент переходит на опрос списка слотов по ETag
+            assert resp.headers['Link'] == \
+                '</queues/music/slots>; rel="alternate"'
+            events.close()
+            resp = client.simulate_get(self.URI)
+            assert resp.status == falcon.HTTP_200
+            assert events.open()
+            events.close()
+
+    def test_listener(self, a_client, queueDB):
+        'События доходят до подписчиков процесса через LISTEN/NOTIFY'
+        events = SlotEvents(backlog = 10, keepalive = 1, lifetime = 1,
+                            streams = 1, retry_after = 1)
+        events.listen(queueDB.manager._main_engine)
+        # Ждем, пока слушатель подпишется на канал
+        sleep(0.5)
+        version = self.version(queueDB)
+        a_client.simulate_post('/queues/music/slots/8/reserve')
+        assert events.after('music', version, 5) == [
+            (version + 1, [{'id': 8, 'free': False}])
+        ]
+
+
+@pytest.fixture(scope = 'class')
+def rushDB(defaultDB):
+    '''
+    База данных с очередью из пяти слотов и тридцатью пользователями,
+    одновременно пытающимися в неё записаться. Возвращает идентификаторы
+    сессий пользователей
+    '''
+    rush = Queue(
+        name = 'rush', title = 'Заселение', duration = 5,
+        description = 'Заселение', waterfall = False,
+        only_one_active = False, only_once = False
+    )
+    slots = [Slot(queue_name = 'rush', id = x,
+                  time = datetime.now() + timedelta(days = 1, minutes = x))
+             for x in range(TestRush.SLOTS)]
+    users = defaultDB.generate_users(TestRush.USERS)
+    sids = [secrets.token_urlsafe(32) for _ in users]
+    sessions = []
+    for n, (user, sid) in enumerate(zip(users, sids)):
+        user.id = 100 + n
+        user.faculty_id = 1
+        sessions.append(Session(uid = user.id, sid = sid, user_agent = 'curl',
+                                ip = '127.0.0.1',
+                                expires = datetime.now() + timedelta(days = 1)))
+    defaultDB.setup_models([rush, *slots, *users])
+    defaultDB.setup_models(sessions)
+    yield sids
+
+
+class TestRush:
+
+    '''
+    Нагрузочный сценарий: при открытии записи все пользователи одновременно
+    пытаются занять слоты очереди, а отправка письма занимает заметное время
+    '''
+
+    USERS = 30
+    SLOTS = 5
+    CONCURRENCY = 2
+    BACKLOG = 4
+
+    def test_rush(self, defaultDB, rushDB):
+        admission = Admission(concurrency = self.CONCURRENCY,
+                              backlog = self.BACKLOG, timeout = 1,
+                              retry_after = 1)
+        with patch('cyberdas.middlewares.create_admission',
+                   return_value = admission):
+            client = testing.TestClient(Service())
+
+        lock = threading.Lock()
+        sending = Counter()
+
+        def send(*args, **kwargs):
+            with lock:
+                sending['now'] += 1
+                sending['max'] = max(sending['max'], sending['now'])
+            sleep(0.05)
+            with lock:
+                sending['now'] -= 1
+
+        start = threading.Barrier(self.USERS)
+
+        def reserve(n):
+            sid = rushDB[n]
+            start.wait()
+            return client.simulate_post(
+                f'/queues/rush/slots/{n % self.SLOTS}/reserve',
+                cookies = {'SESSIONID': sid},
+                headers = {'X-CSRF-Token': derive_csrf_token(sid)}
+            )
+
+        with patch('cyberdas.services.mail.Mail.send', new = send), \
+             ThreadPoolExecutor(self.USERS) as pool:
+            responses = list(pool.map(reserve, range(self.USERS)))
+
+        statuses = Counter(resp.status for resp in responses)
+        assert set(statuses) <= {falcon.HTTP_201, falcon.HTTP_403,
+                                 falcon.HTTP_429}
+        # Лишние запросы отклоняются сразу, а не ждут освобождения соединений
+        assert statuses[falcon.HTTP_429] >= (self.USERS - self.CONCURRENCY
+                                             - self.BACKLOG) // 2
+        assert all(resp.headers['Retry-After'] == '1' for resp in responses
+                   if resp.status == falcon.HTTP_429)
+        assert sending['max'] <= self.CONCURRENCY
+
+        # Каждый слот занят не больше одного раза, и все успешные запросы
+        # действительно заняли слот
+        with defaultDB.session as dbses:
+            reserved = dbses.query(Slot).filter(
+                Slot.queue_name == 'rush', Slot.user_id.isnot(None)
+            ).count()
+        assert 1 <= statuses[falcon.HTTP_201] <= self.SLOTS
+        assert reserved == statuses[falcon.HTTP_201]
+
+
+@patch('cyberdas.services.mail.Mail.send', new = MagicMock())
+class TestHold:
+
+    URI = '/queues/music/slots/{}/hold'
+
+    def set_hold(self, db, id, uid, seconds):
+        with db.session as dbses:
+            slot = dbses.query(Slot).filter_by(queue_name = 'music',
+                                               id = id).first()
+            slot.held_by = uid
+            slot.held_until = datetime.now() + timedelta(seconds = seconds)
+
+    def holder(self, db, id):
+        with db.session as dbses:
+            slot = dbses.query(Slot).filter_by(queue_name = 'music',
+                                               id = id).first()
+            return slot.held_by
+
+    def test_hold(self, a_client, queueDB):
+        'Удерживаемый слот отображается занятым'
+        resp = a_client.simulate_post(self.URI.format(5))
+        assert resp.status == falcon.HTTP_201
+        held_until = datetime.fromisoformat(resp.json['held_until'])
+        assert held_until > datetime.now() + timedelta(seconds = 60)
+        assert self.holder(queueDB, 5) == 1
+
+        resp = a_client.simulate_get('/queues/music/slots/5')
+        assert resp.json['free'] is False
+        resp = a_client.simulate_get('/queues/music/slots/summary')
+        assert sum(day['free'] for day in resp.json) == 9
+
+    def test_hold_another(self, a_client, queueDB):
+        'Удержание другого слота очереди снимает предыдущее'
+        resp = a_client.simulate_post(self.URI.format(6))
+        assert resp.status == falcon.HTTP_201
+        assert self.holder(queueDB, 5) is None
+        assert self.holder(queueDB, 6) == 1
+
+    def test_release(self, a_client, queueDB):
+        'Пользователь может снять своё удержание'
+        resp = a_client.simulate_delete(self.URI.format(6))
+        assert resp.status == falcon.HTTP_204
+        assert self.holder(queueDB, 6) is None
+        resp = a_client.simulate_delete(self.URI.format(6))
+        assert resp.status == falcon.HTTP_404
+
+    def test_held_by_other(self, a_client, queueDB):
+        'Слот, удерживаемый другим пользователем, нельзя занять или удержать'
+        self.set_hold(queueDB, 7, 2, 60)
+        for uri in [self.URI.format(7), '/queues/music/slots/7/reserve']:
+            resp = a_client.simulate_post(uri)
+            assert resp.status == falcon.HTTP_403
+            assert 'удерживается' in resp.json['description']
+        assert self.holder(queueDB, 7) == 2
+
+    def test_failed_hold(self, a_client, queueDB):
+        'Неудачная попытка удержать слот не снимает других удержаний'
+        resp = a_client.simulate_post(self.URI.format(4))
+        assert resp.status == falcon.HTTP_201
+        resp = a_client.simulate_post(self.URI.format(100))
+        assert resp.status == falcon.HTTP_404
+        resp = a_client.simulate_post(self.URI.format(7))
+        assert resp.status == falcon.HTTP_403
+        assert self.holder(queueDB, 4) == 1
+
+    def test_etag(self, client, queueDB):
+        '''
+        Пока удержания не истекли, ETag выставляется, но меняется при истечении
+        каждого удержания, так как слот освобождается без изменения версии
+        очереди
+        '''
+        self.set_hold(queueDB, 9, 2, 60)
+        with queueDB.session as dbses:
+            dbses.query(Queue).filter_by(name = 'music').first().holds_until = (
+                datetime.now() + timedelta(seconds = 60)
+            )
+        resp = client.simulate_get('/queues/music/slots')
+        etag = resp.headers['ETag']
+        resp = client.simulate_get('/queues/music/slots',
+                                   headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_304
+
+        self.set_hold(queueDB, 9, 2, -1)
+        resp = client.simulate_get('/queues/music/slots',
+                                   headers = {'If-None-Match': etag})
+        assert resp.status == falcon.HTTP_200
+        assert {slot['id']: slot['free'] for slot in resp.json}[9] is True
+        assert resp.headers['ETag'] != etag
+
+    def test_hidden(self, a_client, queueDB):
+        'Время истечения удержаний не передается клиентам'
+        resp = a_client.simulate_get('/queues/music')
+        assert 'holds_until' not in resp.json
+        resp = a_client.simulate_get('/queues')
+        assert all('holds_until' not in queue for queue in resp.json)
+
+    def test_expired(self, a_client, queueDB):
+        '''
+        Слот с истёкшим удержанием при чтении отображается свободным, но
+        удержание снимается только при следующем удержании слота очереди
+        '''
+        self.set_hold(queueDB, 7, 2, -1)
+        with capture_queries('UPDATE') as queries:
+            resp = a_client.simulate_get('/queues/music/slots')
+            assert {slot['id']: slot['free'] for slot in resp.json}[7] is True
+            resp = a_client.simulate_get('/queues/music/slots/7')
+            assert resp.json['free'] is True
+            resp = a_client.simulate_get('/queues/music/slots/summary')
+            assert sum(day['free'] for day in resp.json) == 9
+        assert queries == []
+        assert self.holder(queueDB, 7) == 2
+
+        with capture_queries('SET held_by=%(held_by)s') as queries:
+            resp = a_client.simulate_post(self.URI.format(6))
+        assert resp.status == falcon.HTTP_201
+        assert self.holder(queueDB, 7) is None
+        assert self.holder(queueDB, 4) is None
+
+        plan = explain(queueDB, *queries[-1])
+        assert 'ix_slots_queue_name_held_until' in plan
+
+    def test_reserve_expired(self, a_client, queueDB):
+        'Слот с истёкшим удержанием можно занять, удержание при этом снимается'
+        self.set_hold(queueDB, 8, 2, -1)
+        resp = a_client.simulate_post('/queues/music/slots/8/reserve')
+        assert resp.status == falcon.HTTP_201
+        assert self.holder(queueDB, 8) is None
+
+
+@pytest.fixture(scope = 'class')
+def archiveDB(queueDB):
+    '''
+    База данных с очередью из пяти прошедших слотов, первый из которых занят
+    пользователем, от имени которого выполняются запросы, и трех будущих
+    '''
+    archive = Queue(
+        name = 'archive', title = 'Заселение', duration = 5,
+        description = 'Заселение', waterfall = False,
+        only_one_active = False, only_once = True
+    )
+    base = datetime.combine(date.today(), dt_time(12))
+    past = [Slot(queue_name = 'archive', id = x,
+                 time = base - timedelta(days = 30 - x),
+                 user_id = 1 if x == 0 else None)
+            for x in range(5)]
+    future = [Slot(queue_name = 'archive', id = 5 + x,
+                   time = base + timedelta(days = 1 + x))
+              for x in range(3)]
+    queueDB.setup_models([archive, *past, *future])
+    yield queueDB
+
+
+@patch('cyberdas.services.mail.Mail.send', new = MagicMock())
+class TestArchive:
+
+    URI = '/queues/archive/slots'
+
+    def count(self, db, model):
+        with db.session as dbses:
+            return dbses.query(model).filter_by(queue_name = 'archive').count()
+
+    def test_archive(self, archiveDB):
+        'Прошедшие слоты переносятся в историю пачками, будущие остаются'
+        before = datetime.now() - timedelta(days = 7)
+        with capture_queries('INSERT INTO slots_history') as queries:
+            assert archive(archiveDB.manager, before, 2) == 5
+        # Пачки по 2 слота: 2, 2, 1 - последняя неполная
+        assert len([q for q in queries if q[1]['queue'] == 'archive']) == 3
+        assert self.count(archiveDB, Slot) == 3
+        assert self.count(archiveDB, SlotHistory) == 5
+        assert archive(archiveDB.manager, before, 2) == 0
+
+    def test_get_all(self, a_client, archiveDB):
+        'Без day перенесенные в историю слоты возвращаются вместе с остальными'
+        resp = a_client.simulate_get(self.URI)
+        assert resp.status == falcon.HTTP_200
+        free = {slot['id']: slot['free'] for slot in resp.json}
+        assert free == {x: x != 0 for x in range(8)}
+
+    def test_get_past(self, a_client, archiveDB):
+        'Слоты за прошедшие дни читаются из истории'
+        day = date.today() - timedelta(days = 30)
+        resp = a_client.simulate_get(self.URI, params = {'day': day,
+                                                         'offset': 31})
+        assert sorted(slot['id'] for slot in resp.json) == [0, 1, 2, 3, 4]
+
+        resp = a_client.simulate_get(self.URI + '/0')
+        assert resp.status == falcon.HTTP_200
+        assert resp.json['free'] is False
+
+        resp = a_client.simulate_get(self.URI + '/summary')
+        assert len(resp.json) == 8
+        assert resp.json[0]['free'] == 0
+
+    def test_get_future(self, a_client, archiveDB):
+        'Запросы слотов начиная с сегодняшнего дня не обращаются к истории'
+        with capture_queries('slots_history') as queries:
+            resp = a_client.simulate_get(self.URI, params = {
+                'day': date.today(), 'offset': 7
+            })
+            assert len(resp.json) == 3
+            resp = a_client.simulate_get(self.URI + '/summary', params = {
+                'day': date.today(), 'offset': 7
+            })
+            assert len(resp.json) == 3
+        assert queries == []
+
+        with capture_queries('slots_history') as queries:
+            a_client.simulate_get(self.URI, params = {'day': date.today(),
+                                                      'offset': 1})
+            a_client.simulate_get(self.URI, params = {
+                'day': date.today() - timedelta(days = 1)
+            })
+        assert len(queries) == 1
+
+    def test_only_once(self, a_client, archiveDB):
+        'Правило only_once учитывает записи, перенесенные в историю'
+        resp = a_client.simulate_post(self.URI + '/5/reserve')
+        assert resp.status == falcon.HTTP_403
+        assert resp.json['description'] == 'Вы уже записались в эту очередь'
+
+    def test_insert_ids(self, archiveDB):
+        '''
+        Идентификаторы новых слотов не совпадают с идентификаторами слотов из
+        истории, а на моменты времени из истории слоты не добавляются
+        '''
+        with archiveDB.session as dbses:
+            dbses.query(Slot).filter_by(queue_name = 'archive').delete()
+            archived = dbses.query(SlotHistory.time).filter_by(
+                queue_name = 'archive', id = 1).scalar()
+            moment = datetime.now() + timedelta(days = 1)
+            dbses.execute(insert_slots, {'queue': 'archive',
+                                         'times': [archived, moment]})
+            ids = [id for id, in dbses.query(Slot.id)
+                   .filter_by(queue_name = 'archive')]
+        assert ids == [5]
+
+
+class TestQueryCount:
+    '''
+    Письма о записи и об её отмене составляются из уже загруженных
+    обработчиком данных, без отдельных запросов к БД
+    '''
+
+    URI = '/queues/music/slots/5/reserve'
+
+    def statements(self, client, method):
+        'Возвращает запросы к БД, выполненные при обработке запроса к слоту'
+        mail = MagicMock()
+        with patch('cyberdas.services.mail.Mail.send', new = mail):
+            with capture_queries('') as queries:
+                resp = client.simulate_request(method, self.URI)
+        assert mail.called
+        # Сессия пользователя может быть уже закэширована
+        return resp, [q for q, _ in queries if 'FROM sessions' not in q]
+
+    def test_reserve(self, a_client, queueDB):
+        '''
+        Запись выполняется четырьмя запросами: UPDATE слота, удаление из
+        списка ожидания, увеличение версии очереди и уведомление о нем
+        '''
+        resp, statements = self.statements(a_client, 'POST')
+        assert resp.status == falcon.HTTP_201
+        assert len(statements) == 4
+        assert not [q for q in statements if q.startswith('SELECT')
+                    and 'pg_notify' not in q]
+
+    def test_unreserve(self, a_client, queueDB):
+        '''
+        Слот, очередь и пользователь загружаются одним запросом, который
+        переиспользуют хуки, отправляющие письма
+        '''
+        resp, statements = self.statements(a_client, 'DELETE')
+        assert resp.status == falcon.HTTP_204
+        assert len(statements) == 5
+        assert len([q for q in statements if q.startswith('SELECT')
+                    and 'pg_notify' not in q]) == 1
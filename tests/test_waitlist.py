@@ -0,0 +1,130 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import falcon
+
+from cyberdas.models import Queue, Slot, WaitlistEntry
+from cyberdas.resources.slots import pop_waitlist
+
+from test_slots import explain, queueDB  # noqa
+
+
+@pytest.fixture(scope = 'class')
+def fullDB(queueDB):  # noqa
+    '''
+    База данных с очередью, все будущие слоты которой заняты. Первый слот
+    занят пользователем, от имени которого выполняются запросы, второй -
+    третьим пользователем
+    '''
+    full = Queue(
+        name = 'full', title = 'Заселение', duration = 5,
+        description = 'Заселение', waterfall = False,
+        only_one_active = True, only_once = False
+    )
+    third = queueDB.generate_users(1)[0]
+    third.id = 3
+    slots = [Slot(queue_name = 'full', id = x, user_id = uid,
+                  time = datetime.now() + timedelta(days = 1, minutes = x))
+             for x, uid in enumerate([1, 3])]
+    queueDB.setup_models([full, third, *slots])
+    yield queueDB
+
+
+def waitlist(db, queue = 'full'):
+    'Возвращает идентификаторы пользователей в списке ожидания по порядку'
+    with db.session as dbses:
+        return [entry.user_id for entry in dbses.query(WaitlistEntry)
+                .filter_by(queue_name = queue)
+                .order_by(WaitlistEntry.created_at)]
+
+
+@patch('cyberdas.services.mail.Mail.send', new = MagicMock())
+class TestWaitlist:
+
+    URI = '/queues/full/waitlist'
+
+    def test_free_slots(self, a_client, fullDB):
+        'В список ожидания очереди со свободными слотами попасть нельзя'
+        resp = a_client.simulate_post('/queues/music/waitlist')
+        assert resp.status == falcon.HTTP_409
+        resp = a_client.simulate_post('/queues/nonexistent/waitlist')
+        assert resp.status == falcon.HTTP_404
+
+    def test_unauthorized(self, client, fullDB):
+        resp = client.simulate_post(self.URI)
+        assert resp.status == falcon.HTTP_401
+
+    def test_join(self, a_client, fullDB):
+        'Пользователь попадает в конец списка ожидания'
+        with fullDB.session as dbses:
+            dbses.add(WaitlistEntry(queue_name = 'full', user_id = 2))
+        resp = a_client.simulate_post(self.URI)
+        assert resp.status == falcon.HTTP_201
+        assert resp.json['position'] == 2
+
+        resp = a_client.simulate_post(self.URI)
+        assert resp.status == falcon.HTTP_200
+        resp = a_client.simulate_get(self.URI)
+        assert resp.json['position'] == 2
+        assert waitlist(fullDB) == [2, 1]
+
+    def test_leave(self, a_client, fullDB):
+        'Пользователь может покинуть список ожидания'
+        resp = a_client.simulate_delete(self.URI)
+        assert resp.status == falcon.HTTP_204
+        resp = a_client.simulate_delete(self.URI)
+        assert resp.status == falcon.HTTP_404
+        resp = a_client.simulate_get(self.URI)
+        assert resp.status == falcon.HTTP_404
+        assert waitlist(fullDB) == [2]
+
+    def test_promote(self, a_client, fullDB):
+        '''
+        Освободившийся слот достается первому из ожидающих, которому его
+        можно отдать по правилам очереди, и тот получает письмо о записи
+        '''
+        # Третий пользователь ждет дольше, но уже записан в очередь
+        with fullDB.session as dbses:
+            dbses.add(WaitlistEntry(
+                queue_name = 'full', user_id = 3,
+                created_at = datetime.now() - timedelta(hours = 1)
+            ))
+        mail = MagicMock()
+        with patch('cyberdas.services.mail.Mail.send', new = mail):
+            resp = a_client.simulate_delete('/queues/full/slots/0/reserve')
+        assert resp.status == falcon.HTTP_204
+
+        with fullDB.session as dbses:
+            slot = dbses.query(Slot).filter_by(queue_name = 'full',
+                                               id = 0).first()
+            assert slot.user_id == 2
+        assert waitlist(fullDB) == []
+        subjects = {call.kwargs['subject'] for call in mail.call_args_list}
+        assert subjects == {'Запись в очередь', 'Отмена записи в очередь'}
+
+    def test_no_promote(self, a_client, fullDB):
+        'При пустом списке ожидания слот просто освобождается'
+        with fullDB.session as dbses:
+            slot = dbses.query(Slot).filter_by(queue_name = 'full',
+                                               id = 0).first()
+            slot.user_id = 1
+        resp = a_client.simulate_delete('/queues/full/slots/0/reserve')
+        assert resp.status == falcon.HTTP_204
+        resp = a_client.simulate_get('/queues/full/slots/0')
+        assert resp.json['free'] is True
+
+    def test_reserve_leaves(self, a_client, fullDB):
+        'Записавшийся сам пользователь покидает список ожидания'
+        with fullDB.session as dbses:
+            dbses.add(WaitlistEntry(queue_name = 'full', user_id = 1))
+        resp = a_client.simulate_post('/queues/full/slots/0/reserve')
+        assert resp.status == falcon.HTTP_201
+        assert waitlist(fullDB) == []
+
+    def test_index(self, fullDB):
+        'Первый в списке ожидания находится по индексу, без сортировки'
+        plan = explain(fullDB, pop_waitlist.text.replace(':queue', '%(q)s'),
+                       {'q': 'full'})
+        assert 'ix_waitlist_queue_name_created_at' in plan
+        assert 'Sort' not in plan